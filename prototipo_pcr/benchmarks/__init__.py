@@ -0,0 +1,4 @@
+"""
+Benchmarks de rendimiento del proceso sobre carteras sintéticas (ver generador.py).
+Se ejecutan desde prototipo_pcr con python -m benchmarks.ejecutar
+"""
@@ -0,0 +1,190 @@
+"""
+Ejecuta los escenarios de benchmark y los compara contra las líneas base guardadas.
+Cada escenario corre el proceso completo sobre una cartera sintética con el perfilador
+activo (ver src/perfilador.py): del reporte se toma el tiempo total y el de cada etapa,
+el mínimo de las repeticiones. Las líneas base dependen de la máquina, cada entorno las
+genera con --guardar y no se versionan.
+
+    python -m benchmarks.ejecutar --filas 10000 100000 --repeticiones 3
+    python -m benchmarks.ejecutar --escenarios run_pcr_por_bloques --filas 100000000
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, Iterator
+
+import polars as pl
+import main
+import src.parametros as params
+from benchmarks import generador
+
+RUTA_LINEAS_BASE = Path(__file__).resolve().parent / "lineas_base.json"
+# una etapa es regresión si tarda más que su línea base por encima de la tolerancia
+TOLERANCIA_REGRESION = 0.25
+# las etapas más cortas que esto en la línea base son ruido y no se comparan
+SEGUNDOS_MINIMOS_COMPARACION = 0.1
+
+# escenario: (función que ejecuta el proceso, insumos lazy)
+ESCENARIOS: dict[str, tuple[Callable[[dict], object], bool]] = {
+    "run_pcr": (lambda insumos: main.run_pcr(insumos=insumos), False),
+    "run_pcr_lazy": (lambda insumos: main.run_pcr(lazy=True, insumos=insumos), True),
+    "run_pcr_por_bloques": (
+        lambda insumos: main.run_pcr_por_bloques(insumos=insumos),
+        True,
+    ),
+}
+
+
+@contextlib.contextmanager
+def parametros_benchmark(carpeta: Path) -> Iterator[None]:
+    """
+    Activa el perfilador y dirige los outputs y los reportes a una carpeta temporal
+    """
+    cambios = {
+        "PERFILAR_ETAPAS": True,
+        "RUTA_PERFIL": carpeta / "perfil",
+        "RUTA_SALIDA_DEVENGO": carpeta / "output_devengo",
+        "RUTA_SALIDA_CONTABLE": carpeta / "output_contable",
+        "EXPORTAR_MUESTRA_EXCEL": False,
+        "DEVENGO_INCREMENTAL": False,
+    }
+    originales = {nombre: getattr(params, nombre) for nombre in cambios}
+    for nombre, valor in cambios.items():
+        setattr(params, nombre, valor)
+    try:
+        yield
+    finally:
+        for nombre, valor in originales.items():
+            setattr(params, nombre, valor)
+
+
+def resumir_reporte(reporte: dict) -> dict:
+    """
+    Tiempo total, pico de memoria y tiempo acumulado por etapa de una ejecución. La
+    memoria se mide como incremento sobre la del inicio, el proceso conserva la de los
+    escenarios anteriores
+    """
+    total, *etapas = reporte["etapas"]
+    tiempos: dict[str, float] = {}
+    for etapa in etapas:
+        tiempos[etapa["etapa"]] = tiempos.get(etapa["etapa"], 0.0) + etapa["wall_s"]
+    return {
+        "total_s": total["wall_s"],
+        "cpu_s": total["cpu_s"],
+        "rss_incremento_mb": total["rss_pico_mb"] - total["rss_inicio_mb"],
+        "etapas": tiempos,
+    }
+
+
+def medir(
+    escenario: str,
+    plantilla: dict[str, pl.DataFrame],
+    filas: int,
+    semilla: int,
+    repeticiones: int,
+) -> dict:
+    """
+    Ejecuta el escenario repeticiones veces y se queda con el mínimo de cada medida
+    """
+    ejecutar, lazy = ESCENARIOS[escenario]
+    insumos = generador.generar_insumos(plantilla, filas, semilla, lazy)
+    resumenes = []
+    for _ in range(repeticiones):
+        with tempfile.TemporaryDirectory() as carpeta, parametros_benchmark(Path(carpeta)):
+            ejecutar(insumos)
+            (ruta,) = params.RUTA_PERFIL.glob("perfil_*.json")
+            resumenes.append(resumir_reporte(json.loads(ruta.read_text())))
+    return {
+        "total_s": min(r["total_s"] for r in resumenes),
+        "cpu_s": min(r["cpu_s"] for r in resumenes),
+        "rss_incremento_mb": min(r["rss_incremento_mb"] for r in resumenes),
+        "etapas": {
+            etapa: min(r["etapas"].get(etapa, 0.0) for r in resumenes)
+            for etapa in resumenes[0]["etapas"]
+        },
+    }
+
+
+def entorno() -> dict:
+    return {
+        "maquina": platform.node(),
+        "procesador": platform.processor() or platform.machine(),
+        "nucleos": os.cpu_count(),
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+    }
+
+
+def leer_lineas_base(ruta: Path = RUTA_LINEAS_BASE) -> dict:
+    if not ruta.exists():
+        return {"entorno": entorno(), "resultados": {}}
+    return json.loads(ruta.read_text())
+
+
+def comparar(medicion: dict, base: dict) -> list[tuple[str, float, float, float]]:
+    """
+    Regresiones de la medición frente a su línea base: (medida, base, actual, razón)
+    """
+    medidas = {"total": (base["total_s"], medicion["total_s"])} | {
+        etapa: (tiempo_base, medicion["etapas"].get(etapa, 0.0))
+        for etapa, tiempo_base in base["etapas"].items()
+    }
+    return [
+        (nombre, tiempo_base, actual, actual / tiempo_base)
+        for nombre, (tiempo_base, actual) in medidas.items()
+        if tiempo_base >= SEGUNDOS_MINIMOS_COMPARACION
+        and actual > tiempo_base * (1 + TOLERANCIA_REGRESION)
+    ]
+
+
+def ejecutar_benchmarks(argumentos: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--escenarios", nargs="+", choices=list(ESCENARIOS), default=list(ESCENARIOS)
+    )
+    parser.add_argument("--filas", nargs="+", type=int, default=[10_000, 100_000])
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument(
+        "--guardar", action="store_true", help="guarda las mediciones como línea base"
+    )
+    args = parser.parse_args(argumentos)
+
+    plantilla = main.leer_insumos()
+    lineas_base = leer_lineas_base()
+    regresiones = 0
+    for escenario in args.escenarios:
+        for filas in args.filas:
+            medicion = medir(escenario, plantilla, filas, args.semilla, args.repeticiones)
+            print(
+                f"{escenario} filas={filas:,}: {medicion['total_s']:.2f} s, "
+                f"CPU {medicion['cpu_s']:.2f} s, memoria +{medicion['rss_incremento_mb']:.0f} MB"
+            )
+            base = lineas_base["resultados"].get(escenario, {}).get(str(filas))
+            if base is None:
+                print("  sin línea base")
+            else:
+                for nombre, tiempo_base, actual, razon in comparar(medicion, base):
+                    regresiones += 1
+                    print(
+                        f"  REGRESIÓN {nombre}: {tiempo_base:.3f} s -> {actual:.3f} s "
+                        f"(x{razon:.2f})"
+                    )
+            if args.guardar:
+                lineas_base["resultados"].setdefault(escenario, {})[str(filas)] = medicion
+
+    if args.guardar:
+        lineas_base["entorno"] = entorno()
+        RUTA_LINEAS_BASE.write_text(json.dumps(lineas_base, indent=2))
+        print(f"Líneas base guardadas en {RUTA_LINEAS_BASE}")
+    return 1 if regresiones and not args.guardar else 0
+
+
+if __name__ == "__main__":
+    sys.exit(ejecutar_benchmarks())
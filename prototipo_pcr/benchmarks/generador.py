@@ -0,0 +1,124 @@
+"""
+Generador de carteras sintéticas para los benchmarks.
+Parte de los insumos reales (la plantilla, como los devuelve main.leer_insumos) y replica
+las tablas de cartera tantas veces como haga falta para llegar al número de filas pedido.
+Cada réplica desplaza las llaves (póliza, recibo, contrato, ...) de forma consistente en
+todas las tablas, así los cruces entre insumos coinciden igual que en la plantilla, y
+varía los valores monetarios con un factor determinado por la semilla.
+Los parámetros (param_contabilidad, gastos, tasas, BTs, ...) se mantienen: su tamaño no
+depende del volumen de la cartera
+"""
+
+import math
+
+import polars as pl
+
+# insumos que crecen con la cartera, el resto son parámetros
+TABLAS_CARTERA = [
+    "produccion_dir",
+    "cesion_rea",
+    "comision_rea",
+    "costo_contrato_rea",
+    "seguimiento_rea",
+    "camara_soat",
+    "onerosidad",
+    "recup_onerosidad",
+    "descuentos",
+    "cartera",
+    "cuenta_corriente",
+]
+
+# llaves que se desplazan en cada réplica, numéricas aunque algunos insumos las lean como texto
+LLAVES_REPLICA = [
+    "poliza",
+    "recibo",
+    "recibo_rea",
+    "poliza_certificado",
+    "numero_documento_sap",
+    "recibo_costo_contrato",
+    "contrato_reaseguro",
+]
+# mayor que cualquier llave de la plantilla, para que las réplicas no se crucen entre sí
+PASO_LLAVES = 10**12
+
+# rango del factor aplicado a los valores monetarios de cada fila
+FACTOR_VALOR_MIN = 0.5
+FACTOR_VALOR_MAX = 1.5
+
+
+def filas_plantilla(plantilla: dict[str, pl.DataFrame]) -> int:
+    return sum(plantilla[tabla].height for tabla in TABLAS_CARTERA)
+
+
+def desplazar_llave(col: str, tipo: pl.DataType) -> pl.Expr:
+    desplazada = pl.col(col).cast(pl.Int64, strict=False) + pl.col("_replica") * PASO_LLAVES
+    if tipo == pl.String:
+        # las llaves de texto no numéricas se diferencian con un sufijo
+        return pl.coalesce(
+            desplazada.cast(pl.String),
+            pl.concat_str(pl.col(col), pl.lit("-"), pl.col("_replica")),
+        ).alias(col)
+    return desplazada.cast(tipo).alias(col)
+
+
+def variar_valor(col: str, tipo: pl.DataType, semilla: int) -> pl.Expr:
+    aleatorio = (
+        pl.struct("_replica", "_fila", pl.lit(col).alias("_col")).hash(seed=semilla)
+        % 1_000_000
+    ) / 1_000_000
+    factor = FACTOR_VALOR_MIN + (FACTOR_VALOR_MAX - FACTOR_VALOR_MIN) * aleatorio
+    valor = pl.col(col) * factor
+    if tipo.is_integer():
+        valor = valor.round()
+    return valor.cast(tipo).alias(col)
+
+
+def replicar_tabla(
+    tabla: pl.DataFrame, replicas: int, semilla: int
+) -> pl.LazyFrame:
+    """
+    Repite la tabla replicas veces con las llaves desplazadas y los valores variados
+    """
+    esquema = tabla.schema
+    return (
+        tabla.lazy()
+        .with_row_index("_fila")
+        .join(
+            pl.LazyFrame().select(pl.int_range(replicas, dtype=pl.Int64).alias("_replica")),
+            how="cross",
+        )
+        .with_columns(
+            *(desplazar_llave(col, esquema[col]) for col in LLAVES_REPLICA if col in esquema),
+            *(
+                variar_valor(col, tipo, semilla)
+                for col, tipo in esquema.items()
+                if col.startswith("valor_") and tipo.is_numeric()
+            ),
+        )
+        .select(esquema.names())
+    )
+
+
+def generar_insumos(
+    plantilla: dict[str, pl.DataFrame],
+    filas: int,
+    semilla: int = 0,
+    lazy: bool = False,
+) -> dict[str, pl.DataFrame | pl.LazyFrame]:
+    """
+    Insumos sintéticos con unas filas de cartera (aproximadas por réplicas completas de la
+    plantilla) y el mismo contrato de columnas que la plantilla. En modo lazy la cartera no
+    se materializa, así se pueden plantear escalas que no caben en memoria de una vez
+    """
+    replicas = max(1, math.ceil(filas / filas_plantilla(plantilla)))
+    insumos = {
+        nombre: (
+            replicar_tabla(tabla, replicas, semilla)
+            if nombre in TABLAS_CARTERA
+            else tabla.lazy()
+        )
+        for nombre, tabla in plantilla.items()
+    }
+    if lazy:
+        return insumos
+    return dict(zip(insumos, pl.collect_all(insumos.values())))
@@ -9,7 +9,23 @@ import src.devenga as devg
 import src.fluctuacion as fluc
 import src.deterioro as det
 import src.mapeo_contable as mapcont
+import src.cache_insumos as cache
+import src.salidas as salidas
+import src.diagnosticos as diag
+import src.incremental as inc
+import src.bloques as bloques
+import src.paralelo as paralelo
+import src.sesion_duckdb as sesion_duckdb
+import src.categorias as categorias
+import src.esquemas as esquemas
+import src.perfilador as perfilador
 import polars as pl
+import gc
+import os
+import shutil
+import tempfile
+from itertools import repeat
+from pathlib import Path
 
 
 # lee los parámetros e insumos relevantes
@@ -18,43 +34,47 @@ FECHA_VALORACION_ANTERIOR = p.FECHA_VALORACION_ANTERIOR
 FECHA_TRANSICION = p.FECHA_TRANSICION
 
 
-def run_pcr():
+def leer_insumos(lazy: bool = False) -> dict[str, pl.DataFrame | pl.LazyFrame]:
+    """
+    Lee los insumos del proceso a través del cache columnar de src/cache_insumos.py
+    y consolida los insumos de ARL con los de la compañía
+    """
     # Lectura de insumos
     # Insumos transversales
-    param_contab = pl.read_excel(
-        p.RUTA_INSUMOS, sheet_name=p.HOJA_PARAMETROS_CONTAB
+    param_contab = cache.leer_insumo(
+        p.RUTA_INSUMOS, p.HOJA_PARAMETROS_CONTAB, lazy
     ).filter(
         pl.col("estado_insumo") == 1
     )  # Solo se usan las configuraciones activas (1)
-    excepciones = pl.read_excel(p.RUTA_INSUMOS, sheet_name=p.HOJA_EXCEPCIONES_50_50)
-    gasto = pl.read_excel(p.RUTA_GASTOS)
-    tasa_cambio = pl.read_excel(p.RUTA_INSUMOS, sheet_name=p.HOJA_MONEDA)
-    descuentos = pl.read_excel(p.RUTA_INSUMOS, sheet_name=p.HOJA_DESCUENTO)
+    excepciones = cache.leer_insumo(p.RUTA_INSUMOS, p.HOJA_EXCEPCIONES_50_50, lazy)
+    gasto = cache.leer_insumo(p.RUTA_GASTOS, lazy=lazy)
+    tasa_cambio = cache.leer_insumo(p.RUTA_INSUMOS, p.HOJA_MONEDA, lazy)
+    descuentos = cache.leer_insumo(p.RUTA_INSUMOS, p.HOJA_DESCUENTO, lazy)
     # El diccionario o tabla de correspondencia de outputs con entradas contables
-    input_map_bts = pl.read_excel(p.RUTA_REL_BT, infer_schema_length=2000).filter(
-        ~pl.col("clasificacion_adicional").is_in(["MAT", "REC"])
-    )
-    input_tipo_seguro = pl.read_excel(p.RUTA_INSUMOS, sheet_name=p.HOJA_TIPO_SEGURO)
-    tabla_nomenclatura = pl.read_excel(p.RUTA_NOMENCLATURA, sheet_name="V2")
+    input_map_bts = cache.leer_insumo(
+        p.RUTA_REL_BT, lazy=lazy, infer_schema_length=2000
+    ).filter(~pl.col("clasificacion_adicional").is_in(["MAT", "REC"]))
+    input_tipo_seguro = cache.leer_insumo(p.RUTA_INSUMOS, p.HOJA_TIPO_SEGURO, lazy)
+    tabla_nomenclatura = cache.leer_insumo(p.RUTA_NOMENCLATURA, "V2", lazy)
     # Insumos de recibos contabilizados en SAP
-    produccion_dir = pl.read_excel(p.RUTA_INSUMOS, sheet_name=p.HOJA_PDN)
-    cesion_rea = pl.read_excel(p.RUTA_INSUMOS, sheet_name=p.HOJA_CESION)
-    comision_rea = pl.read_excel(p.RUTA_INSUMOS, sheet_name=p.HOJA_COMISION_REA)
-    costo_contrato_rea = pl.read_excel(p.RUTA_INSUMOS, sheet_name=p.HOJA_COSTO_CONTRATO)
-    seguimiento_rea = pl.read_excel(p.RUTA_INSUMOS, sheet_name=p.HOJA_SEGUIMIENTO_REA)
-    produccion_arl = pl.read_excel(p.RUTA_PRODUCCION_ARL)
-    costo_contrato_arl = pl.read_excel(p.RUTA_COSTO_CONTRATO_ARL)
-    camara_soat = pl.read_excel(p.RUTA_CAMARA_SOAT)
+    produccion_dir = cache.leer_insumo(p.RUTA_INSUMOS, p.HOJA_PDN, lazy)
+    cesion_rea = cache.leer_insumo(p.RUTA_INSUMOS, p.HOJA_CESION, lazy)
+    comision_rea = cache.leer_insumo(p.RUTA_INSUMOS, p.HOJA_COMISION_REA, lazy)
+    costo_contrato_rea = cache.leer_insumo(p.RUTA_INSUMOS, p.HOJA_COSTO_CONTRATO, lazy)
+    seguimiento_rea = cache.leer_insumo(p.RUTA_INSUMOS, p.HOJA_SEGUIMIENTO_REA, lazy)
+    produccion_arl = cache.leer_insumo(p.RUTA_PRODUCCION_ARL, lazy=lazy)
+    costo_contrato_arl = cache.leer_insumo(p.RUTA_COSTO_CONTRATO_ARL, lazy=lazy)
+    camara_soat = cache.leer_insumo(p.RUTA_CAMARA_SOAT, lazy=lazy)
     # Insumos de onerosidad leidos desde el datalake
-    onerosidad = pl.read_excel(p.RUTA_INSUMOS, sheet_name=p.HOJA_ONEROSIDAD)
-    recup_onerosidad = pl.read_excel(p.RUTA_INSUMOS, sheet_name=p.HOJA_RECUP_ONEROSIDAD)
+    onerosidad = cache.leer_insumo(p.RUTA_INSUMOS, p.HOJA_ONEROSIDAD, lazy)
+    recup_onerosidad = cache.leer_insumo(p.RUTA_INSUMOS, p.HOJA_RECUP_ONEROSIDAD, lazy)
     # Insumos de riesgo de credito cargado por equipo de riesgo financiero
-    riesgo_credito = pl.read_excel(p.RUTA_RIESGO_CREDITO)
+    riesgo_credito = cache.leer_insumo(p.RUTA_RIESGO_CREDITO, lazy=lazy)
     # Insumos no devengables
-    cartera = pl.read_excel(p.RUTA_INSUMOS, sheet_name=p.HOJA_CARTERA)
-    cartera_arl = pl.read_excel(p.RUTA_CARTERA_ARL)
-    cuenta_corriente = pl.read_excel(p.RUTA_CUENTA_CORRIENTE)
-    cuenta_corriente_arl = pl.read_excel(p.RUTA_CUENTA_CORRIENTE_ARL)
+    cartera = cache.leer_insumo(p.RUTA_INSUMOS, p.HOJA_CARTERA, lazy)
+    cartera_arl = cache.leer_insumo(p.RUTA_CARTERA_ARL, lazy=lazy)
+    cuenta_corriente = cache.leer_insumo(p.RUTA_CUENTA_CORRIENTE, lazy=lazy)
+    cuenta_corriente_arl = cache.leer_insumo(p.RUTA_CUENTA_CORRIENTE_ARL, lazy=lazy)
 
     produccion_arl_prep = prep_data.prep_input_produccion_arl(produccion_arl)
     produccion_dir = pl.concat(
@@ -79,31 +99,105 @@ def run_pcr():
         [cuenta_corriente, cuenta_corriente_arl], how="diagonal_relaxed"
     )
 
-    # Prepara cada insumo para entrar a devengo
-    insumos_devengo = [
-        # prepara insumos seguro directo
-        prep_data.prep_input_prima_directo(
-            produccion_dir, param_contab, excepciones, FECHA_VALORACION
+    return {
+        "param_contab": param_contab,
+        "excepciones": excepciones,
+        "gasto": gasto,
+        "tasa_cambio": tasa_cambio,
+        "descuentos": descuentos,
+        "input_map_bts": input_map_bts,
+        "input_tipo_seguro": input_tipo_seguro,
+        "tabla_nomenclatura": tabla_nomenclatura,
+        "produccion_dir": produccion_dir,
+        "cesion_rea": cesion_rea,
+        "comision_rea": comision_rea,
+        "costo_contrato_rea": costo_contrato_rea,
+        "seguimiento_rea": seguimiento_rea,
+        "camara_soat": camara_soat,
+        "onerosidad": onerosidad,
+        "recup_onerosidad": recup_onerosidad,
+        "riesgo_credito": riesgo_credito,
+        "cartera": cartera,
+        "cuenta_corriente": cuenta_corriente,
+    }
+
+
+def diagnosticar_insumos(insumos: dict[str, pl.DataFrame | pl.LazyFrame]) -> None:
+    """
+    Diagnóstico opcional de duplicados en los cruces con parámetros
+    """
+    diagnosticos = {
+        "gastos directo": diag.diagnosticar_gastos(
+            insumos["produccion_dir"], insumos["gasto"]
         ),
-        prep_data.prep_input_dcto_directo(
-            produccion_dir, param_contab, excepciones, descuentos, FECHA_VALORACION
+        "gastos rea": diag.diagnosticar_gastos(insumos["cesion_rea"], insumos["gasto"]),
+        "descuentos directo": diag.diagnosticar_descuentos(
+            insumos["produccion_dir"], insumos["descuentos"]
         ),
-        prep_data.prep_input_gasto_directo(
-            produccion_dir, param_contab, excepciones, gasto, FECHA_VALORACION
+        "descuentos rea": diag.diagnosticar_descuentos(
+            insumos["cesion_rea"], insumos["descuentos"], True
+        ),
+    }
+    for nombre, diagnostico in diagnosticos.items():
+        diag.reportar(nombre, diagnostico)
+
+
+def calcular_pcr(
+    insumos: dict[str, pl.DataFrame | pl.LazyFrame],
+    lazy: bool = False,
+    bloque: int = 0,
+    mapeo_bt: dict[str, pl.DataFrame] | None = None,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Calcula el output de devengo (con fluctuación y deterioro) y el output contable
+    a partir de los insumos leídos, sin escribirlos. El bloque identifica el estado
+    del devengo incremental cuando la cartera se procesa por bloques y mapeo_bt guarda
+    el mapeo de BTs compilado para reusarlo entre ellos
+    """
+    param_contab = insumos["param_contab"]
+    excepciones = insumos["excepciones"]
+    gasto = insumos["gasto"]
+    tasa_cambio = insumos["tasa_cambio"]
+    descuentos = insumos["descuentos"]
+    input_map_bts = insumos["input_map_bts"]
+    input_tipo_seguro = insumos["input_tipo_seguro"]
+    tabla_nomenclatura = insumos["tabla_nomenclatura"]
+    produccion_dir = insumos["produccion_dir"]
+    cesion_rea = insumos["cesion_rea"]
+    comision_rea = insumos["comision_rea"]
+    costo_contrato_rea = insumos["costo_contrato_rea"]
+    seguimiento_rea = insumos["seguimiento_rea"]
+    camara_soat = insumos["camara_soat"]
+    onerosidad = insumos["onerosidad"]
+    recup_onerosidad = insumos["recup_onerosidad"]
+    riesgo_credito = insumos["riesgo_credito"]
+    cartera = insumos["cartera"]
+    cuenta_corriente = insumos["cuenta_corriente"]
+
+    # Prepara cada insumo para entrar a devengo
+    insumos_devengo = [
+        # prepara insumos seguro directo, prima, descuento y gasto sobre la misma base
+        prep_data.prep_inputs_base_comun(
+            produccion_dir,
+            param_contab,
+            excepciones,
+            descuentos,
+            gasto,
+            FECHA_VALORACION,
         ),
         prep_data.prep_input_onerosidad(onerosidad, param_contab, FECHA_VALORACION),
         prep_data.prep_input_prima_directo(
             camara_soat, param_contab, excepciones, FECHA_VALORACION
         ),
         # prepara insumos reaseguro
-        prep_data.prep_input_prima_rea(
-            cesion_rea, param_contab, excepciones, FECHA_VALORACION
-        ),
-        prep_data.prep_input_dcto_rea(
-            cesion_rea, param_contab, excepciones, descuentos, FECHA_VALORACION
-        ),
-        prep_data.prep_input_gasto_rea(
-            cesion_rea, param_contab, excepciones, gasto, FECHA_VALORACION
+        prep_data.prep_inputs_base_comun(
+            cesion_rea,
+            param_contab,
+            excepciones,
+            descuentos,
+            gasto,
+            FECHA_VALORACION,
+            reaseguro=True,
         ),
         prep_data.prep_input_comi_rea(
             comision_rea, param_contab, excepciones, FECHA_VALORACION
@@ -127,35 +221,206 @@ def run_pcr():
         ),
     ]
 
-    input_consolidado = pl.concat(
-        aux_tools.alinear_esquemas(insumos_devengo), how="diagonal"
-    )
-    # devuelve la base ya devengada, con las columnas de movimientos saldos y de fluctuación
-    output_devengo_fluct = (
-        devg.devengar(input_consolidado, FECHA_VALORACION)
-        .pipe(fluc.calc_fluctuacion, tasa_cambio)
-        .pipe(det.calc_deterioro, riesgo_credito, FECHA_VALORACION)
+    # los insumos ya vienen con el esquema del input de devengo (ver src/esquemas.py)
+    input_consolidado = esquemas.consolidar_input_devengo(insumos_devengo)
+    # las categóricas usan un cache de textos propio de la ejecución (anidado en el de
+    # los bloques si lo hay) y los outputs se entregan con texto, como sin codificar
+    with pl.StringCache():
+        if p.CODIFICAR_CATEGORICAS:
+            # desde el devengo las columnas de baja cardinalidad van como categóricas
+            categorias.activar(param_contab, tabla_nomenclatura)
+            input_consolidado = categorias.codificar(input_consolidado)
+        if p.DEVENGO_INCREMENTAL:
+            # solo se devenga lo que no quedo cerrado en el estado del cierre anterior
+            estado_devengo = aux_tools.materializar(
+                inc.devengar_incremental(
+                    input_consolidado,
+                    FECHA_VALORACION,
+                    # el estado se lee lazy, solo se materializa lo que cruza con el input
+                    inc.leer_estado(inc.cierre_anterior(FECHA_VALORACION), lazy=True),
+                )
+            )
+            inc.guardar_estado(estado_devengo, FECHA_VALORACION, bloque)
+            output_devengo = estado_devengo.lazy() if lazy else estado_devengo
+        else:
+            output_devengo = devg.devengar(input_consolidado, FECHA_VALORACION)
+        if p.CODIFICAR_CATEGORICAS:
+            # columnas que el devengo crea como texto
+            output_devengo = categorias.codificar(output_devengo)
+
+        # devuelve la base ya devengada, con las columnas de movimientos saldos y de fluctuación
+        # el output queda con su esquema declarado aunque alguna regla de devengo no tenga
+        # registros, así los bloques y fragmentos se escriben con las mismas columnas
+        output_devengo_fluct = aux_tools.materializar(
+            output_devengo.pipe(fluc.calc_fluctuacion, tasa_cambio)
+            .pipe(det.calc_deterioro, riesgo_credito, FECHA_VALORACION)
+            .pipe(esquemas.conformar_output, esquemas.ESQUEMA_OUTPUT_DEVENGO)
+        )
+
+        # Insumos no devengables
+        insumos_no_devengo = [
+            prep_data.prep_input_cartera(cartera, param_contab, FECHA_VALORACION),
+            prep_data.prep_input_cartera(
+                cuenta_corriente, param_contab, FECHA_VALORACION
+            ),
+        ]
+        if p.CODIFICAR_CATEGORICAS:
+            insumos_no_devengo = [categorias.codificar(df) for df in insumos_no_devengo]
+
+        # convierte a output contable
+        # el output de devengo ya materializado se reusa como punto de partida del output contable
+        output_contable = aux_tools.materializar(
+            mapcont.gen_output_contable(
+                output_devengo_fluct.lazy() if lazy else output_devengo_fluct,
+                input_map_bts,
+                input_tipo_seguro,
+                tabla_nomenclatura,
+                insumos_no_devengo,
+                mapeo_bt,
+            )
+            .pipe(mapcont.agregar_marca_onerosidad, onerosidad, FECHA_VALORACION)
+            .pipe(esquemas.conformar_output, esquemas.ESQUEMA_OUTPUT_CONTABLE)
+        )
+        if p.DIAGNOSTICO_CRUCES:
+            diag.reportar_mapeo_bt(diag.diagnosticar_mapeo_bt(output_contable))
+
+    return (
+        categorias.decodificar(output_devengo_fluct),
+        categorias.decodificar(output_contable),
     )
-    output_devengo_fluct.write_excel(p.RUTA_SALIDA_DEVENGO)
 
-    # Insumos no devengables
-    insumos_no_devengo = [
-        prep_data.prep_input_cartera(cartera, param_contab, FECHA_VALORACION),
-        prep_data.prep_input_cartera(cuenta_corriente, param_contab, FECHA_VALORACION),
-    ]
 
-    # convierte a output contable
-    output_contable = mapcont.gen_output_contable(
-        output_devengo_fluct,
-        input_map_bts,
-        input_tipo_seguro,
-        tabla_nomenclatura,
-        insumos_no_devengo,
-    ).pipe(mapcont.agregar_marca_onerosidad, onerosidad, FECHA_VALORACION)
-    output_contable.write_excel(p.RUTA_SALIDA_CONTABLE)
+def run_pcr(
+    lazy: bool = False,
+    insumos: dict[str, pl.DataFrame | pl.LazyFrame] | None = None,
+):
+    """
+    Ejecuta el proceso completo de la PCR y exporta los outputs con src/salidas.py.
+    Los insumos de excel se leen a través del cache columnar de src/cache_insumos.py,
+    salvo que se pasen ya leídos (por ejemplo los sintéticos de benchmarks/generador.py).
+    Con lazy=True la cadena de pasos se construye sobre pl.LazyFrame y solo se colecta
+    en los puntos de control: los cruces en DuckDB, el output de devengo y el output contable
+    """
+    # una sola sesión de DuckDB para todos los cruces de la ejecución
+    with perfilador.perfilar("run_pcr", lazy=lazy), sesion_duckdb.sesion():
+        if insumos is None:
+            with perfilador.etapa("leer_insumos"):
+                insumos = leer_insumos(lazy)
+        if p.DIAGNOSTICO_CRUCES:
+            diagnosticar_insumos(insumos)
+        if p.DEVENGO_INCREMENTAL:
+            inc.reiniciar_estado(FECHA_VALORACION)
+
+        with perfilador.etapa("calcular_pcr"):
+            output_devengo_fluct, output_contable = calcular_pcr(insumos, lazy)
+        with perfilador.etapa("escribir_salidas"):
+            salidas.escribir_salida(output_devengo_fluct, p.RUTA_SALIDA_DEVENGO)
+            salidas.escribir_salida(output_contable, p.RUTA_SALIDA_CONTABLE)
 
     return output_devengo_fluct, output_contable
 
 
+def run_pcr_por_bloques(
+    filas_por_bloque: int | None = None,
+    insumos: dict[str, pl.LazyFrame] | None = None,
+) -> tuple[Path, Path]:
+    """
+    Ejecuta el proceso por bloques de cartera (ver src/bloques.py) para acotar la memoria:
+    los insumos se leen en modo lazy desde el cache, cada bloque se calcula por separado
+    y su output se escribe a disco antes de pasar al siguiente, en una subcarpeta
+    bloque=i de cada ruta de salida. Devuelve las rutas de los dos outputs.
+    Los insumos se pueden pasar ya leídos, en modo lazy
+    """
+    with perfilador.perfilar(
+        "run_pcr_por_bloques", filas_por_bloque=filas_por_bloque or p.FILAS_POR_BLOQUE
+    ):
+        if insumos is None:
+            with perfilador.etapa("leer_insumos"):
+                insumos = leer_insumos(lazy=True)
+        if p.DIAGNOSTICO_CRUCES:
+            diagnosticar_insumos(insumos)
+        if p.DEVENGO_INCREMENTAL:
+            inc.reiniciar_estado(FECHA_VALORACION)
+
+        n_bloques = bloques.contar_bloques(
+            insumos, filas_por_bloque or p.FILAS_POR_BLOQUE
+        )
+        rutas = [Path(p.RUTA_SALIDA_DEVENGO), Path(p.RUTA_SALIDA_CONTABLE)]
+        # se limpian las salidas de ejecuciones anteriores, pueden tener otros bloques
+        for ruta in rutas:
+            shutil.rmtree(ruta, ignore_errors=True)
+
+        # los parámetros quedan registrados en la sesión y el mapeo de BTs compilado
+        # se reusa para todos los bloques, con sus categóricas en el mismo cache de textos
+        mapeo_bt = {}
+        with sesion_duckdb.sesion(), pl.StringCache():
+            for bloque in range(n_bloques):
+                insumos_bloque = bloques.filtrar_bloque(insumos, bloque, n_bloques)
+                with perfilador.etapa(f"bloque={bloque}"):
+                    outputs = calcular_pcr(
+                        insumos_bloque, lazy=True, bloque=bloque, mapeo_bt=mapeo_bt
+                    )
+                    for output, ruta in zip(outputs, rutas):
+                        salidas.escribir_salida(output, ruta / f"bloque={bloque}")
+                del insumos_bloque, outputs
+                gc.collect()
+
+        return rutas[0], rutas[1]
+
+
+def procesar_fragmento(
+    rutas_insumos: dict[str, Path],
+    rutas_salida: list[Path],
+    ramo: str | None,
+    indice: int,
+) -> None:
+    """
+    Calcula un ramo dentro de un proceso del pool leyendo los insumos compartidos
+    y escribe sus outputs en la subcarpeta fragmento=ramo de cada ruta de salida
+    """
+    with sesion_duckdb.sesion():
+        insumos = paralelo.filtrar_fragmento(
+            paralelo.leer_insumos_compartidos(rutas_insumos), ramo
+        )
+        outputs = calcular_pcr(insumos, lazy=True, bloque=indice)
+        for output, ruta in zip(outputs, rutas_salida):
+            salidas.escribir_salida(output, ruta / f"fragmento={ramo}")
+
+
+def run_pcr_paralelo(procesos: int | None = None) -> tuple[Path, Path]:
+    """
+    Ejecuta el proceso por ramo en un pool de procesos (ver src/paralelo.py).
+    Los ramos son independientes para el devengo, cada uno escribe su output en
+    una subcarpeta fragmento=ramo de cada ruta de salida. Devuelve las rutas de los outputs
+    """
+    insumos = leer_insumos(lazy=True)
+    if p.DIAGNOSTICO_CRUCES:
+        diagnosticar_insumos(insumos)
+    if p.DEVENGO_INCREMENTAL:
+        inc.reiniciar_estado(FECHA_VALORACION)
+
+    rutas = [Path(p.RUTA_SALIDA_DEVENGO), Path(p.RUTA_SALIDA_CONTABLE)]
+    for ruta in rutas:
+        shutil.rmtree(ruta, ignore_errors=True)
+
+    ramos = paralelo.valores_fragmento(insumos)
+    procesos = min(procesos or p.PROCESOS_PARALELOS or os.cpu_count() or 1, len(ramos))
+    with tempfile.TemporaryDirectory() as carpeta:
+        rutas_insumos = paralelo.compartir_insumos(insumos, Path(carpeta))
+        with paralelo.pool_procesos(max(procesos, 1)) as pool:
+            # list() para propagar los errores de los procesos
+            list(
+                pool.map(
+                    procesar_fragmento,
+                    repeat(rutas_insumos),
+                    repeat(rutas),
+                    ramos,
+                    range(len(ramos)),
+                )
+            )
+
+    return rutas[0], rutas[1]
+
+
 if __name__ == "__main__":
     run_pcr()
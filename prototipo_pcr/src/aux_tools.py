@@ -61,14 +61,33 @@ def calcular_dias_diferencia(
     return (fecha_fin - fecha_inicio).dt.total_days() + int(incluir_extremos)
 
 
-def alinear_esquemas(dataframes: list[pl.DataFrame]) -> list[pl.DataFrame]:
+def igualar_tipo_frame(
+    df: pl.DataFrame, referencia: pl.DataFrame | pl.LazyFrame
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Devuelve el resultado de un cruce en DuckDB como LazyFrame cuando la base de entrada es lazy,
+    así el modo lazy de run_pcr se conserva a lo largo de la cadena de pasos
+    """
+    return df.lazy() if isinstance(referencia, pl.LazyFrame) else df
+
+
+def materializar(df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame:
+    """
+    Colecta el plan cuando el frame es lazy, se usa en los puntos de control explícitos del proceso
+    """
+    return df.collect() if isinstance(df, pl.LazyFrame) else df
+
+
+def alinear_esquemas(
+    dataframes: list[pl.DataFrame | pl.LazyFrame],
+) -> list[pl.DataFrame | pl.LazyFrame]:
     """
     Alinea los tipos de datos y esquema de varios dataframes para poder unirlos
     """
     # Obtener el conjunto de todas las columnas y sus tipos más amplios
     columnas_union = {}
     for df in dataframes:
-        for nombre, dtype in zip(df.columns, df.dtypes):
+        for nombre, dtype in df.collect_schema().items():
             # Si la columna ya existe, elige el tipo más amplio (por ejemplo, Float64 > Int64)
             if nombre in columnas_union:
                 actual = columnas_union[nombre]
@@ -80,7 +99,8 @@ def alinear_esquemas(dataframes: list[pl.DataFrame]) -> list[pl.DataFrame]:
     # Convertir cada DataFrame al esquema común
     dataframes_ajustados = []
     for df in dataframes:
-        cols_faltantes = [col for col in columnas_union if col not in df.columns]
+        columnas_df = df.collect_schema().names()
+        cols_faltantes = [col for col in columnas_union if col not in columnas_df]
         # Agregar columnas faltantes como nulas
         for col in cols_faltantes:
             df = df.with_columns(pl.lit(None).cast(columnas_union[col]).alias(col))
@@ -112,12 +132,14 @@ def estandarizar_columnas(df: pl.DataFrame) -> pl.DataFrame:
     return df.rename(dict(zip(df.columns, columnas_nuevas)))
 
 
-def agregar_cohorte_dinamico(df: pl.DataFrame) -> pl.DataFrame:
+def agregar_cohorte_dinamico(
+    df: pl.DataFrame | pl.LazyFrame,
+) -> pl.DataFrame | pl.LazyFrame:
     """
     La cohorte depende del tipo de contrato,
     por lo cual debe usar columnas distintas que deben aparecer en el insumo
     """
-    columnas = df.columns
+    columnas = df.collect_schema().names()
     tiene_col_directo = "fecha_expedicion_poliza" in columnas
     tiene_col_rea = "fe_ini_vig_contrato_reaseguro" in columnas
     if tiene_col_directo and tiene_col_rea:
@@ -0,0 +1,71 @@
+"""
+Partición de la cartera en bloques para ejecutar el proceso con memoria acotada.
+Cada registro de los insumos de cartera se asigna a un bloque por el hash de sus llaves
+estables (compañía, ramo y póliza), así los cruces entre insumos de cartera, como
+descuentos u onerosidad, quedan dentro del mismo bloque. Los insumos transversales
+(parámetros, tasas, curvas) se comparten completos con todos los bloques.
+"""
+
+import math
+
+import polars as pl
+import src.aux_tools as aux_tools
+
+# llaves con las que se cruzan entre sí los insumos de cartera
+LLAVES_BLOQUE = ["compania", "ramo_sura", "poliza"]
+# insumos que se parten por bloque, el resto son transversales
+INSUMOS_CARTERA = [
+    "produccion_dir",
+    "descuentos",
+    "cesion_rea",
+    "comision_rea",
+    "costo_contrato_rea",
+    "camara_soat",
+    "onerosidad",
+    "recup_onerosidad",
+    "cartera",
+    "cuenta_corriente",
+]
+
+
+def asignar_bloque(columnas: list[str], n_bloques: int) -> pl.Expr:
+    """
+    Bloque de cada registro según las llaves que tenga el insumo. La póliza llega como
+    texto o como entero según el insumo, por eso las llaves se comparan como texto
+    """
+    llaves = [col for col in LLAVES_BLOQUE if col in columnas]
+    if not llaves:
+        return pl.lit(0, dtype=pl.UInt64)
+    llave = pl.struct([pl.col(col).cast(pl.String) for col in llaves])
+    return llave.hash(seed=0) % n_bloques
+
+
+def contar_bloques(
+    insumos: dict[str, pl.DataFrame | pl.LazyFrame], filas_por_bloque: int
+) -> int:
+    """
+    Cantidad de bloques para que el insumo de cartera más grande quede en bloques
+    de a lo sumo filas_por_bloque filas en promedio
+    """
+    filas = max(
+        aux_tools.materializar(insumos[nombre].select(pl.len())).item()
+        for nombre in INSUMOS_CARTERA
+        if nombre in insumos
+    )
+    return max(1, math.ceil(filas / filas_por_bloque))
+
+
+def filtrar_bloque(
+    insumos: dict[str, pl.DataFrame | pl.LazyFrame], bloque: int, n_bloques: int
+) -> dict[str, pl.DataFrame | pl.LazyFrame]:
+    """
+    Insumos del bloque: los de cartera filtrados y los transversales completos
+    """
+    return {
+        nombre: (
+            df.filter(asignar_bloque(df.collect_schema().names(), n_bloques) == bloque)
+            if nombre in INSUMOS_CARTERA
+            else df
+        )
+        for nombre, df in insumos.items()
+    }
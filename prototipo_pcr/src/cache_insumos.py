@@ -0,0 +1,124 @@
+"""
+Capa de staging de insumos: convierte cada hoja de excel a Arrow IPC una sola vez
+y en las ejecuciones siguientes lee el archivo columnar con memory-map,
+mientras el archivo fuente no haya cambiado
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+import polars as pl
+import src.parametros as params
+
+
+def hash_archivo(ruta: Path) -> str:
+    """
+    Calcula el sha256 del archivo fuente leyéndolo por bloques
+    """
+    digest = hashlib.sha256()
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def rutas_cache(ruta: Path, hoja: str | None) -> tuple[Path, Path]:
+    """
+    Devuelve la ruta del archivo IPC cacheado y la de sus metadatos para una hoja de un libro
+    """
+    # libros con el mismo nombre en carpetas distintas no comparten cache
+    carpeta = hashlib.sha256(str(ruta.resolve()).encode()).hexdigest()[:12]
+    nombre = f"{ruta.stem}__{hoja or 'primera_hoja'}__{carpeta}"
+    return (
+        params.RUTA_CACHE_INSUMOS / f"{nombre}.arrow",
+        params.RUTA_CACHE_INSUMOS / f"{nombre}.json",
+    )
+
+
+def reemplazar(destino: Path, escribir: Callable[[Path], None]) -> None:
+    """
+    Escribe en un temporal de la misma carpeta y lo mueve al destino con os.replace,
+    así una ejecución interrumpida o concurrente no deja un archivo a medio escribir
+    """
+    descriptor, temporal = tempfile.mkstemp(
+        dir=destino.parent, prefix=f".{destino.name}.", suffix=".tmp"
+    )
+    os.close(descriptor)
+    try:
+        escribir(Path(temporal))
+        os.replace(temporal, destino)
+    except BaseException:
+        Path(temporal).unlink(missing_ok=True)
+        raise
+
+
+def cache_vigente(ruta: Path, ruta_meta: Path, opciones: str) -> bool:
+    """
+    El cache es vigente si el archivo fuente tiene el mismo mtime y tamaño que al convertirlo,
+    o si cambió el mtime pero el contenido (hash) es el mismo
+    """
+    if not ruta_meta.exists():
+        return False
+    meta = json.loads(ruta_meta.read_text())
+    estado = ruta.stat()
+    if meta["opciones"] != opciones or meta["tamano"] != estado.st_size:
+        return False
+    if meta["mtime_ns"] == estado.st_mtime_ns:
+        return True
+    # el archivo se tocó pero puede no haber cambiado, se compara el contenido
+    if meta["sha256"] != hash_archivo(ruta):
+        return False
+    meta["mtime_ns"] = estado.st_mtime_ns
+    reemplazar(ruta_meta, lambda temporal: temporal.write_text(json.dumps(meta)))
+    return True
+
+
+def convertir_hoja(
+    ruta: Path, hoja: str | None, ruta_ipc: Path, ruta_meta: Path, opciones: str, **kwargs
+) -> None:
+    """
+    Lee la hoja de excel y la guarda como Arrow IPC sin compresión para poder mapearla en memoria.
+    El IPC se reemplaza antes que los metadatos: si el proceso se interrumpe entre los dos,
+    los metadatos anteriores no coinciden con la fuente y la hoja se vuelve a convertir
+    """
+    estado = ruta.stat()
+    df = pl.read_excel(ruta, sheet_name=hoja, **kwargs)
+    params.RUTA_CACHE_INSUMOS.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "fuente": str(ruta),
+        "hoja": hoja,
+        "opciones": opciones,
+        "mtime_ns": estado.st_mtime_ns,
+        "tamano": estado.st_size,
+        "sha256": hash_archivo(ruta),
+    }
+    reemplazar(
+        ruta_ipc, lambda temporal: df.write_ipc(temporal, compression="uncompressed")
+    )
+    reemplazar(ruta_meta, lambda temporal: temporal.write_text(json.dumps(meta)))
+
+
+def leer_insumo(
+    ruta: Path, hoja: str | None = None, lazy: bool = False, **kwargs
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Lee una hoja de un insumo de excel pasando por el cache columnar.
+    Los kwargs se pasan a pl.read_excel y hacen parte de la llave del cache.
+    """
+    ruta = Path(ruta)
+    if not params.USAR_CACHE_INSUMOS:
+        df = pl.read_excel(ruta, sheet_name=hoja, **kwargs)
+        return df.lazy() if lazy else df
+
+    ruta_ipc, ruta_meta = rutas_cache(ruta, hoja)
+    opciones = json.dumps(kwargs, sort_keys=True, default=str)
+    if not (ruta_ipc.exists() and cache_vigente(ruta, ruta_meta, opciones)):
+        convertir_hoja(ruta, hoja, ruta_ipc, ruta_meta, opciones, **kwargs)
+
+    if lazy:
+        return pl.scan_ipc(ruta_ipc, memory_map=True)
+    return pl.read_ipc(ruta_ipc, memory_map=True)
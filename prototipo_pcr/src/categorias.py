@@ -0,0 +1,86 @@
+"""
+Codificación categórica de las columnas de texto de baja cardinalidad.
+El input consolidado se codifica a la entrada del devengo y las columnas se mantienen
+codificadas hasta el output contable: los cruces en polars son entre categóricas del
+mismo cache de textos y DuckDB las recibe como ENUM, sus resultados se vuelven a
+codificar en sesion_duckdb.consultar. El cache de textos es el de la ejecución
+(pl.StringCache en main.calcular_pcr) y los outputs se entregan decodificados. Se usa pl.Categorical y no pl.Enum porque el
+proceso compara y construye estas columnas con literales que no están en los parámetros
+"""
+
+import polars as pl
+
+COLUMNAS_CATEGORICAS = [
+    "tipo_insumo",
+    "tipo_negocio",
+    "tipo_contabilidad",
+    "componente",
+    "clasificacion_adicional",
+    "tipo_contrato",
+    "regla_devengo",
+    "estado_devengo",
+    "moneda",
+    "ramo_sura",
+    "compania",
+    "anio_liberacion",
+    "transicion",
+]
+
+
+def activar(
+    param_contabilidad: pl.DataFrame | pl.LazyFrame | None = None,
+    tabla_nomenclatura: pl.DataFrame | pl.LazyFrame | None = None,
+) -> None:
+    """
+    Registra en el cache de textos activo los valores conocidos de los parámetros antes
+    que los de la cartera, así su código no depende del orden en que aparecen en ella.
+    Se llama dentro de un pl.StringCache para que las categóricas de distintos insumos
+    tengan la misma codificación
+    """
+    if param_contabilidad is not None:
+        columnas = param_contabilidad.collect_schema().names()
+        param_contabilidad.lazy().select(
+            pl.col(col).unique(maintain_order=True).cast(pl.Categorical).implode()
+            for col in COLUMNAS_CATEGORICAS
+            if col in columnas
+        ).collect()
+    if tabla_nomenclatura is not None:
+        tabla_nomenclatura.lazy().select(
+            pl.col("prototipo").cast(pl.String).cast(pl.Categorical)
+        ).collect()
+
+
+def codificar(
+    df: pl.DataFrame | pl.LazyFrame, columnas: list[str] | None = None
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Convierte a categóricas las columnas de texto de COLUMNAS_CATEGORICAS (o las indicadas)
+    """
+    columnas = COLUMNAS_CATEGORICAS if columnas is None else columnas
+    esquema = df.collect_schema()
+    return df.with_columns(
+        pl.col(col).cast(pl.Categorical)
+        for col in columnas
+        if esquema.get(col) == pl.String
+    )
+
+
+def decodificar(df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Devuelve a texto las columnas categóricas
+    """
+    return df.with_columns(pl.col(pl.Categorical).cast(pl.String))
+
+
+def categoricas(tablas: list[pl.DataFrame | pl.LazyFrame]) -> list[str]:
+    """
+    Columnas categóricas de alguna de las tablas
+    """
+    return list(
+        dict.fromkeys(
+            col
+            for tabla in tablas
+            for col, tipo in tabla.collect_schema().items()
+            if tipo == pl.Categorical
+        )
+    )
@@ -0,0 +1,83 @@
+"""
+Motor de resolución de tablas de parámetros con comodines ('*').
+Cada patrón de comodines presente en la tabla se vuelve una tabla de búsqueda por sus
+columnas específicas y se cruza con un hash join exacto; gana el patrón con menos
+comodines. Se conserva el orden de la base sin ordenar globalmente.
+"""
+
+import polars as pl
+import src.aux_tools as aux_tools
+
+
+def patrones_por_prioridad(
+    parametros: pl.DataFrame, llaves_comodin: list[str], comodin: str = "*"
+) -> list[tuple[list[str], pl.DataFrame]]:
+    """
+    Agrupa la tabla de parámetros por patrón de comodines y devuelve, en orden de
+    prioridad (menos comodines primero), las llaves específicas y las filas de cada patrón
+    """
+    marcas = [f"_comodin_{col}" for col in llaves_comodin]
+    grupos = parametros.with_columns(
+        [
+            (pl.col(col) == comodin).fill_null(False).alias(marca)
+            for col, marca in zip(llaves_comodin, marcas)
+        ]
+    ).partition_by(marcas, as_dict=True, include_key=False)
+    # a igual número de comodines el orden entre patrones es fijo para ser determinístico
+    patrones = sorted(grupos.items(), key=lambda item: (sum(item[0]), item[0]))
+    return [
+        ([col for col, es_comodin in zip(llaves_comodin, patron) if not es_comodin], df)
+        for patron, df in patrones
+    ]
+
+
+def resolver_comodines(
+    base: pl.DataFrame,
+    parametros: pl.DataFrame,
+    llaves_exactas: list[str],
+    llaves_comodin: list[str],
+    columnas_valor: list[str],
+    comodin: str = "*",
+) -> pl.DataFrame:
+    """
+    Agrega a la base las columnas_valor del parámetro más específico que le aplica.
+    Las llaves_exactas siempre deben coincidir, las llaves_comodin coinciden por valor
+    o porque el parámetro tiene el comodín. Sin parámetro que aplique quedan nulas.
+    """
+    # la tabla de parámetros es pequeña, se compila siempre materializada
+    parametros = aux_tools.materializar(parametros)
+    esquema_base = base.collect_schema()
+
+    marcas = []
+    for i, (llaves_patron, grupo) in enumerate(
+        patrones_por_prioridad(parametros, llaves_comodin, comodin)
+    ):
+        llaves = llaves_exactas + llaves_patron
+        marca = f"_patron_{i}"
+        marcas.append(marca)
+        # ante parámetros repetidos en un mismo patrón se usa el primero
+        busqueda = (
+            grupo.select(
+                [pl.col(col).cast(esquema_base[col]) for col in llaves]
+                + [pl.col(col).alias(f"{col}{marca}") for col in columnas_valor]
+            )
+            .unique(subset=llaves, keep="first", maintain_order=True)
+            .with_columns(pl.lit(True).alias(marca))
+        )
+        base = base.join(
+            aux_tools.igualar_tipo_frame(busqueda, base),
+            on=llaves,
+            how="left",
+            maintain_order="left",
+        )
+
+    def valor_prioritario(col: str) -> pl.Expr:
+        # el primer patrón que cruzó en orden de prioridad
+        expr = pl.lit(None, dtype=parametros.schema[col])
+        for marca in reversed(marcas):
+            expr = pl.when(pl.col(marca)).then(pl.col(f"{col}{marca}")).otherwise(expr)
+        return expr.alias(col)
+
+    return base.with_columns(
+        [valor_prioritario(col) for col in columnas_valor]
+    ).drop(marcas + [f"{col}{marca}" for col in columnas_valor for marca in marcas])
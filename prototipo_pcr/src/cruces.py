@@ -1,13 +1,18 @@
 import polars as pl
-import duckdb
+import src.aux_tools as aux_tools
+import src.comodines as comodines
+import src.indice_tasas as indice_tasas
+import src.parametros as params
+import src.sesion_duckdb as sesion_duckdb
 
 
 # Cruza tipo de insumo con todos los parametros contabilidad que le aplican
 def cruzar_param_contabilidad(
-    base: pl.DataFrame, param_contabilidad: pl.DataFrame
+    base: pl.DataFrame, param_contabilidad: pl.DataFrame, restriccion_parcial=False
 ) -> pl.DataFrame:
+    filtro = ""
     # Si tipo cont viene en base, se eliminan combinaciones invalidas y se debe usar es la de param_cont
-    if "tipo_contabilidad" in base.columns:
+    if "tipo_contabilidad" in base.collect_schema().names():
         join_kind = (
             "INNER"  # usa un inner join para conservar solo combinaciones válidas
         )
@@ -15,9 +20,18 @@ def cruzar_param_contabilidad(
         exclude = (
             "EXCLUDE (tipo_contabilidad)"  # excluye tipo_contabilidad que trae la base
         )
+        # en bases apiladas solo las filas con tipo_contabilidad se restringen a la suya,
+        # las filas con tipo_contabilidad nulo se cruzan como si la columna no existiera
+        if restriccion_parcial:
+            join_kind = "LEFT"
+            tipocont_key = """AND (
+                    b.tipo_contabilidad IS NULL
+                    OR b.tipo_contabilidad = param_cont.tipo_contabilidad
+                )"""
+            filtro = "WHERE b.tipo_contabilidad IS NULL OR param_cont.tipo_insumo IS NOT NULL"
     else:
         join_kind, tipocont_key, exclude = "LEFT", "", ""
-    return duckdb.sql(
+    resultado = sesion_duckdb.consultar(
         f"""
         SELECT
              b.* {exclude}
@@ -32,8 +46,12 @@ def cruzar_param_contabilidad(
                 ON b.tipo_insumo = param_cont.tipo_insumo
                 AND b.tipo_negocio = param_cont.tipo_negocio
                 {tipocont_key}
-        """
-    ).pl()
+        {filtro}
+        """,
+        {"base": base},
+        {"param_contabilidad": param_contabilidad},
+    )
+    return aux_tools.igualar_tipo_frame(resultado, base)
 
 
 # Cruza porcentaje descuento con produccion
@@ -43,7 +61,7 @@ def cruzar_descuento(
 ) -> pl.DataFrame:
     # usa sufijo de rea para que cruce el dscto con el recibo de rea y no del directo
     suffix_rea = "_rea" if reaseguro else ""
-    return duckdb.sql(
+    resultado = sesion_duckdb.consultar(
         f"""
         SELECT
             prod.*
@@ -66,130 +84,89 @@ def cruzar_descuento(
                 AND prod.tipo_op = dcto.tipo_op
                 AND prod.producto = dcto.producto
                 AND prod.numero_documento_sap = dcto.numero_documento_sap
-        """
-    ).pl()
+        """,
+        {"produccion": produccion, "descuento": descuento},
+    )
+    return aux_tools.igualar_tipo_frame(resultado, produccion)
 
 # Cruza produccion y gastos segun el nivel de detalle encontrado en la tabla gasto
-def cruzar_gastos_expedicion(
-    produccion: pl.DataFrame, gastos: pl.DataFrame, reaseguro=False
-) -> pl.DataFrame:
+# Niveles de prioridad del cruce de gastos: filtro del nivel en la tabla de gastos
+# y llaves exactas adicionales a compania y ramo con las que se cruza ese nivel.
+# canal = '*' con producto especifico no tiene prioridad (NULL) y queda de ultimo
+NIVELES_GASTOS = [
+    (1, "canal <> '*' AND producto <> '*'", ["canal", "producto"]),
+    (2, "canal <> '*' AND producto = '*'", ["canal"]),
+    (3, "canal = '*' AND producto = '*'", []),
+    (None, "canal = '*' AND producto <> '*'", ["producto"]),
+]
+
+
+def sql_candidatos_gastos() -> str:
     """
-    Cruza base de primas con los porcentajes de gasto correspondientes,
-    como el cruce puede ser anterior al cruce con parametros, garantiza que
-    en este cruce aparezcan todas las combinaciones de la prima con tipo_contabilidad.
-    Evita duplicados usando prioridad de coincidencia para usar comodines correctamente
+    Gastos candidatos de cada recibo de la tabla produccion con su prioridad_match.
+    Cada nivel de comodin se cruza por separado con llaves exactas para que DuckDB
+    use hash joins. El rango de fechas se deja a proposito como filtro BETWEEN del
+    join: solo se evalua sobre los gastos de la misma llave y un ASOF JOIN sobre los
+    inicios de vigencia resulto mas lento (de 1.2 s a 60 s con 500 mil recibos y 20
+    mil gastos, la produccion llega a DuckDB como tabla de Arrow)
     """
-    validacion = duckdb.sql("""
-        WITH gastos_priorizados AS (
+    return "\n            UNION ALL\n".join(
+        f"""
             SELECT
-                g.*,
-                CASE 
-                    WHEN canal <> '*' AND producto <> '*' THEN 1
-                    WHEN canal <> '*' AND producto = '*' THEN 2
-                    WHEN canal = '*' AND producto = '*' THEN 3
-                END AS prioridad_match
-            FROM gastos g
-        ),
-        cruce AS (
-            SELECT 
                 prod.*,
                 g.tipo_contabilidad,
                 g.tipo_gasto,
                 g.porc_gasto,
-                g.prioridad_match,
-                ROW_NUMBER() OVER (
-                    PARTITION BY 
-                        prod.tipo_op,
-                        prod.tipo_insumo,
-                        prod.poliza,
-                        prod.poliza_certificado,
-                        prod.recibo,
-                        prod.amparo,
-                        prod.cdsubgarantia,
-                        prod.numero_documento_sap,
-                        g.tipo_gasto,
-                        g.tipo_contabilidad
-                    ORDER BY g.prioridad_match
-                ) AS rn
+                CAST({"NULL" if prioridad is None else prioridad} AS INTEGER)
+                    AS prioridad_match
             FROM produccion AS prod
-            JOIN gastos_priorizados AS g
+            JOIN (SELECT * FROM gastos WHERE {filtro}) AS g
                 ON prod.compania = g.compania
                 AND prod.ramo_sura = g.ramo_sura
-                AND (prod.canal = g.canal OR g.canal = '*')
-                AND (prod.producto = g.producto OR g.producto = '*')
-                AND prod.fecha_expedicion_poliza BETWEEN g.fecha_inicio AND g.fecha_fin
-        ),
-        tamaños AS (
-            SELECT 
-                tipo_gasto,
-                COUNT(*) AS rows_in_partition
-            FROM cruce
-            GROUP BY 
-                tipo_op,
-                tipo_insumo,
-                poliza,
-                poliza_certificado,
-                recibo,
-                amparo,
-                cdsubgarantia,
-                tipo_gasto,
-                numero_documento_sap
-        )
-        SELECT 
-            rows_in_partition,
-            LIST(DISTINCT tipo_gasto) AS tipo_gasto_unicos
-        FROM tamaños
-        GROUP BY rows_in_partition
-        ORDER BY rows_in_partition;
-    """)
-    #print(validacion)
+                {"".join(f"AND prod.{llave} = g.{llave} " for llave in llaves)}
+                AND prod.fecha_expedicion_poliza BETWEEN g.fecha_inicio AND g.fecha_fin"""
+        for prioridad, filtro, llaves in NIVELES_GASTOS
+    )
+
 
+def cruzar_gastos_expedicion(
+    produccion: pl.DataFrame, gastos: pl.DataFrame, reaseguro=False
+) -> pl.DataFrame:
+    """
+    Cruza base de primas con los porcentajes de gasto correspondientes,
+    como el cruce puede ser anterior al cruce con parametros, garantiza que
+    en este cruce aparezcan todas las combinaciones de la prima con tipo_contabilidad.
+    Evita duplicados usando prioridad de coincidencia para usar comodines correctamente.
+    """
     # El cruce debe ser por fecha expedición póliza y no por fecha de contabilización
-    return duckdb.sql("""
+    resultado = sesion_duckdb.consultar(f"""
         -- prioridad de cruce por comodin para evitar duplicados
-        WITH gastos_priorizados AS (
-            SELECT
-                g.*,
-                CASE 
-                    WHEN canal <> '*' AND producto <> '*' THEN 1  
-                    WHEN canal <> '*' AND producto = '*' THEN 2
-                    WHEN canal = '*' AND producto = '*' THEN 3
-                END AS prioridad_match
-            FROM gastos g
+        WITH candidatos AS ({sql_candidatos_gastos()}
         ),
         cruce AS (
-            SELECT 
-                prod.*,
-                g.tipo_contabilidad,
-                g.tipo_gasto,
-                g.porc_gasto,
-                g.prioridad_match,
+            SELECT
+                *,
                 ROW_NUMBER() OVER (
-                    PARTITION BY 
-                        prod.numero_documento_sap,
-                        prod.tipo_op,
-                        prod.tipo_insumo,
-                        prod.poliza,
-                        prod.poliza_certificado,
-                        prod.recibo,
-                        prod.amparo,
-                        prod.cdsubgarantia,
-                        g.tipo_gasto,
-                        g.tipo_contabilidad
-                    ORDER BY g.prioridad_match
+                    PARTITION BY
+                        numero_documento_sap,
+                        tipo_op,
+                        tipo_insumo,
+                        poliza,
+                        poliza_certificado,
+                        recibo,
+                        amparo,
+                        cdsubgarantia,
+                        tipo_gasto,
+                        tipo_contabilidad
+                    ORDER BY prioridad_match
                 ) AS rn
-            FROM produccion AS prod
-            JOIN gastos_priorizados g
-                ON prod.compania = g.compania
-                AND prod.ramo_sura = g.ramo_sura
-                AND (prod.canal = g.canal OR g.canal = '*')
-                AND (prod.producto = g.producto OR g.producto = '*')
-                AND prod.fecha_expedicion_poliza BETWEEN g.fecha_inicio AND g.fecha_fin
+            FROM candidatos
         )
-        SELECT * 
+        SELECT *
         FROM cruce
         WHERE rn = 1
-    """).pl()
+    """, {"produccion": produccion}, {"gastos": gastos})
+    return aux_tools.igualar_tipo_frame(resultado, produccion)
 
 
 def cruzar_excepciones_50_50(
@@ -198,144 +175,167 @@ def cruzar_excepciones_50_50(
     """
     Asigna la marca candidato_50_50 = 0 cuando sea una excepcion a la regla 50/50,
     ignorando columnas no presentes en `base`.
+    Las excepciones se agrupan por patron de comodines ('*'), cada patron se vuelve una
+    tabla de busqueda por sus columnas especificas y se cruza una sola vez con la base.
+    Si varias excepciones aplican a un registro gana la ultima de la tabla.
     """
+    # la tabla de excepciones es pequeña, se compila siempre materializada
+    excepciones = aux_tools.materializar(excepciones)
     # Aplica la regla por defecto (marca con 1) si la columna no existe
-    if "candidato_devengo_50_50" not in base.columns:
+    if "candidato_devengo_50_50" not in base.collect_schema().names():
         base = base.with_columns(pl.lit(1).alias("candidato_devengo_50_50"))
+    esquema_base = base.collect_schema()
     # Filtra columnas relevantes (las que existen en base)
-    columnas_base = set(base.columns)
+    columnas_base = set(esquema_base.names())
     exc_cols = [col for col in excepciones.columns if col != "candidato_devengo_50_50"]
+    cols_presentes = [col for col in exc_cols if col in columnas_base]
     # Filtra excepciones: solo considera filas que no exigen columnas ausentes
     excepciones_filtradas = excepciones.filter(
         pl.all_horizontal(
             [((pl.col(col) == "*") | pl.lit(col in columnas_base)) for col in exc_cols]
         )
-    )
-
-    # Itera sobre excepciones válidas
-    for row in excepciones_filtradas.iter_rows(named=True):
-        condition = pl.lit(True)
-        for col in exc_cols:
-            if col not in columnas_base:
-                continue  # ignora columnas ausentes
+    ).with_row_index("_orden")
+    if excepciones_filtradas.height == 0:
+        return base
 
-            if row[col] != "*":
-                val = row[col]
-                col_dtype = base.schema[col]
-                if col_dtype in [pl.Int64, pl.Int32]:
-                    val = int(val)
-                elif col_dtype == pl.Utf8:
-                    val = str(val)
-                condition &= pl.col(col) == val
+    # patron de comodines de cada excepcion: que columnas tienen un valor especifico
+    patrones = excepciones_filtradas.with_columns(
+        [
+            (pl.col(col) != "*").fill_null(True).alias(f"_especifica_{col}")
+            for col in cols_presentes
+        ]
+    ).partition_by(
+        [f"_especifica_{col}" for col in cols_presentes],
+        as_dict=True,
+        include_key=False,
+    )
 
-        base = base.with_columns(
-            pl.when(condition)
-            .then(row["candidato_devengo_50_50"])
-            .otherwise(pl.col("candidato_devengo_50_50"))
-            .alias("candidato_devengo_50_50")
+    cols_orden, cols_valor = [], []
+    for i, (patron, grupo) in enumerate(patrones.items()):
+        llaves = [col for col, especifica in zip(cols_presentes, patron) if especifica]
+        orden, valor = f"_orden_{i}", f"_valor_{i}"
+        cols_orden.append(orden)
+        cols_valor.append(valor)
+        # dentro de un mismo patron se queda la ultima excepcion de cada llave
+        busqueda = (
+            grupo.select(
+                [pl.col(col).cast(esquema_base[col]) for col in llaves]
+                + [
+                    pl.col("_orden").alias(orden),
+                    pl.col("candidato_devengo_50_50").alias(valor),
+                ]
+            )
+            .sort(orden)
         )
+        if not llaves:
+            # sin columnas especificas la excepcion aplica a toda la base
+            base = base.with_columns(
+                pl.lit(busqueda[orden][-1]).alias(orden),
+                pl.lit(busqueda[valor][-1]).alias(valor),
+            )
+        else:
+            busqueda = busqueda.unique(subset=llaves, keep="last", maintain_order=True)
+            base = base.join(
+                aux_tools.igualar_tipo_frame(busqueda, base),
+                on=llaves,
+                how="left",
+                maintain_order="left",
+            )
+
+    # entre patrones gana la excepcion que aparece de ultima en la tabla
+    orden_max = pl.max_horizontal(cols_orden)
+    valor_excepcion = pl.coalesce(
+        [
+            pl.when(pl.col(orden) == orden_max).then(pl.col(valor))
+            for orden, valor in zip(cols_orden, cols_valor)
+        ]
+    )
+    return base.with_columns(
+        pl.when(orden_max.is_not_null())
+        .then(valor_excepcion)
+        .otherwise(pl.col("candidato_devengo_50_50"))
+        .cast(esquema_base["candidato_devengo_50_50"])
+        .alias("candidato_devengo_50_50")
+    ).drop(cols_orden + cols_valor)
 
-    return base
 
 def cruzar_tasas_cambio(
     base: pl.DataFrame,
     tasas_cambio: pl.DataFrame,
+    asof: bool | None = None,
+    filas: pl.Expr | None = None,
 ) -> pl.DataFrame:
-    query = """
-         SELECT
-            base.*,
-
-            COALESCE(tfval_cor.tasa_cambio, 1) AS tasa_cambio_fecha_valoracion_corporativo,
-            COALESCE(tfval_loc.tasa_cambio, 1) AS tasa_cambio_fecha_valoracion_local,
-
-            COALESCE(tfval_ant_cor.tasa_cambio, 1) AS tasa_cambio_fecha_valoracion_anterior_corporativo,
-            COALESCE(tfval_ant_loc.tasa_cambio, 1) AS tasa_cambio_fecha_valoracion_anterior_local,
-
-            COALESCE(tconst.tasa_cambio, 1) AS tasa_cambio_fecha_constitucion
-            
-        FROM base
-        
-        LEFT JOIN tasas_cambio AS tfval_cor
-            ON base.fecha_valoracion = tfval_cor.fecha
-            AND base.moneda = tfval_cor.moneda_origen
-
-        LEFT JOIN tasas_cambio AS tfval_loc
-            ON base.fecha_valoracion + INTERVAL 1 DAY = tfval_loc.fecha
-            AND base.moneda = tfval_loc.moneda_origen
-
-            
-        LEFT JOIN tasas_cambio AS tfval_ant_cor
-            ON base.fecha_valoracion_anterior = tfval_ant_cor.fecha
-            AND base.moneda = tfval_ant_cor.moneda_origen
-        
-        LEFT JOIN tasas_cambio AS tfval_ant_loc
-            ON base.fecha_valoracion_anterior + INTERVAL 1 DAY = tfval_ant_loc.fecha
-            AND base.moneda = tfval_ant_loc.moneda_origen
+    """
+    Agrega las tasas de cambio de valoracion (corporativo al cierre, local al dia
+    siguiente), valoracion anterior y constitucion resolviendolas en una sola pasada
+    sobre el indice denso de tasas. Sin tasa se usa 1.
+    Con asof (por defecto params.TASA_CAMBIO_ASOF) una fecha sin tasa toma la ultima
+    tasa disponible de la moneda. Con filas solo se buscan las tasas de las filas que
+    cumplen la condicion, las demas quedan con tasa 1
+    """
+    if asof is None:
+        asof = params.TASA_CAMBIO_ASOF
+    indice = indice_tasas.construir_indice(tasas_cambio, asof)
+    dia_siguiente = pl.duration(days=1)
+    fechas_tasas = {
+        "tasa_cambio_fecha_valoracion_corporativo": pl.col("fecha_valoracion"),
+        "tasa_cambio_fecha_valoracion_local": pl.col("fecha_valoracion")
+        + dia_siguiente,
+        "tasa_cambio_fecha_valoracion_anterior_corporativo": pl.col(
+            "fecha_valoracion_anterior"
+        ),
+        "tasa_cambio_fecha_valoracion_anterior_local": pl.col(
+            "fecha_valoracion_anterior"
+        )
+        + dia_siguiente,
+        "tasa_cambio_fecha_constitucion": pl.col("fecha_constitucion"),
+    }
+    # el rango de la moneda se resuelve una vez para las cinco fechas, sin rango
+    # (filas excluidas) la tasa queda nula y luego en 1
+    rango = indice_tasas.rango_moneda(indice)
+    if filas is not None:
+        rango = [
+            pl.when(filas).then(columna).alias(columna.meta.output_name())
+            for columna in rango
+        ]
+    return (
+        base.with_columns(rango)
+        .with_columns(
+            [
+                indice_tasas.buscar_tasa(fecha, indice, asof).fill_null(1.0).alias(nombre)
+                for nombre, fecha in fechas_tasas.items()
+            ]
+        )
+        .drop(indice_tasas.COLUMNAS_RANGO.values())
+    )
 
-            
-        LEFT JOIN tasas_cambio AS tconst
-            ON base.fecha_constitucion = tconst.fecha
-            AND base.moneda = tconst.moneda_origen
-        """
-    return duckdb.sql(query).pl()
-        
 
 def cruzar_parm_financiacion(
     base: pl.DataFrame,
     param_compfinanc: pl.DataFrame
 ) -> pl.DataFrame:
-    
-    # Identificador temporal para asegurar integridad
-    df_base_con_id = base.with_row_index("_temp_id")
-    
-    con = duckdb.connect()
-    
-    query = """
-        WITH params_priorizados AS (
-            SELECT 
-                * ,
-                ( (CASE WHEN tipo_insumo = '*' THEN 1 ELSE 0 END) +
-                  (CASE WHEN compania = '*' THEN 1 ELSE 0 END) +
-                  (CASE WHEN ramo_sura = '*' THEN 1 ELSE 0 END) +
-                  (CASE WHEN producto = '*' THEN 1 ELSE 0 END) +
-                  (CASE WHEN tipo_op = '*' THEN 1 ELSE 0 END)
-                ) AS nivel_comodin
-            FROM param_compfinanc
-        ),
-        cruce_con_prioridad AS (
-            SELECT 
-                b._temp_id,
-                -- Se usa el nombre del CTE y el nombre de columna corregido
-                COALESCE(params_priorizados.aplica_comp_financ, 0) as aplica_comp_financ,
-                COALESCE(params_priorizados.aplica_ipc_mensual, 0) as aplica_ipc_mensual,
-                params_priorizados.pais_curva,
-                params_priorizados.moneda_curva,
-                params_priorizados.meses_max_vigencia,
-                ROW_NUMBER() OVER (
-                    PARTITION BY b._temp_id 
-                    ORDER BY params_priorizados.nivel_comodin ASC
-                ) as rn
-            FROM df_base_con_id AS b
-            LEFT JOIN params_priorizados 
-                ON (b.tipo_contabilidad = params_priorizados.tipo_contabilidad) -- debe especificarse
-                AND (b.moneda = params_priorizados.moneda) -- debe especificarse
-                AND (b.tipo_insumo = params_priorizados.tipo_insumo OR params_priorizados.tipo_insumo = '*')
-                AND (b.compania = params_priorizados.compania OR params_priorizados.compania = '*')
-                AND (b.ramo_sura = params_priorizados.ramo_sura OR params_priorizados.ramo_sura = '*')
-                AND (b.producto = params_priorizados.producto OR params_priorizados.producto = '*')
-                AND (b.tipo_op = params_priorizados.tipo_op OR params_priorizados.tipo_op = '*')
-        )
-        SELECT p_final.* EXCLUDE (rn, _temp_id)
-        FROM (
-            SELECT b.*, c.* EXCLUDE (_temp_id)
-            FROM df_base_con_id b
-            LEFT JOIN cruce_con_prioridad c ON b._temp_id = c._temp_id
-            WHERE c.rn = 1
-        ) AS p_final
-        ORDER BY _temp_id 
     """
-    
-    return con.execute(query).pl()
+    Cruza la base con el parametro de componente de financiacion mas especifico
+    (con menos comodines) que le aplica, tipo_contabilidad y moneda deben especificarse.
+    Los registros sin parametro no aplican componente de financiacion
+    """
+    resultado = comodines.resolver_comodines(
+        base,
+        param_compfinanc,
+        llaves_exactas=["tipo_contabilidad", "moneda"],
+        llaves_comodin=["tipo_insumo", "compania", "ramo_sura", "producto", "tipo_op"],
+        columnas_valor=[
+            "aplica_comp_financ",
+            "aplica_ipc_mensual",
+            "pais_curva",
+            "moneda_curva",
+            "meses_max_vigencia",
+        ],
+    )
+    return resultado.with_columns(
+        pl.col("aplica_comp_financ").fill_null(0),
+        pl.col("aplica_ipc_mensual").fill_null(0),
+    )
 
 
 def cruzar_factores_lir(
@@ -356,9 +356,7 @@ def cruzar_factores_lir(
     :return: base consolidada con los elementos necesarios para el calculo del saldo de reserva a tasa bloqueada - lir
     :rtype: DataFrame
     """
-    con = duckdb.connect()
-    
-    return con.execute(
+    resultado = sesion_duckdb.consultar(
         f"""
             SELECT
                 base.*,
@@ -447,5 +445,9 @@ def cruzar_factores_lir(
                         ELSE base.mes_inicio_vigencia - 1 END
                     ) = intereslir_ini.mesid_curva
                 AND base.mes_fin_vigencia = intereslir_fin.mesid_valoracion
-        """
-        ).pl()
\ No newline at end of file
+        """,
+        {"base": base},
+        {"factor_ipc": factor_ipc, "factores_interes": factores_interes},
+    )
+
+    return aux_tools.igualar_tipo_frame(resultado, base)
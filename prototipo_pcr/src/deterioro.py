@@ -3,51 +3,110 @@ Módulo de cálculo del deterioro del activo por reaseguro
 """
 
 import polars as pl
-import duckdb
 import datetime as dt
 import src.aux_tools as aux_tools
 
+# los tramos sin fecha fin siguen vigentes
+FECHA_FIN_ABIERTA = dt.date(3000, 12, 31)
+
+# columnas temporales con la posición del tramo de PD de cada fecha buscada
+COLUMNAS_POSICION = {
+    "fecha_valoracion": "_posicion_pd_actual",
+    "fecha_valoracion_anterior": "_posicion_pd_anterior",
+}
+
+
+def construir_indice_pd(riesgo_credito: pl.DataFrame) -> pl.DataFrame:
+    """
+    Tramos de probabilidad de incumplimiento ordenados por reasegurador y fecha de inicio
+    de vigencia, con una llave numérica (código del reasegurador, fecha de inicio) creciente
+    para ubicar por búsqueda binaria el tramo vigente de cada fecha.
+    Las fechas de vigencia se llevan a pl.Date, el excel las puede leer como Datetime
+    """
+    return (
+        aux_tools.materializar(riesgo_credito)
+        .with_columns(
+            pl.col("fecha_inicio_vigencia", "fecha_fin_vigencia").cast(pl.Date)
+        )
+        .filter(
+            pl.col("nit_reasegurador").is_not_null()
+            & pl.col("fecha_inicio_vigencia").is_not_null()
+        )
+        .sort("nit_reasegurador", "fecha_inicio_vigencia", maintain_order=True)
+        .select(
+            "nit_reasegurador",
+            "probabilidad_incumplimiento",
+            pl.col("fecha_fin_vigencia").fill_null(FECHA_FIN_ABIERTA),
+            codigo=pl.col("nit_reasegurador").rle_id().cast(pl.Int64),
+            llave=(
+                pl.col("nit_reasegurador").rle_id().cast(pl.Int64) * 2**32
+                + pl.col("fecha_inicio_vigencia").cast(pl.Int64)
+            ),
+        )
+    )
+
+
+def posicion_pd(fecha: pl.Expr, indice: pl.DataFrame) -> pl.Expr:
+    """
+    Posición en el índice del último tramo del reasegurador que inicia en o antes de la
+    fecha (as-of hacia atrás), nula si el reasegurador no tiene tramos o todos inician después.
+    La llave cuenta días, la fecha se lleva a pl.Date
+    """
+    reaseguradores = indice.select("nit_reasegurador", "codigo").unique(
+        "nit_reasegurador", maintain_order=True
+    )
+    codigo = pl.col("nit_reasegurador").replace_strict(
+        reaseguradores.get_column("nit_reasegurador"),
+        reaseguradores.get_column("codigo"),
+        default=None,
+        return_dtype=pl.Int64,
+    )
+    llave = codigo * 2**32 + fecha.cast(pl.Date).cast(pl.Int64)
+    posicion = (
+        pl.lit(indice.get_column("llave")).search_sorted(llave, side="right").cast(pl.Int64)
+        - 1
+    )
+    return pl.when(llave.is_not_null() & (posicion >= 0)).then(posicion)
+
+
+def buscar_pd(fecha: pl.Expr, posicion: pl.Expr, indice: pl.DataFrame) -> pl.Expr:
+    """
+    PD del tramo en la posición dada si es del mismo reasegurador y la fecha no supera su
+    fecha fin de vigencia, nula en otro caso
+    """
+    vigente = (pl.lit(indice.get_column("nit_reasegurador")).gather(posicion) == pl.col(
+        "nit_reasegurador"
+    )) & (
+        fecha.cast(pl.Date)
+        <= pl.lit(indice.get_column("fecha_fin_vigencia")).gather(posicion)
+    )
+    return pl.when(vigente).then(
+        pl.lit(indice.get_column("probabilidad_incumplimiento")).gather(posicion)
+    )
+
 
 def calc_deterioro(
     output_devengo_fluc: pl.DataFrame,
     riesgo_credito: pl.DataFrame,
     fe_valoracion: dt.date,
 ) -> pl.DataFrame:
+    """
+    Agrega la PD actual y anterior del reasegurador y los movimientos de deterioro sobre todo
+    el output, sin separarlo ni cambiar el orden de las filas. Las filas a las que no les
+    aplica quedan con nulos en las columnas de deterioro
+    """
     # Solo aplica para la fecha de valoracion y para reaseguro
-    base_det = output_devengo_fluc.filter(
-        (pl.col("fecha_valoracion") == fe_valoracion)
+    aplica = (
+        (pl.col("fecha_valoracion").cast(pl.Date) == fe_valoracion)
         & (pl.col("tipo_negocio").is_in(["mantenido", "retrocedido"]))
-    )
+    ).fill_null(False)
 
-    # Cruza probabilidad de default PD vigente por reasegurador
-    deterioro_pcr = (
-        duckdb.sql(
-            """
-        SELECT 
-            pcr.*
-            ,pd.probabilidad_incumplimiento prob_incumplimiento_actual
-            ,pd_ant.probabilidad_incumplimiento prob_incumplimiento_anterior
-        FROM base_det as pcr
-            LEFT JOIN riesgo_credito as pd
-                ON pcr.nit_reasegurador = pd.nit_reasegurador
-                AND pcr.fecha_valoracion BETWEEN 
-                    pd.fecha_inicio_vigencia AND 
-                        COALESCE(pd.fecha_fin_vigencia, '3000-12-31')
-            LEFT JOIN riesgo_credito as pd_ant
-                ON pcr.nit_reasegurador = pd_ant.nit_reasegurador
-                AND pcr.fecha_valoracion_anterior BETWEEN 
-                    pd_ant.fecha_inicio_vigencia AND 
-                        COALESCE(pd_ant.fecha_fin_vigencia, '3000-12-31')
-        """
-        )
-        .pl()
-        .with_columns(
-            (
-                pl.col("prob_incumplimiento_actual")
-                - pl.col("prob_incumplimiento_anterior")
-            ).alias("cambio_prob_incumplimiento")
-        )
-    )
+    # PD vigente por reasegurador, el tramo de cada fecha se ubica una sola vez
+    indice = construir_indice_pd(riesgo_credito)
+    probabilidades = {
+        "prob_incumplimiento_actual": "fecha_valoracion",
+        "prob_incumplimiento_anterior": "fecha_valoracion_anterior",
+    }
 
     # cuando es el primer mes de reserva usa toda la probabilidad actual
     es_mes_inicio = aux_tools.yyyymm(pl.col("fecha_constitucion")) == aux_tools.yyyymm(
@@ -70,31 +129,36 @@ def calc_deterioro(
     lib_cambio_pd = pl.min_horizontal(
         pl.col("cambio_prob_incumplimiento"), pl.lit(0.0)
     ) * pl.col("saldo")
-    deterioro_pcr = deterioro_pcr.with_columns(
-        [
-            constitucion_det.alias("constitucion_deterioro"),
-            (lib_cambio_saldo + lib_cambio_pd).alias("liberacion_deterioro"),
-        ]
-    )
 
-    # la parte a la cual no le aplica el deterioro tendra NA en las columnas creadas
-    base_resto = output_devengo_fluc.filter(
-        ~(
-            (pl.col("fecha_valoracion") == fe_valoracion)
-            & (pl.col("tipo_negocio").is_in(["mantenido", "retrocedido"]))
+    # las columnas se agregan sobre el mismo frame: la parte a la cual no le aplica el
+    # deterioro no se filtra ni se vuelve a concatenar, queda con nulos. El plan es lazy
+    # aunque la entrada no lo sea para no reacomodar el frame completo en cada paso
+    resultado = (
+        output_devengo_fluc.lazy()
+        .with_columns(
+            pl.when(aplica).then(posicion_pd(pl.col(fecha), indice)).alias(columna)
+            for fecha, columna in COLUMNAS_POSICION.items()
+        )
+        .with_columns(
+            buscar_pd(pl.col(fecha), pl.col(COLUMNAS_POSICION[fecha]), indice)
+            .cast(pl.Float64)
+            .alias(nombre)
+            for nombre, fecha in probabilidades.items()
+        )
+        .drop(COLUMNAS_POSICION.values())
+        .with_columns(
+            (
+                pl.col("prob_incumplimiento_actual")
+                - pl.col("prob_incumplimiento_anterior")
+            ).alias("cambio_prob_incumplimiento")
+        )
+        .with_columns(
+            pl.when(aplica).then(constitucion_det).alias("constitucion_deterioro"),
+            pl.when(aplica)
+            .then(lib_cambio_saldo + lib_cambio_pd)
+            .alias("liberacion_deterioro"),
         )
-    ).with_columns(
-        [
-            # crea las columnas de deterioro con nulos para poder combinar
-            pl.lit(None).cast(pl.Float64).alias(det_col)
-            for det_col in [
-                "prob_incumplimiento_actual",
-                "prob_incumplimiento_anterior",
-                "cambio_prob_incumplimiento",
-                "constitucion_deterioro",
-                "liberacion_deterioro",
-            ]
-        ]
     )
-
-    return base_resto.vstack(deterioro_pcr)
+    if isinstance(output_devengo_fluc, pl.LazyFrame):
+        return resultado
+    return resultado.collect()
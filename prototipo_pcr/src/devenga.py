@@ -7,6 +7,9 @@ import datetime as dt
 import src.parametros as params
 import src.aux_tools as aux_tools
 
+# insumos que se devengan por consumo del límite del contrato según su seguimiento mensual
+INSUMOS_COSTO_CONTRATO = ["costo_contrato_rea_noprop", "recup_onerosidad_np"]
+
 
 def deveng_diario(input_deveng: pl.DataFrame) -> pl.DataFrame:
     """
@@ -64,7 +67,7 @@ def deveng_diario(input_deveng: pl.DataFrame) -> pl.DataFrame:
                     pl.col("fecha_fin_devengo"),
                     pl.col("fecha_valoracion"),
                     incluir_extremos=False,
-                ).map_elements(lambda x: max(x, 0))
+                ).clip(lower_bound=0)
             )
             .when(
                 (pl.col("estado_devengo") == "finalizado")
@@ -141,7 +144,7 @@ def deveng_diario(input_deveng: pl.DataFrame) -> pl.DataFrame:
 
 
 def deveng_cincuenta(
-    input_deveng_cinq: pl.DataFrame, fe_valoracion: dt.date
+    input_deveng_cinq: pl.DataFrame, fe_valoracion: dt.date | None = None
 ) -> pl.DataFrame:
     """
     Recibe un input preprocesado para devengo y devuelve el devengamiento segun las reglas del 50/50
@@ -160,7 +163,13 @@ def deveng_cincuenta(
     ).with_columns(mes_constitucion.alias("mes_constitucion"))
 
     # libera solo a cierre de mes -> si no es cierre la norma me obliga a mantener el 50%
-    es_cierre_mes = pl.lit(aux_tools.es_ultimo_dia_mes(fe_valoracion))
+    # sin fe_valoracion se evalua por registro, para devengar varias fechas a la vez
+    if fe_valoracion is None:
+        es_cierre_mes = (
+            pl.col("fecha_valoracion") == pl.col("fecha_valoracion").dt.month_end()
+        )
+    else:
+        es_cierre_mes = pl.lit(aux_tools.es_ultimo_dia_mes(fe_valoracion))
     
     # como a este módulo solo entran pólizas que estén en dos mes distintos se definen 
     # los meses de las liberaciones de la siguiente manera, así podemos reflejar incluso
@@ -261,7 +270,7 @@ def devengo_diario_vs_limite(input_costo: pl.DataFrame) -> pl.DataFrame:
     # Expresiones de saldo segun si es recibo nuevo o ya viene devengandose
     saldo_anterior = (
         pl.col("saldo_anterior")
-        if "saldo_anterior" in input_costo.columns
+        if "saldo_anterior" in input_costo.collect_schema().names()
         else pl.col("valor_base_devengo")
     )
 
@@ -524,36 +533,391 @@ def devengo_comp_financiacion(input_prep_cf: pl.DataFrame) -> pl.DataFrame:
 
 
 
+def particionar_reglas(
+    input_devengo: pl.DataFrame,
+) -> dict[str, pl.DataFrame | pl.LazyFrame | None]:
+    """
+    Reparte el input en los insumos de cada kernel de devengo segun las marcas
+    _kernel y _financiacion, en una sola pasada con partition_by.
+    Los grupos se unen sin rechunk para no copiar de nuevo los datos.
+    En modo lazy el input se colecta una sola vez y las particiones se devuelven
+    lazy sobre los datos ya repartidos. Las particiones sin datos quedan en None
+    """
+    claves = {
+        "comp_financiacion": [
+            (kernel, True)
+            for kernel in ["comp_inv", "costo_contrato", "5050", "diario", None]
+        ],
+        "comp_inv": [("comp_inv", False), ("comp_inv", True)],
+        "costo_contrato": [("costo_contrato", False), ("costo_contrato", True)],
+        "5050": [("5050", False)],
+        "diario": [("diario", False)],
+    }
+    marcas = ["_kernel", "_financiacion"]
+
+    if isinstance(input_devengo, pl.LazyFrame):
+        return {
+            nombre: None if particion is None else particion.lazy()
+            for nombre, particion in particionar_reglas(input_devengo.collect()).items()
+        }
+
+    grupos_input = input_devengo.partition_by(marcas, as_dict=True, include_key=False)
+    particiones = {}
+    for nombre, grupos in claves.items():
+        frames = [grupos_input[grupo] for grupo in grupos if grupo in grupos_input]
+        particiones[nombre] = (
+            pl.concat(frames, how="vertical", rechunk=False) if frames else None
+        )
+    return particiones
+
+
 def devengar(input_deveng: pl.DataFrame, fe_valoracion: dt.date) -> pl.DataFrame:
     """
     Recibe cualquier input preprocesado para devengamiento
     devuelve el output de devengo consolidado y organizado relativo a la fecha de valoración
     integra las distintas reglas de devengo, las aplica según corresponda y consolida el resultado
     """
+    return aplicar_reglas_devengo(
+        input_deveng.with_columns(pl.lit(fe_valoracion).alias("fecha_valoracion")),
+        fe_valoracion=fe_valoracion,
+    )
 
-    # parametros generales segun la fecha de valoracion
-    input_devengo = (
-        input_deveng.with_columns(pl.lit(fe_valoracion).alias("fecha_valoracion"))
-        .with_columns(
-            # por defecto los mov se calculan para el periodo desde el inicio del mes de la fe valoracion
-            pl.col("fecha_valoracion").dt.month_start().alias("fecha_inicio_periodo")
+
+def cierres_mensuales(desde: dt.date, hasta: dt.date) -> list[dt.date]:
+    """
+    Fechas de cierre de mes entre desde y hasta, incluyendo el mes de ambas
+    """
+    return (
+        pl.date_range(desde.replace(day=1), hasta, "1mo", eager=True)
+        .dt.month_end()
+        .to_list()
+    )
+
+
+def devengar_fechas(
+    input_deveng: pl.DataFrame, fechas_valoracion: list[dt.date]
+) -> pl.DataFrame:
+    """
+    Devenga el input a varias fechas de valoración en una sola consulta: cruza el input
+    con las fechas y aplica las reglas de devengo a todo el producto. El input se
+    prepara a la última fecha y a cada fecha solo llegan los registros constituidos a
+    esa fecha: cada prep_input_* toma como fecha_constitucion la fecha con la que filtra
+    lo contabilizado (ver prep_insumo.filtrar_contabilizados). El output queda ordenado
+    por fecha_valoracion, igual a preparar y devengar cada fecha.
+    No admite componente de financiación ni costo de contrato (ver
+    validar_sin_financiacion y validar_sin_costo_contrato)
+    """
+    fechas = pl.DataFrame(
+        {"fecha_valoracion": list(dict.fromkeys(fechas_valoracion))},
+        schema={"fecha_valoracion": pl.Date},
+    )
+    if fechas.height == 1:
+        fecha = fechas.item()
+        return devengar(input_deveng.filter(pl.col("fecha_constitucion") <= fecha), fecha)
+
+    validar_sin_financiacion(input_deveng)
+    validar_sin_costo_contrato(input_deveng)
+    columnas = input_deveng.collect_schema().names()
+    input_fechas = (
+        aux_tools.igualar_tipo_frame(fechas, input_deveng)
+        .join(input_deveng.drop("fecha_valoracion", strict=False), how="cross")
+        .filter(pl.col("fecha_constitucion") <= pl.col("fecha_valoracion"))
+        .select(
+            [c for c in columnas if c != "fecha_valoracion"] + ["fecha_valoracion"]
+        )
+    )
+    # los kernels concatenan sus particiones, se reagrupa por fecha conservando el orden
+    return aplicar_reglas_devengo(input_fechas).sort(
+        "fecha_valoracion", maintain_order=True
+    )
+
+
+def validar_sin_financiacion(input_deveng: pl.DataFrame) -> None:
+    """
+    El componente de financiación se prepara con las curvas de una sola fecha
+    (ver prep_insumo.anexar_info_financiacion), no se puede devengar a varias fechas
+    """
+    tiene_financiacion = aux_tools.materializar(
+        input_deveng.select((pl.col("aplica_comp_financ").fill_null(0) == 1).any())
+    ).item()
+    if tiene_financiacion:
+        raise ValueError(
+            "El componente de financiación solo se puede devengar a una fecha de valoración"
+        )
+
+
+def validar_sin_costo_contrato(input_deveng: pl.DataFrame) -> None:
+    """
+    El costo de contrato no proporcional y su recuperación de onerosidad se devengan con
+    el seguimiento del contrato del cierre actual (siniestros y casos del mes), a otros
+    cierres el consumo del límite no se conoce
+    """
+    tiene_costo_contrato = aux_tools.materializar(
+        input_deveng.select(
+            pl.col("tipo_insumo").cast(pl.String).is_in(INSUMOS_COSTO_CONTRATO).any()
+        )
+    ).item()
+    if tiene_costo_contrato:
+        raise ValueError(
+            "El costo de contrato no proporcional solo se puede devengar a una fecha de "
+            f"valoración, tipos de insumo {INSUMOS_COSTO_CONTRATO}"
         )
+
+
+def proyectar_devengo(
+    input_deveng: pl.DataFrame, fe_valoracion: dt.date
+) -> pl.DataFrame:
+    """
+    Proyección del run-off: constitución, liberación y saldo de cada registro a cada
+    cierre de mes desde el de fe_valoracion hasta el cierre en que termina de devengarse.
+    Se calcula en forma cerrada por registro sin volver a pasar por los kernels (ver
+    movimientos_proyectados) y cada cierre coincide con devengar a esa fecha. Con un
+    input lazy el output queda lazy y sin ordenar para escribirse en streaming con
+    src/salidas.py. No admite componente de financiación ni costo de contrato
+    """
+    validar_sin_financiacion(input_deveng)
+    validar_sin_costo_contrato(input_deveng)
+    marcas = marcas_devengo()
+    primer_mes = pl.lit(fe_valoracion).dt.month_start()
+    # el ultimo movimiento es el fin del devengo o la constitucion si entra devengado
+    ultimo_mes = pl.max_horizontal(
+        primer_mes, pl.col("fecha_fin_devengo"), pl.col("fecha_constitucion")
+    ).dt.month_start()
+    dias_constitucion = aux_tools.calcular_dias_diferencia(
+        pl.col("fecha_fin_devengo"), pl.col("fecha_inicio_vigencia")
+    )
+
+    columnas = [
+        c for c in input_deveng.collect_schema().names() if c != "fecha_valoracion"
+    ]
+    return (
+        input_deveng.with_columns(
+            marcas["regla_devengo"].alias("regla_devengo"),
+            marcas["_kernel"].alias("_kernel"),
+            pl.date_ranges(primer_mes, ultimo_mes, "1mo").alias("fecha_valoracion"),
+        )
+        # sin kernel el registro no se devenga
+        .filter(pl.col("_kernel").is_not_null())
+        # lo que no depende del cierre se calcula una vez por registro
         .with_columns(
-            # define fecha cierre anterior para el delta
-            pl.col("fecha_valoracion")
-            .dt.offset_by("-1mo")
-            .dt.month_end()
-            .alias("fecha_valoracion_anterior")
+            (pl.col("_kernel") == "5050").alias("_es_5050"),
+            (pl.col("_kernel") == "comp_inv").alias("_es_comp_inv"),
+            dias_constitucion.alias("_dias_constitucion"),
+            (pl.col("valor_base_devengo") / dias_constitucion).alias(
+                "_valor_devengo_diario"
+            ),
+            (pl.col("fecha_constitucion") > pl.col("fecha_fin_devengo")).alias(
+                "_entra_devengado"
+            ),
+            aux_tools.yyyymm(pl.col("fecha_constitucion")).alias("_mes_constitucion"),
+            aux_tools.yyyymm(pl.col("fecha_inicio_devengo")).alias("_mes_inicio"),
+            aux_tools.yyyymm(pl.col("fecha_fin_devengo")).alias("_mes_fin"),
+        )
+        .explode("fecha_valoracion")
+        .with_columns(pl.col("fecha_valoracion").dt.month_end())
+        .pipe(movimientos_proyectados)
+        .select(
+            columnas
+            + ["fecha_valoracion", "regla_devengo", "estado_devengo"]
+            + ["valor_constitucion", "valor_liberacion", "valor_liberacion_acum", "saldo"]
         )
     )
+
+
+def movimientos_proyectados(cierres: pl.DataFrame) -> pl.DataFrame:
+    """
+    Estado, constitución, liberación, liberación acumulada y saldo de cada registro a
+    su cierre de mes fecha_valoracion, con el signo de reserva. Son las reglas de
+    deveng_diario, deveng_cincuenta y devengo_componente_inversion evaluadas en un
+    cierre según el kernel del registro: el diario cuenta días sobre el
+    _valor_devengo_diario, el 50/50 libera la mitad al cierre de cada mes y el
+    componente de inversión todo en el mes de fin de devengo
+    """
+    fecha = pl.col("fecha_valoracion")
+    base = pl.col("valor_base_devengo")
+    diario = pl.col("_valor_devengo_diario")
+    dias_constitucion = pl.col("_dias_constitucion")
+    mes, mes_inicio, mes_fin = pl.col("_mes"), pl.col("_mes_inicio"), pl.col("_mes_fin")
+    entra_devengado, terminado = pl.col("_entra_devengado"), pl.col("_terminado")
+    # estado: 0 entra devengado, 1 no iniciado, 2 en curso, 3 finalizado
+    estado = pl.col("_estado")
+    # el 50/50 libera todo en un solo mes si inicia y termina en el mismo
+    libera_todo = mes_inicio == mes_fin
+
+    cierres = cierres.with_columns(
+        aux_tools.yyyymm(fecha).alias("_mes"),
+        fecha.dt.month_start().alias("_inicio_periodo"),
+        (fecha < pl.col("fecha_inicio_devengo")).alias("_no_iniciado"),
+        (
+            (pl.col("fecha_inicio_devengo") <= fecha)
+            & (fecha < pl.col("fecha_fin_devengo"))
+        ).alias("_en_curso"),
+        (fecha >= pl.col("fecha_fin_devengo")).alias("_terminado"),
+    ).with_columns(
+        pl.when(entra_devengado)
+        .then(pl.lit(0))
+        .when(pl.col("_no_iniciado"))
+        .then(pl.lit(1))
+        .when(pl.col("_en_curso"))
+        .then(pl.lit(2))
+        .otherwise(pl.lit(3))
+        .alias("_estado")
+    )
+
+    # devengo diario: dias devengados y por devengar al cierre
+    inicio_periodo = pl.col("_inicio_periodo")
+    dias_devengados = (
+        pl.when(estado == 1)
+        .then(pl.lit(0))
+        .when(estado.is_in([0, 2]))
+        .then(
+            aux_tools.calcular_dias_diferencia(
+                pl.min_horizontal(pl.col("fecha_fin_devengo"), fecha),
+                pl.col("fecha_inicio_vigencia"),
+            )
+        )
+        .otherwise(dias_constitucion)
+    )
+    dias_no_devengados = (
+        pl.when(estado == 1)
+        .then(dias_constitucion)
+        .when(estado == 2)
+        .then(
+            aux_tools.calcular_dias_diferencia(
+                pl.col("fecha_fin_devengo"), fecha, incluir_extremos=False
+            ).clip(lower_bound=0)
+        )
+        .otherwise(pl.lit(0))
+    )
+    constitucion_diario = (
+        pl.when(
+            (pl.col("fecha_constitucion") <= fecha)
+            & (inicio_periodo <= pl.col("fecha_constitucion"))
+        )
+        .then(dias_constitucion * diario)
+        .otherwise(pl.lit(0.0))
+    )
+    # en el mes de constitucion se liberan tambien los dias desde el inicio de vigencia
+    dias_liberacion = (
+        pl.when((estado == 0) & (pl.col("_constitucion_diario") != 0))
+        .then(dias_constitucion)
+        .when(estado == 1)
+        .then(pl.lit(0))
+        .when(inicio_periodo <= pl.col("fecha_fin_devengo"))
+        .then(
+            aux_tools.calcular_dias_diferencia(
+                pl.min_horizontal(fecha, pl.col("fecha_fin_devengo")),
+                pl.when(pl.col("fecha_constitucion") > inicio_periodo)
+                .then(pl.col("fecha_inicio_vigencia"))
+                .otherwise(inicio_periodo),
+            )
+        )
+        .otherwise(pl.lit(0))
+    )
+
+    # 50/50: la mitad al cierre del mes de inicio y la otra al terminar la vigencia
+    liberacion_5050 = (
+        pl.when(entra_devengado)
+        .then(base * (pl.col("_mes_constitucion") == mes))
+        .when((mes == mes_inicio) & libera_todo & terminado)
+        .then(base)
+        .when((mes == mes_inicio) & ~libera_todo)
+        .then(base * 0.5)
+        .when((mes == mes_fin) & terminado)
+        .then(base * 0.5)
+        .otherwise(0.0)
+    )
+    liberacion_acum_5050 = (
+        pl.when(terminado | entra_devengado)
+        .then(base)
+        .when((mes == mes_fin) & libera_todo & ~terminado)
+        .then(0.0)
+        .when((mes == mes_fin) & ~libera_todo & ~terminado)
+        .then(base * 0.5)
+        .when((mes == mes_inicio) & ~libera_todo)
+        .then(base * 0.5)
+        .otherwise(0.0)
+    )
+    saldo_5050 = (
+        pl.when(pl.col("_no_iniciado"))
+        .then(base)
+        .when(pl.col("_en_curso"))
+        .then(base - pl.col("_liberacion_acum_5050"))
+        .otherwise(0)
+    )
+
+    # componente de inversion: acumula y libera todo al fin de devengo
+    constitucion_comp_inv = (
+        pl.when((mes == pl.col("_mes_constitucion")) & (fecha >= pl.col("fecha_constitucion")))
+        .then(base)
+        .otherwise(pl.lit(0.0))
+    )
+    liberacion_acum_comp_inv = pl.when(terminado).then(base).otherwise(pl.lit(0.0))
+    liberacion_comp_inv = (
+        pl.when((mes == mes_fin) & terminado).then(base).otherwise(pl.lit(0.0))
+    )
+
+    es_5050, es_comp_inv = pl.col("_es_5050"), pl.col("_es_comp_inv")
+    signo = pl.col("signo_constitucion")
+    return cierres.with_columns(
+        constitucion_diario.alias("_constitucion_diario"),
+        liberacion_acum_5050.alias("_liberacion_acum_5050"),
+        liberacion_acum_comp_inv.alias("_liberacion_acum_comp_inv"),
+    ).with_columns(
+        pl.when(es_comp_inv)
+        .then(pl.lit(None, pl.String))
+        .when(estado == 0)
+        .then(pl.lit("entra_devengado"))
+        .when(estado == 1)
+        .then(pl.lit("no_iniciado"))
+        .when(estado == 2)
+        .then(pl.lit("en_curso"))
+        .otherwise(pl.lit("finalizado"))
+        .alias("estado_devengo"),
+        # el signo de reserva se aplica igual que en devengar
+        pl.when(es_comp_inv)
+        .then(constitucion_comp_inv)
+        .when(es_5050)
+        .then(pl.when(pl.col("_mes_constitucion") == mes).then(base).otherwise(0.0))
+        .otherwise(pl.col("_constitucion_diario"))
+        .mul(signo)
+        .alias("valor_constitucion"),
+        pl.when(es_comp_inv)
+        .then(liberacion_comp_inv)
+        .when(es_5050)
+        .then(liberacion_5050)
+        .otherwise(dias_liberacion * diario)
+        .mul(-1 * signo)
+        .alias("valor_liberacion"),
+        pl.when(es_comp_inv)
+        .then(pl.col("_liberacion_acum_comp_inv"))
+        .when(es_5050)
+        .then(pl.col("_liberacion_acum_5050"))
+        .otherwise(dias_devengados * diario)
+        .mul(-1 * signo)
+        .alias("valor_liberacion_acum"),
+        pl.when(es_comp_inv)
+        .then(base - pl.col("_liberacion_acum_comp_inv"))
+        .when(es_5050)
+        .then(saldo_5050)
+        .otherwise(diario * dias_no_devengados)
+        .mul(signo)
+        .alias("saldo"),
+    )
+
+
+def marcas_devengo() -> dict[str, pl.Expr]:
+    """
+    Expresiones de la regla de devengo de cada registro, del kernel que la calcula
+    (_kernel) y de si aplica componente de financiacion (_financiacion). No dependen
+    de la fecha de valoración
+    """
     # define si aplica componente de financiacion
     aplica_financiacion = pl.col('aplica_comp_financ').fill_null(0) == 1
     # define si es componente de inversión
     aplica_comp_inv = pl.col('tipo_insumo') == 'componente_inversion_directo'
     # define si aplica devengo de costo contrato
-    aplica_costo_contrato = pl.col("tipo_insumo").is_in(
-        ["costo_contrato_rea_noprop", "recup_onerosidad_np"]
-    )
+    aplica_costo_contrato = pl.col("tipo_insumo").is_in(INSUMOS_COSTO_CONTRATO)
 
     # define si aplica 50_50 y hace la particion del insumo entre los 
     # registros que se devengan con la regla del 50_50 y los que se 
@@ -587,7 +951,7 @@ def devengar(input_deveng: pl.DataFrame, fe_valoracion: dt.date) -> pl.DataFrame
     es_mensual_5050 = aplica_5050 & (meses_vigencia == 1)
     es_mensual_diario = aplica_5050 & (meses_vigencia != 1)
 
-    input_devengo = input_devengo.with_columns(
+    regla = (
         pl.when(aplica_comp_inv)
         .then(pl.lit("componente_inversion"))
         .when(es_mensual_5050)
@@ -597,50 +961,98 @@ def devengar(input_deveng: pl.DataFrame, fe_valoracion: dt.date) -> pl.DataFrame
         .when(aplica_financiacion)
         .then(pl.lit("componente_financiacion"))
         .otherwise(pl.lit("diario"))
-        .alias("regla_devengo")
     )
 
-    input_devengo_comp_financiacion = input_devengo.filter(aplica_financiacion)
-    input_devengo_comp_inv = input_devengo.filter(aplica_comp_inv)
-    input_devengo_costcon = input_devengo.filter(aplica_costo_contrato)
-    input_devengo_5050 = input_devengo.filter(
-        es_mensual_5050
-        & (~aplica_costo_contrato)
-        & (~aplica_comp_inv)
-        & (~aplica_financiacion)
+    # cada registro se enruta a su kernel de devengo con dos marcas: el kernel segun
+    # la regla y si aplica componente de financiacion, que se devenga ademas de su kernel
+    # si es componente de inversion o costo de contrato. Sin kernel ni financiacion
+    # el registro no se devenga
+    kernel = (
+        pl.when(aplica_comp_inv)
+        .then(pl.lit("comp_inv"))
+        .when(aplica_costo_contrato)
+        .then(pl.lit("costo_contrato"))
+        .when(
+            es_mensual_5050
+            & (~aplica_costo_contrato)
+            & (~aplica_comp_inv)
+        )
+        .then(pl.lit("5050"))
+        .when(
+            (~es_mensual_5050)
+            & (~aplica_costo_contrato)
+            & (~aplica_comp_inv)
+        )
+        .then(pl.lit("diario"))
+    )
+    return {
+        "regla_devengo": regla,
+        "_kernel": kernel,
+        "_financiacion": aplica_financiacion,
+    }
+
+
+def aplicar_reglas_devengo(
+    input_deveng: pl.DataFrame, fe_valoracion: dt.date | None = None
+) -> pl.DataFrame:
+    """
+    Aplica las reglas de devengo a un input que ya trae la columna fecha_valoracion,
+    con fe_valoracion=None la fecha de valoración puede variar por registro
+    """
+
+    # parametros generales segun la fecha de valoracion
+    input_devengo = (
+        input_deveng
+        .with_columns(
+            # por defecto los mov se calculan para el periodo desde el inicio del mes de la fe valoracion
+            pl.col("fecha_valoracion").dt.month_start().alias("fecha_inicio_periodo")
+        )
+        .with_columns(
+            # define fecha cierre anterior para el delta
+            pl.col("fecha_valoracion")
+            .dt.offset_by("-1mo")
+            .dt.month_end()
+            .alias("fecha_valoracion_anterior")
+        )
     )
-    input_devengo_diario = input_devengo.filter(
-        (~es_mensual_5050)
-        & (~aplica_costo_contrato)
-        & (~aplica_comp_inv)
-        & (~aplica_financiacion)
+    marcas = marcas_devengo()
+    input_devengo = input_devengo.with_columns(
+        marcas["regla_devengo"].alias("regla_devengo")
+    )
+    particiones = particionar_reglas(
+        input_devengo.with_columns(
+            [marcas[marca].alias(marca) for marca in ["_kernel", "_financiacion"]]
+        )
     )
 
     # se inicializan outputs vacío y campos output como copia de la lista (porque si no modifica la original)
     outputs, campos_output = [], params.CAMPOS_OUTPUT_CONTABLE.copy()
     # aplica el devengamiento a cada particion solo si tiene datos de entrada
-    if input_devengo_comp_financiacion.height > 0:
-        outputs.append(devengo_comp_financiacion(input_devengo_comp_financiacion))
+    if particiones["comp_financiacion"] is not None:
+        outputs.append(devengo_comp_financiacion(particiones["comp_financiacion"]))
         campos_output.extend(params.CAMPOS_OUTPUT_FINANCIACION)
-    if input_devengo_comp_inv.height > 0:
-        outputs.append(devengo_componente_inversion(input_devengo_comp_inv))
-    if input_devengo_diario.height > 0:
-        outputs.append(deveng_diario(input_devengo_diario))
+    if particiones["comp_inv"] is not None:
+        outputs.append(devengo_componente_inversion(particiones["comp_inv"]))
+    if particiones["diario"] is not None:
+        outputs.append(deveng_diario(particiones["diario"]))
         campos_output.extend(params.CAMPOS_OUTPUT_DIARIO)   # estos campos tambien son independientes
-    if input_devengo_5050.height > 0:
+    if particiones["5050"] is not None:
         outputs.append(
-            deveng_cincuenta(input_devengo_5050, fe_valoracion=fe_valoracion)
+            deveng_cincuenta(particiones["5050"], fe_valoracion=fe_valoracion)
         )
         campos_output.extend(params.CAMPOS_OUTPUT_5050)
-    if input_devengo_costcon.height > 0:
-        outputs.append(devengo_diario_vs_limite(input_devengo_costcon))
+    if particiones["costo_contrato"] is not None:
+        outputs.append(devengo_diario_vs_limite(particiones["costo_contrato"]))
         campos_output.extend(params.CAMPOS_OUTPUT_LIMITE)
     if not outputs:
-        return pl.DataFrame()
+        # sin registros a devengar el output queda vacío pero con el esquema del devengo
+        # diario, para que los pasos siguientes (fluctuación, deterioro) puedan aplicarse
+        outputs.append(deveng_diario(input_devengo.clear()))
+        campos_output.extend(params.CAMPOS_OUTPUT_DIARIO)
 
     # retorna un consolidado tipo union all de los outputs
     output_devengo_consolidado = (
-        pl.concat(outputs, how="diagonal")
+        pl.concat(outputs, how="diagonal", rechunk=False)
         .with_columns(
             [
                 # aplica el signo de reserva segun tipo insumo y movimientos
@@ -674,7 +1086,9 @@ def devengar(input_deveng: pl.DataFrame, fe_valoracion: dt.date) -> pl.DataFrame
     campos_output.extend(params.CAMPOS_OUTPUT_CALCULADO)
     campos_output = list(dict.fromkeys(campos_output))
     campos_input = [
-        col for col in output_devengo_consolidado.columns if col not in campos_output
+        col
+        for col in output_devengo_consolidado.collect_schema().names()
+        if col not in campos_output
     ]
 
     return output_devengo_consolidado.select(campos_input + campos_output)
@@ -0,0 +1,205 @@
+"""
+Diagnósticos opcionales de los cruces con tablas de parámetros.
+Reportan el tamaño de las particiones de coincidencia de cada registro para detectar
+duplicados o registros sin cruce. No hacen parte del cálculo, en run_pcr se activan
+con params.DIAGNOSTICO_CRUCES
+"""
+
+import polars as pl
+import src.sesion_duckdb as sesion_duckdb
+import src.aux_tools as aux_tools
+import src.cruces as cruces
+import src.mapeo_contable as mapcont
+
+
+def diagnosticar_gastos(
+    produccion: pl.DataFrame, gastos: pl.DataFrame
+) -> pl.DataFrame:
+    """
+    Cuántos gastos empatan en el nivel de mayor prioridad de cada recibo por tipo de
+    gasto y tipo de contabilidad, más de 1 es una configuración ambigua en
+    cruces.cruzar_gastos_expedicion. Los candidatos son los mismos del cruce
+    """
+    produccion = aux_tools.materializar(produccion)
+    gastos = aux_tools.materializar(gastos)
+    return sesion_duckdb.consultar(f"""
+        WITH candidatos AS ({cruces.sql_candidatos_gastos()}
+        ),
+        cruce AS (
+            SELECT
+                *,
+                MIN(prioridad_match) OVER (
+                    PARTITION BY
+                        numero_documento_sap,
+                        tipo_op,
+                        tipo_insumo,
+                        poliza,
+                        poliza_certificado,
+                        recibo,
+                        amparo,
+                        cdsubgarantia,
+                        tipo_gasto,
+                        tipo_contabilidad
+                ) AS mejor_prioridad
+            FROM candidatos
+        ),
+        tamaños AS (
+            SELECT
+                tipo_gasto,
+                -- sin prioridad (canal = '*' con producto especifico) solo cuenta si
+                -- no hay otro nivel, el cruce deja los nulos de ultimos
+                COUNT(*) FILTER (
+                    WHERE prioridad_match IS NOT DISTINCT FROM mejor_prioridad
+                ) AS rows_in_partition
+            FROM cruce
+            GROUP BY
+                numero_documento_sap,
+                tipo_op,
+                tipo_insumo,
+                poliza,
+                poliza_certificado,
+                recibo,
+                amparo,
+                cdsubgarantia,
+                tipo_gasto,
+                tipo_contabilidad
+        )
+        SELECT
+            rows_in_partition,
+            COUNT(*) AS particiones,
+            LIST(DISTINCT tipo_gasto) AS tipo_gasto_unicos
+        FROM tamaños
+        GROUP BY rows_in_partition
+        ORDER BY rows_in_partition
+    """, {"produccion": produccion, "gastos": gastos})
+
+
+def diagnosticar_descuentos(
+    produccion: pl.DataFrame, descuento: pl.DataFrame, reaseguro=False
+) -> pl.DataFrame:
+    """
+    Cuántos descuentos cruzan con cada recibo, 0 es un recibo sin descuento
+    y más de 1 duplica el recibo en cruces.cruzar_descuento
+    """
+    produccion = aux_tools.materializar(produccion).with_row_index("_id_fila")
+    descuento = aux_tools.materializar(descuento)
+    suffix_rea = "_rea" if reaseguro else ""
+    return sesion_duckdb.consultar(f"""
+        WITH tamaños AS (
+            SELECT
+                prod._id_fila,
+                COUNT(dcto.recibo{suffix_rea}) AS rows_in_partition
+            FROM produccion AS prod
+                LEFT JOIN descuento AS dcto
+                    ON prod.compania = dcto.compania
+                    AND prod.ramo_sura = dcto.ramo_sura
+                    AND CAST(prod.poliza AS VARCHAR) = CAST(dcto.poliza AS VARCHAR)
+                    AND prod.recibo = dcto.recibo{suffix_rea}
+                    AND prod.poliza_certificado = dcto.poliza_certificado
+                    AND prod.amparo = dcto.amparo
+                    AND prod.tipo_op = dcto.tipo_op
+                    AND prod.producto = dcto.producto
+                    AND prod.numero_documento_sap = dcto.numero_documento_sap
+            GROUP BY prod._id_fila
+        )
+        SELECT
+            rows_in_partition,
+            COUNT(*) AS particiones
+        FROM tamaños
+        GROUP BY rows_in_partition
+        ORDER BY rows_in_partition
+    """, {"produccion": produccion, "descuento": descuento})
+
+
+def diagnosticar_financiacion(
+    base: pl.DataFrame, param_compfinanc: pl.DataFrame
+) -> pl.DataFrame:
+    """
+    Cuántos parámetros de financiación empatan en el mejor nivel de comodín de cada
+    registro, más de 1 es una configuración ambigua en cruces.cruzar_parm_financiacion
+    """
+    base = aux_tools.materializar(base).with_row_index("_id_fila")
+    param_compfinanc = aux_tools.materializar(param_compfinanc)
+    return sesion_duckdb.consultar("""
+        WITH params_priorizados AS (
+            SELECT
+                *,
+                ( (CASE WHEN tipo_insumo = '*' THEN 1 ELSE 0 END) +
+                  (CASE WHEN compania = '*' THEN 1 ELSE 0 END) +
+                  (CASE WHEN ramo_sura = '*' THEN 1 ELSE 0 END) +
+                  (CASE WHEN producto = '*' THEN 1 ELSE 0 END) +
+                  (CASE WHEN tipo_op = '*' THEN 1 ELSE 0 END)
+                ) AS nivel_comodin
+            FROM param_compfinanc
+        ),
+        cruce AS (
+            SELECT
+                b._id_fila,
+                p.nivel_comodin,
+                MIN(p.nivel_comodin) OVER (PARTITION BY b._id_fila) AS mejor_nivel
+            FROM base AS b
+            LEFT JOIN params_priorizados AS p
+                ON (b.tipo_contabilidad = p.tipo_contabilidad)
+                AND (b.moneda = p.moneda)
+                AND (b.tipo_insumo = p.tipo_insumo OR p.tipo_insumo = '*')
+                AND (b.compania = p.compania OR p.compania = '*')
+                AND (b.ramo_sura = p.ramo_sura OR p.ramo_sura = '*')
+                AND (b.producto = p.producto OR p.producto = '*')
+                AND (b.tipo_op = p.tipo_op OR p.tipo_op = '*')
+        ),
+        tamaños AS (
+            SELECT
+                _id_fila,
+                COUNT(nivel_comodin) FILTER (WHERE nivel_comodin = mejor_nivel)
+                    AS rows_in_partition
+            FROM cruce
+            GROUP BY _id_fila
+        )
+        SELECT
+            rows_in_partition,
+            COUNT(*) AS particiones
+        FROM tamaños
+        GROUP BY rows_in_partition
+        ORDER BY rows_in_partition
+    """, {"base": base, "param_compfinanc": param_compfinanc})
+
+
+def reportar(nombre: str, diagnostico: pl.DataFrame) -> None:
+    """
+    Imprime el diagnóstico y advierte si hay particiones con más de una coincidencia
+    """
+    print(f"Diagnóstico del cruce de {nombre}:")
+    print(diagnostico)
+    duplicados = diagnostico.filter(pl.col("rows_in_partition") > 1)
+    if duplicados.height > 0:
+        print(
+            f"{duplicados['particiones'].sum()} particiones de {nombre} "
+            "tienen más de una coincidencia"
+        )
+
+
+def diagnosticar_mapeo_bt(output_contable: pl.DataFrame) -> pl.DataFrame:
+    """
+    Tuplas de atributos de mapeo que quedaron sin BT en el output contable,
+    con la cantidad de movimientos y el valor en pesos de cada una
+    """
+    return (
+        aux_tools.materializar(output_contable)
+        .filter(pl.col("bt").is_null())
+        .group_by(mapcont.ATRIBUTOS_MAPEO)
+        .agg(
+            pl.len().alias("movimientos"),
+            pl.col("valor_ml").sum().alias("valor_ml"),
+        )
+        .sort("movimientos", descending=True)
+    )
+
+
+def reportar_mapeo_bt(diagnostico: pl.DataFrame) -> None:
+    if diagnostico.height == 0:
+        return
+    print(
+        f"{diagnostico.height} tuplas de atributos sin BT "
+        f"({diagnostico['movimientos'].sum()} movimientos):"
+    )
+    print(diagnostico)
@@ -0,0 +1,384 @@
+"""
+Esquemas declarados del input consolidado de devengo y de los outputs.
+Cada función prep_input_* entrega su insumo ya conforme a este esquema con un solo
+select al final, así los insumos se apilan sin conciliar tipos en tiempo de ejecución.
+Los outputs se llevan a su esquema antes de escribirse, así los bloques y fragmentos
+escritos por separado se leen como un solo dataset
+"""
+
+import polars as pl
+import src.parametros as params
+
+# columnas, en orden, y tipos del input de devengo. Las que un insumo no trae van nulas
+ESQUEMA_INPUT_DEVENGO = {
+    # recibo de producción o cesión
+    "aux_casuistica": pl.String,
+    "tipo_insumo": pl.String,
+    "tipo_negocio": pl.String,
+    "poliza": pl.String,
+    "fecha_expedicion_poliza": pl.Date,
+    "recibo": pl.String,
+    "numero_documento_sap": pl.Int64,
+    "amparo": pl.String,
+    "cdsubgarantia": pl.String,
+    "poliza_certificado": pl.String,
+    "compania": pl.String,
+    "ramo_sura": pl.String,
+    "canal": pl.String,
+    "producto": pl.String,
+    "tipo_op": pl.String,
+    "moneda": pl.String,
+    "fecha_contabilizacion_recibo": pl.Date,
+    "fecha_inicio_vigencia_recibo": pl.Date,
+    "fecha_fin_vigencia_recibo": pl.Date,
+    "fecha_inicio_vigencia_cobertura": pl.Date,
+    "fecha_fin_vigencia_cobertura": pl.Date,
+    "valor_prima_emitida": pl.Float64,
+    "uen": pl.Int64,
+    "mes_cotizacion": pl.Date,
+    # descuentos y gastos
+    "podto_comercial": pl.Float64,
+    "podto_tecnico": pl.Float64,
+    "tipo_gasto": pl.String,
+    "porc_gasto": pl.Float64,
+    "prioridad_match": pl.Int32,
+    "rn": pl.Int64,
+    # parámetros contables y excepciones 50/50
+    "tipo_contabilidad": pl.String,
+    "componente": pl.String,
+    "clasificacion_adicional": pl.String,
+    "tipo_contrato": pl.String,
+    "nivel_detalle": pl.String,
+    "signo_constitucion": pl.Int64,
+    "candidato_devengo_50_50": pl.Int32,
+    # fechas y base del devengo
+    "fecha_inicio_vigencia": pl.Date,
+    "fecha_constitucion": pl.Date,
+    "fecha_inicio_devengo": pl.Date,
+    "fecha_fin_devengo": pl.Date,
+    "valor_base_devengo": pl.Float64,
+    # onerosidad
+    "fecha_calculo_onerosidad": pl.Date,
+    "fecha_operacion": pl.Date,
+    "fecha_fin_vigencia_poliza": pl.Date,
+    "dias_vigencia": pl.Int64,
+    "dias_no_devengados": pl.Int64,
+    "prima_no_devengada": pl.Float64,
+    "pct_onerosidad": pl.Float64,
+    "pct_cancelacion": pl.Float64,
+    "pct_gasto_expedicion": pl.Float64,
+    "valor_onerosidad": pl.Float64,
+    # reaseguro
+    "contrato_reaseguro": pl.Int64,
+    "nit_reasegurador": pl.Int64,
+    "tipo_reasegurador": pl.String,
+    "porc_participacion_reasegurador": pl.Float64,
+    "fe_ini_vig_contrato_reaseguro": pl.Date,
+    "fe_fin_vig_contrato_reaseguro": pl.Date,
+    "valor_prima_cedida": pl.Float64,
+    "porc_cesion": pl.Float64,
+    "fe_ini_vig_contrato_rea": pl.Date,
+    "canal_directo": pl.String,
+    "valor_comision_rea": pl.Float64,
+    "porc_comision_rea": pl.Float64,
+    # costo de contrato no proporcional y su seguimiento
+    "recibo_costo_contrato": pl.Int64,
+    "fe_reinstalamento": pl.Date,
+    "valor_costo_contrato": pl.Float64,
+    "valor_reinstalamento": pl.Float64,
+    "limite_agregado_valor_instalado": pl.Float64,
+    "valor_siniestros_incurridos_mes": pl.Float64,
+    "valor_salvamentos_mes": pl.Float64,
+    "limite_agregado_casos_instalado": pl.Int64,
+    "casos_incurridos_mes": pl.Int64,
+    # recuperación de onerosidad no proporcional
+    "fecha_calculo_recuperacion": pl.Date,
+    "valor_recuperacion": pl.Float64,
+    # componente de financiación, nulas mientras main no cruce su parámetro
+    "aplica_comp_financ": pl.Int64,
+    "acreditacion_intereses": pl.Float64,
+}
+# columnas que cambian el devengo solo si el insumo las trae, por ejemplo el saldo
+# anterior de un output previo en la recuperación de onerosidad no proporcional
+COLUMNAS_OPCIONALES_DEVENGO = {
+    "saldo_anterior": pl.Float64,
+    # componente de financiación, las agrega prep_insumo.anexar_info_financiacion
+    "aplica_ipc_mensual": pl.Int64,
+    "pais_curva": pl.String,
+    "moneda_curva": pl.String,
+    "meses_max_vigencia": pl.Int64,
+    "mes_inicio_vigencia": pl.Int32,
+    "mes_fin_vigencia": pl.Int32,
+    "mes_valoracion": pl.Int32,
+    "mes_valoracion_anterior": pl.Int32,
+    "dias_vig_ini": pl.Int32,
+    "dias_nodo_ini": pl.Int32,
+    "dias_vig_fin": pl.Int32,
+    "dias_nodo_fin": pl.Int32,
+    "indice_ipc_ini": pl.Float64,
+    "tasa_ipc_ini": pl.Float64,
+    "indice_ipc_actual": pl.Float64,
+    "tasa_ipc_actual": pl.Float64,
+    "indice_ipc_anterior": pl.Float64,
+    "tasa_ipc_anterior": pl.Float64,
+    "fact_acum_val": pl.Float64,
+    "sum_desc_lir_val": pl.Float64,
+    "tasa_fwd_real_val": pl.Float64,
+    "fact_acum_ant": pl.Float64,
+    "sum_desc_lir_ant": pl.Float64,
+    "tasa_fwd_real_ant": pl.Float64,
+    "desc_lir_nodo_ini": pl.Float64,
+    "fact_acum_ini": pl.Float64,
+    "sum_desc_lir_nodo_fin": pl.Float64,
+    "desc_lir_nodo_fin": pl.Float64,
+}
+
+
+def conformar_input_devengo(
+    df: pl.DataFrame | pl.LazyFrame,
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Lleva el insumo al esquema del input de devengo: columnas en orden, con su tipo
+    y nulas las que no trae. Las opcionales se conservan solo si el insumo las trae
+    """
+    columnas = df.collect_schema().names()
+    return df.select(
+        [
+            pl.col(col).cast(tipo) if col in columnas else pl.lit(None, tipo).alias(col)
+            for col, tipo in ESQUEMA_INPUT_DEVENGO.items()
+        ]
+        + [
+            pl.col(col).cast(tipo)
+            for col, tipo in COLUMNAS_OPCIONALES_DEVENGO.items()
+            if col in columnas
+        ]
+    )
+
+
+def consolidar_input_devengo(
+    insumos: list[pl.DataFrame | pl.LazyFrame],
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Apila los insumos ya conformes. Si alguno trae una columna opcional se agrega
+    nula a los demás, las opcionales van en el orden y con el tipo declarados aunque
+    el insumo las haya recibido después de conformarse (por ejemplo la financiación)
+    """
+    opcionales = [
+        col
+        for col in COLUMNAS_OPCIONALES_DEVENGO
+        if any(col in df.collect_schema().names() for df in insumos)
+    ]
+    if opcionales:
+        insumos = [
+            df.select(
+                [pl.col(col) for col in ESQUEMA_INPUT_DEVENGO]
+                + [
+                    pl.col(col).cast(COLUMNAS_OPCIONALES_DEVENGO[col])
+                    if col in df.collect_schema().names()
+                    else pl.lit(None, COLUMNAS_OPCIONALES_DEVENGO[col]).alias(col)
+                    for col in opcionales
+                ]
+            )
+            for df in insumos
+        ]
+    return pl.concat(insumos, how="vertical")
+
+
+# columnas, en orden, y tipos del output de devengo con fluctuación y deterioro. Las
+# columnas de una regla de devengo sin registros en la ejecución van nulas
+ESQUEMA_OUTPUT_DEVENGO = {
+    # input de devengo
+    "aux_casuistica": pl.String,
+    "tipo_insumo": pl.String,
+    "tipo_negocio": pl.String,
+    "poliza": pl.String,
+    "fecha_expedicion_poliza": pl.Date,
+    "recibo": pl.String,
+    "numero_documento_sap": pl.Int64,
+    "amparo": pl.String,
+    "cdsubgarantia": pl.String,
+    "poliza_certificado": pl.String,
+    "compania": pl.String,
+    "ramo_sura": pl.String,
+    "canal": pl.String,
+    "producto": pl.String,
+    "tipo_op": pl.String,
+    "moneda": pl.String,
+    "fecha_contabilizacion_recibo": pl.Date,
+    "fecha_inicio_vigencia_recibo": pl.Date,
+    "fecha_fin_vigencia_recibo": pl.Date,
+    "fecha_inicio_vigencia_cobertura": pl.Date,
+    "fecha_fin_vigencia_cobertura": pl.Date,
+    "valor_prima_emitida": pl.Float64,
+    "uen": pl.Int64,
+    "mes_cotizacion": pl.Date,
+    "podto_comercial": pl.Float64,
+    "podto_tecnico": pl.Float64,
+    "tipo_gasto": pl.String,
+    "porc_gasto": pl.Float64,
+    "prioridad_match": pl.Int32,
+    "rn": pl.Int64,
+    "clasificacion_adicional": pl.String,
+    "nivel_detalle": pl.String,
+    "signo_constitucion": pl.Int64,
+    "candidato_devengo_50_50": pl.Int32,
+    "fecha_inicio_vigencia": pl.Date,
+    "fecha_calculo_onerosidad": pl.Date,
+    "fecha_operacion": pl.Date,
+    "fecha_fin_vigencia_poliza": pl.Date,
+    "dias_vigencia": pl.Int64,
+    "prima_no_devengada": pl.Float64,
+    "pct_onerosidad": pl.Float64,
+    "pct_cancelacion": pl.Float64,
+    "pct_gasto_expedicion": pl.Float64,
+    "valor_onerosidad": pl.Float64,
+    "contrato_reaseguro": pl.Int64,
+    "nit_reasegurador": pl.Int64,
+    "tipo_reasegurador": pl.String,
+    "porc_participacion_reasegurador": pl.Float64,
+    "fe_ini_vig_contrato_reaseguro": pl.Date,
+    "fe_fin_vig_contrato_reaseguro": pl.Date,
+    "valor_prima_cedida": pl.Float64,
+    "porc_cesion": pl.Float64,
+    "fe_ini_vig_contrato_rea": pl.Date,
+    "canal_directo": pl.String,
+    "valor_comision_rea": pl.Float64,
+    "porc_comision_rea": pl.Float64,
+    "recibo_costo_contrato": pl.Int64,
+    "fe_reinstalamento": pl.Date,
+    "valor_costo_contrato": pl.Float64,
+    "valor_reinstalamento": pl.Float64,
+    "limite_agregado_valor_instalado": pl.Float64,
+    "valor_siniestros_incurridos_mes": pl.Float64,
+    "valor_salvamentos_mes": pl.Float64,
+    "limite_agregado_casos_instalado": pl.Int64,
+    "casos_incurridos_mes": pl.Int64,
+    "fecha_calculo_recuperacion": pl.Date,
+    "valor_recuperacion": pl.Float64,
+    "aplica_comp_financ": pl.Int64,
+    "acreditacion_intereses": pl.Float64,
+    # calculadas por el devengo
+    "fecha_valoracion_anterior": pl.Date,
+    "valor_liberacion_limite": pl.Float64,
+    "saldo_anterior": pl.Float64,
+    "componente": pl.String,
+    "tipo_contabilidad": pl.String,
+    "regla_devengo": pl.String,
+    "tipo_contrato": pl.String,
+    "cohorte": pl.Int32,
+    "anio_liberacion": pl.String,
+    "transicion": pl.String,
+    "fecha_inicio_periodo": pl.Date,
+    "fecha_valoracion": pl.Date,
+    "fecha_constitucion": pl.Date,
+    "fecha_inicio_devengo": pl.Date,
+    "fecha_fin_devengo": pl.Date,
+    "valor_base_devengo": pl.Float64,
+    # devengo diario
+    "dias_devengados": pl.Int64,
+    "dias_no_devengados": pl.Int64,
+    "control_suma_dias": pl.Boolean,
+    "dias_constitucion": pl.Int64,
+    "dias_liberacion": pl.Int64,
+    "valor_devengo_diario": pl.Float64,
+    # devengo 50/50
+    "mes_constitucion": pl.Int32,
+    "mes_ini_liberacion": pl.Int32,
+    "mes_fin_liberacion": pl.Int32,
+    # devengo por consumo del límite
+    "porc_consumo_limite": pl.Float64,
+    # componente de financiación: insumos de la curva y del ipc y cálculos del saldo
+    **{
+        col: tipo
+        for col, tipo in COLUMNAS_OPCIONALES_DEVENGO.items()
+        if col != "saldo_anterior"
+    },
+    "peso_nodo_ini": pl.Float64,
+    "peso_nodo_fin": pl.Float64,
+    "peso_nodo_actual": pl.Float64,
+    "peso_nodo_anterior": pl.Float64,
+    "ajuste_base_ini": pl.Float64,
+    "factor_ajuste_ipc": pl.Float64,
+    "factor_ajuste_ipc_ant": pl.Float64,
+    "factor_cap_real": pl.Float64,
+    "factor_cap_real_ant": pl.Float64,
+    "sum_desc_valoracion": pl.Float64,
+    "sum_desc_anterior": pl.Float64,
+    "suma_factores_total": pl.Float64,
+    "suma_factores_remanente": pl.Float64,
+    "suma_factores_remanente_ant": pl.Float64,
+    "tasa_acreditacion": pl.Float64,
+    # movimientos y saldo
+    "estado_devengo": pl.String,
+    "valor_constitucion": pl.Float64,
+    "valor_liberacion": pl.Float64,
+    "valor_liberacion_acum": pl.Float64,
+    "saldo": pl.Float64,
+    # fluctuación
+    "tasa_cambio_fecha_valoracion_corporativo": pl.Float64,
+    "tasa_cambio_fecha_valoracion_local": pl.Float64,
+    "tasa_cambio_fecha_valoracion_anterior_corporativo": pl.Float64,
+    "tasa_cambio_fecha_valoracion_anterior_local": pl.Float64,
+    "tasa_cambio_fecha_constitucion": pl.Float64,
+    "fluctuacion_constitucion": pl.Float64,
+    "fluctuacion_liberacion": pl.Float64,
+    # deterioro
+    "prob_incumplimiento_actual": pl.Float64,
+    "prob_incumplimiento_anterior": pl.Float64,
+    "cambio_prob_incumplimiento": pl.Float64,
+    "constitucion_deterioro": pl.Float64,
+    "liberacion_deterioro": pl.Float64,
+}
+# el output contable reemplaza las columnas de cálculo por el movimiento pivoteado
+# y agrega la homologación contable
+ESQUEMA_OUTPUT_CONTABLE = {
+    col: tipo
+    for col, tipo in ESQUEMA_OUTPUT_DEVENGO.items()
+    if col not in params.COLUMNAS_CALCULO
+} | {
+    "tipo_movimiento": pl.String,
+    "valor_md": pl.Float64,
+    "valor_ml": pl.Float64,
+    "fecha_corte": pl.Date,
+    "cartera_riesgo": pl.String,
+    "concepto": pl.String,
+    "tipo_movimiento_codigo": pl.String,
+    "indicativo_periodo_movimiento_codigo": pl.String,
+    "concepto_codigo": pl.String,
+    "clasificacion_adicional_codigo": pl.String,
+    "tipo_negocio_codigo": pl.String,
+    "tipo_reaseguro_codigo": pl.String,
+    "tipo_reasegurador_codigo": pl.String,
+    "compania_codigo": pl.String,
+    "tipo_contabilidad_codigo": pl.String,
+    "transicion_codigo": pl.String,
+    "tipo_reserva": pl.String,
+    "tipo_seguro": pl.String,
+    "tipo_seguro_codigo": pl.String,
+    "naturaleza": pl.String,
+    "bt": pl.String,
+    "descripcion_bt": pl.String,
+    "onerosidad": pl.String,
+}
+
+
+def conformar_output(
+    df: pl.DataFrame | pl.LazyFrame, esquema: dict[str, pl.DataType]
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Lleva un output a su esquema declarado: columnas en orden, con su tipo y nulas las
+    que no trae. Las categóricas se conservan como están. Una columna que no está en el
+    esquema es un error, se debe declarar para no perderla al escribir
+    """
+    actual = df.collect_schema()
+    no_declaradas = [col for col in actual.names() if col not in esquema]
+    if no_declaradas:
+        raise ValueError(f"Columnas del output no declaradas en el esquema: {no_declaradas}")
+    return df.select(
+        pl.col(col)
+        if actual.get(col) == pl.Categorical
+        else pl.col(col).cast(tipo)
+        if col in actual
+        else pl.lit(None, tipo).alias(col)
+        for col, tipo in esquema.items()
+    )
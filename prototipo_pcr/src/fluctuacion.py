@@ -11,17 +11,20 @@ import polars as pl
 def calc_fluctuacion(
     data_devengo: pl.DataFrame, tasas_cambio: pl.DataFrame
 ) -> pl.DataFrame:
-    # Filtra para alicar solo a moneda extranjera
-
-    data_devengo_mext = data_devengo.filter(pl.col("moneda") != "COP")
-    data_devengo_mloc = data_devengo.filter(~(pl.col("moneda") != "COP"))
+    """
+    Agrega las tasas de cambio y la fluctuación de constitución y liberación sobre todo
+    el output de devengo, sin separarlo por moneda ni cambiar el orden de las filas.
+    La moneda local queda con tasa 1 y fluctuación 0
+    """
+    # Solo fluctúa la moneda extranjera
+    es_moneda_extranjera = (pl.col("moneda") != "COP").fill_null(False)
 
     # Cambios en tasa de cambio para usar segun el tipo de contabilidad
     # incluir columnas de estos deltas en el output
 
 
 
-    #delta de las tasas 
+    #delta de las tasas
 
     #primeros de cada mes
     delta_tc_bautizo_local= pl.col("tasa_cambio_fecha_valoracion_local") - pl.col(
@@ -58,38 +61,33 @@ def calc_fluctuacion(
         )
     )
 
-   
-    data_devengo_mext = (
-        data_devengo_mext.pipe(
-            cruces.cruzar_tasas_cambio, tasas_cambio
-        ) 
-
-        .drop(["fluctuacion_constitucion", "fluctuacion_liberacion"], strict=False)
-        
-        # Se debe incluir el efecto de la acreditacion de intereses en la fluctuacion constitucion
-        .with_columns(
-            ((pl.col("saldo") + pl.col("acreditacion_intereses").fill_nan(0.0)) * delta_tc).alias("fluctuacion_constitucion")
+    fluctuaciones = {
+        # Se debe incluir el efecto de la acreditacion de intereses en la fluctuacion
+        # constitucion, es nula en los registros sin componente de financiacion
+        "fluctuacion_constitucion": (
+            pl.col("saldo")
+            + pl.col("acreditacion_intereses").fill_null(0.0).fill_nan(0.0)
         )
-
-        # ANTES: .with_columns((pl.col("saldo") * delta_tc).alias("fluctuacion_constitucion"))
+        * delta_tc,
+        # El signo de la liberacion se invierte para reflejar el efecto economico
+        "fluctuacion_liberacion": -1 * pl.col("valor_liberacion") * delta_tc,
+    }
+
+    # las columnas se agregan sobre el mismo frame: la moneda local no se filtra ni se
+    # vuelve a concatenar, queda con tasa 1 sin buscarla y fluctuación 0. El plan es lazy
+    # aunque la entrada no lo sea para no reacomodar el frame completo en cada paso
+    resultado = (
+        data_devengo.lazy()
+        .pipe(cruces.cruzar_tasas_cambio, tasas_cambio, filas=es_moneda_extranjera)
         .with_columns(
-            # El signo de la liberacion se invierte para reflejar el efecto economico
-            (-1 * pl.col("valor_liberacion") * delta_tc).alias("fluctuacion_liberacion")
+            pl.when(es_moneda_extranjera)
+            .then(fluctuacion)
+            .otherwise(0.0)
+            .fill_null(0.0)
+            .alias(nombre)
+            for nombre, fluctuacion in fluctuaciones.items()
         )
     )
-
-    cols_fluc = ["fluctuacion_constitucion", "fluctuacion_liberacion"]
-
-
-    cols_tasas = [c for c in data_devengo_mext.columns if "tasa_cambio_" in c]
-
-
-
-    # concatena con los no fluctuados y llena nulos
-    data_devengo_fluc = (
-        pl.concat([data_devengo_mloc, data_devengo_mext], how="diagonal")
-        .with_columns([pl.col(col).fill_null(0.0) for col in cols_fluc])
-        .with_columns([pl.col(col).fill_null(1.0) for col in cols_tasas])
-    )
-
-    return data_devengo_fluc
+    if isinstance(data_devengo, pl.LazyFrame):
+        return resultado
+    return resultado.collect()
@@ -0,0 +1,179 @@
+"""
+Devengo incremental mes a mes: el output de devengo de cada cierre se guarda como estado
+y en el cierre siguiente los registros que ya terminaron de devengarse se arrastran
+desde ese estado sin recalcularse, solo se devengan los registros nuevos y los abiertos
+"""
+
+import datetime as dt
+import shutil
+from pathlib import Path
+
+import polars as pl
+import src.aux_tools as aux_tools
+import src.devenga as devg
+import src.parametros as params
+
+# estados de devengo que ya no generan movimientos en los cierres siguientes
+ESTADOS_CERRADOS = ["finalizado", "entra_devengado"]
+# el costo de contrato depende del seguimiento mensual del limite y la financiacion
+# de las curvas de cada cierre, por eso siempre se recalculan
+INSUMOS_SIEMPRE_RECALCULADOS = ["costo_contrato_rea_noprop", "recup_onerosidad_np"]
+
+
+# columnas del input que devengar reescribe en su output, en el estado ya no tienen el
+# valor del insumo y no sirven para reconocer el registro
+COLUMNAS_REESCRITAS = ["dias_no_devengados", "acreditacion_intereses", "saldo_anterior"]
+
+
+def llave_devengo(esquema: pl.Schema) -> list[pl.Expr]:
+    """
+    Identifica cada registro de input por todas sus columnas, que el output de devengo
+    conserva tal cual: el estado se cruza por sus valores y no por un hash guardado, que
+    podría cambiar entre versiones de polars. Si el insumo cambia de un cierre a otro el
+    registro simplemente se recalcula. Las categóricas se cruzan como texto, su
+    codificación cambia entre ejecuciones
+    """
+    return [
+        pl.col(col).cast(pl.String) if esquema[col] == pl.Categorical else pl.col(col)
+        for col in esquema.names()
+        if col not in COLUMNAS_REESCRITAS
+    ]
+
+
+def es_arrastrable() -> pl.Expr:
+    """
+    Registros del estado anterior que no cambian en los cierres siguientes
+    """
+    return (
+        pl.col("estado_devengo").is_in(ESTADOS_CERRADOS)
+        & ~pl.col("tipo_insumo").is_in(INSUMOS_SIEMPRE_RECALCULADOS)
+        & (pl.col("aplica_comp_financ").fill_null(0) != 1)
+        # lo que se constituye despues del cierre anterior aun tiene movimientos
+        & (pl.col("fecha_constitucion") <= pl.col("fecha_valoracion"))
+    ).fill_null(False)
+
+
+def arrastrar_cierre(cerrados: pl.DataFrame, fe_valoracion: dt.date) -> pl.DataFrame:
+    """
+    Lleva los registros ya devengados a la nueva fecha de valoracion:
+    sin constitucion ni liberacion en el periodo y con el mismo saldo y acumulado
+    """
+    columnas = cerrados.collect_schema().names()
+    return (
+        cerrados.with_columns(
+            pl.lit(fe_valoracion).alias("fecha_valoracion"),
+            pl.lit(fe_valoracion).dt.month_start().alias("fecha_inicio_periodo"),
+            pl.lit(fe_valoracion)
+            .dt.offset_by("-1mo")
+            .dt.month_end()
+            .alias("fecha_valoracion_anterior"),
+            pl.lit(0.0).alias("valor_constitucion"),
+            pl.lit(0.0).alias("valor_liberacion"),
+        )
+        .with_columns(
+            # solo el devengo diario calcula dias de liberacion
+            [
+                pl.when(pl.col("dias_liberacion").is_not_null())
+                .then(pl.lit(0))
+                .alias("dias_liberacion")
+            ]
+            if "dias_liberacion" in columnas
+            else []
+        )
+        .with_columns(
+            (
+                pl.col("saldo").fill_null(0.0).fill_nan(0.0)
+                - pl.col("acreditacion_intereses").fill_null(0.0).fill_nan(0.0)
+            ).alias("saldo_anterior"),
+        )
+        .pipe(devg.etiquetar_resultado_devengo)
+    )
+
+
+def devengar_incremental(
+    input_deveng: pl.DataFrame,
+    fe_valoracion: dt.date,
+    estado_anterior: pl.DataFrame | pl.LazyFrame | None,
+) -> pl.DataFrame:
+    """
+    Devenga el input usando el estado del cierre anterior y devuelve el estado a guardar
+    para el siguiente cierre, que es el mismo output de devengo.
+    Sin estado anterior equivale a devenga.devengar.
+    El estado anterior puede ser lazy (ver leer_estado), solo se materializan sus
+    registros cerrados que siguen en este input, así la memoria depende del bloque
+    y no de toda la cartera del cierre anterior
+    """
+    if estado_anterior is None:
+        return devg.devengar(input_deveng, fe_valoracion)
+
+    llave = llave_devengo(input_deveng.collect_schema())
+    llaves_input = aux_tools.materializar(input_deveng.select(llave).unique())
+    # solo se arrastran los registros cerrados que siguen en el input
+    cerrados = aux_tools.igualar_tipo_frame(
+        estado_anterior.lazy()
+        .filter(es_arrastrable())
+        .join(
+            llaves_input.lazy(),
+            left_on=llave,
+            right_on=llaves_input.columns,
+            how="semi",
+            nulls_equal=True,
+        )
+        .collect(),
+        input_deveng,
+    )
+    por_devengar = input_deveng.join(
+        cerrados.select(llave).unique(),
+        left_on=llave,
+        right_on=llaves_input.columns,
+        how="anti",
+        nulls_equal=True,
+    )
+
+    devengados = devg.devengar(por_devengar, fe_valoracion)
+    arrastrados = arrastrar_cierre(cerrados, fe_valoracion)
+    # mismo orden de columnas del devengo, las de kernels sin registros nuevos al final
+    columnas = list(
+        dict.fromkeys(
+            devengados.collect_schema().names() + arrastrados.collect_schema().names()
+        )
+    )
+    return pl.concat([devengados, arrastrados], how="diagonal_relaxed").select(columnas)
+
+
+def cierre_anterior(fe_valoracion: dt.date) -> dt.date:
+    return fe_valoracion.replace(day=1) - dt.timedelta(days=1)
+
+
+def ruta_estado(fe_valoracion: dt.date) -> Path:
+    """
+    Carpeta del estado de un cierre, con un archivo por bloque de cartera
+    """
+    return params.RUTA_ESTADO_DEVENGO / f"estado_devengo_{fe_valoracion:%Y%m%d}"
+
+
+def leer_estado(fe_valoracion: dt.date, lazy: bool = False) -> pl.DataFrame | None:
+    """
+    Estado guardado en el cierre de fe_valoracion (todos sus bloques), None si no existe
+    """
+    archivos = sorted(ruta_estado(fe_valoracion).glob("*.parquet"))
+    if not archivos:
+        return None
+    estado = pl.scan_parquet(archivos)
+    return estado if lazy else estado.collect()
+
+
+def reiniciar_estado(fe_valoracion: dt.date) -> None:
+    """
+    Borra el estado del cierre antes de recalcularlo, para no mezclar bloques
+    de una ejecución anterior
+    """
+    shutil.rmtree(ruta_estado(fe_valoracion), ignore_errors=True)
+
+
+def guardar_estado(
+    estado: pl.DataFrame, fe_valoracion: dt.date, bloque: int = 0
+) -> None:
+    ruta = ruta_estado(fe_valoracion) / f"bloque_{bloque}.parquet"
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    aux_tools.materializar(estado).write_parquet(ruta)
@@ -0,0 +1,131 @@
+"""
+Índice denso de tasas de cambio: se construye una vez por ejecución con una posición
+por cada (moneda, fecha) del rango disponible de cada moneda, así las tasas de varias
+fechas se resuelven con gathers vectorizados en lugar de un join por cada fecha
+"""
+
+import polars as pl
+import src.aux_tools as aux_tools
+import src.parametros as params
+
+
+def construir_indice(
+    tasas_cambio: pl.DataFrame, asof: bool = False
+) -> tuple[pl.DataFrame, pl.Series]:
+    """
+    Devuelve los rangos de cada moneda (fecha inicial en días, cantidad de días y
+    desplazamiento dentro del arreglo) y el arreglo denso de tasas.
+    Con asof=True las fechas sin tasa toman la última tasa disponible de la moneda.
+    Las fechas se llevan a pl.Date, el excel las puede leer como Datetime
+    """
+    tasas = (
+        aux_tools.materializar(tasas_cambio)
+        .select("moneda_origen", pl.col("fecha").cast(pl.Date), "tasa_cambio")
+        .filter(pl.col("moneda_origen").is_not_null() & pl.col("fecha").is_not_null())
+        .unique(subset=["moneda_origen", "fecha"], keep="last", maintain_order=True)
+    )
+    rangos = (
+        tasas.group_by("moneda_origen")
+        .agg(
+            fecha_min=pl.col("fecha").min(),
+            fecha_max=pl.col("fecha").max(),
+        )
+        .sort("moneda_origen")
+        .with_columns(
+            dias=(pl.col("fecha_max") - pl.col("fecha_min")).dt.total_days() + 1,
+        )
+        .with_columns(desplazamiento=pl.col("dias").cum_sum() - pl.col("dias"))
+    )
+    validar_rangos(rangos)
+    # grilla densa con todas las fechas del rango de cada moneda
+    densa = (
+        rangos.select(
+            "moneda_origen",
+            fecha=pl.date_ranges("fecha_min", "fecha_max"),
+        )
+        .explode("fecha")
+        .join(tasas, on=["moneda_origen", "fecha"], how="left", maintain_order="left")
+    )
+    if asof:
+        densa = densa.with_columns(
+            pl.col("tasa_cambio").forward_fill().over("moneda_origen")
+        )
+    rangos = rangos.select(
+        "moneda_origen",
+        pl.col("fecha_min").cast(pl.Int64).alias("inicio"),
+        "dias",
+        "desplazamiento",
+    )
+    return rangos, densa.get_column("tasa_cambio")
+
+
+# columnas temporales con el rango de la moneda de cada fila dentro del arreglo denso
+COLUMNAS_RANGO = {
+    "inicio": "_inicio_tasa",
+    "dias": "_dias_tasa",
+    "desplazamiento": "_desplazamiento_tasa",
+}
+
+
+def rango_moneda(
+    indice: tuple[pl.DataFrame, pl.Series], moneda: str = "moneda"
+) -> list[pl.Expr]:
+    """
+    Rango de la moneda de cada fila en el arreglo denso, nulo si la moneda no tiene tasas.
+    Se agrega como columnas (COLUMNAS_RANGO) una sola vez para todas las fechas que se buscan
+    """
+    rangos, _ = indice
+    return [
+        pl.col(moneda)
+        .replace_strict(
+            rangos.get_column("moneda_origen"),
+            rangos.get_column(campo),
+            default=None,
+        )
+        .alias(columna)
+        for campo, columna in COLUMNAS_RANGO.items()
+    ]
+
+
+def validar_rangos(rangos: pl.DataFrame) -> None:
+    """
+    El arreglo denso tiene una posición por día entre la primera y la última fecha de cada
+    moneda: una fecha centinela (por ejemplo 3000-12-31) lo haría crecer sin límite
+    """
+    fuera_de_rango = rangos.filter(pl.col("dias") > params.MAX_DIAS_TASAS_CAMBIO)
+    if fuera_de_rango.height:
+        detalle = ", ".join(
+            f"{moneda} ({inicio} a {fin})"
+            for moneda, inicio, fin in fuera_de_rango.select(
+                "moneda_origen", "fecha_min", "fecha_max"
+            ).iter_rows()
+        )
+        raise ValueError(
+            f"Las tasas de cambio de {detalle} superan {params.MAX_DIAS_TASAS_CAMBIO} "
+            "días entre la primera y la última fecha, revisar fechas centinela en el insumo"
+        )
+
+
+def buscar_tasa(
+    fecha: pl.Expr,
+    indice: tuple[pl.DataFrame, pl.Series],
+    asof: bool = False,
+) -> pl.Expr:
+    """
+    Tasa de la moneda en la fecha dada a partir de las columnas de rango_moneda, nula si la
+    moneda no tiene tasas o si la fecha está por fuera de su rango. Con asof=True las fechas
+    posteriores al rango toman la última tasa disponible. La posición cuenta días, la fecha
+    se lleva a pl.Date
+    """
+    _, tasas = indice
+    inicio, dias, desplazamiento = (pl.col(columna) for columna in COLUMNAS_RANGO.values())
+
+    dia = fecha.cast(pl.Date).cast(pl.Int64) - inicio
+    if asof:
+        # despues del rango se usa la ultima posicion de la moneda
+        posicion = pl.when(dia >= 0).then(
+            desplazamiento + pl.min_horizontal(dia, dias - 1)
+        )
+    else:
+        posicion = pl.when((dia >= 0) & (dia < dias)).then(desplazamiento + dia)
+    return pl.lit(tasas).gather(posicion)
@@ -2,7 +2,24 @@ from datetime import date
 
 import polars as pl
 import src.parametros as params
-import duckdb
+import src.aux_tools as aux_tools
+import src.sesion_duckdb as sesion_duckdb
+
+# columnas del output de devengo con las que se homologa y se cruza con la tabla de BTs
+LLAVES_MAPEO = [
+    "anio_liberacion",
+    "componente",
+    "clasificacion_adicional",
+    "tipo_negocio",
+    "tipo_contrato",
+    "tipo_reasegurador",
+    "compania",
+    "ramo_sura",
+    "tipo_contabilidad",
+    "transicion",
+]
+# atributos de cada movimiento que determinan sus códigos homologados y su BT
+ATRIBUTOS_MAPEO = ["tipo_movimiento"] + LLAVES_MAPEO
 
 
 def asignar_tipo_seguro(base: pl.DataFrame, tipo_seg: pl.DataFrame) -> pl.DataFrame:
@@ -21,10 +38,11 @@ def cruzar_bt(
     relacion_bt = relacion_bt.with_columns(
         pl.col("tipo_reasegurador").str.to_uppercase()
     )
+    # DuckDB colecta el plan de todas formas
+    referencia = out_devengo_fluct
+    out_devengo_fluct = aux_tools.materializar(out_devengo_fluct)
 
-    print("Registros antes del cruce BT: ", out_devengo_fluct.shape[0])
-    con = duckdb.connect(database=":memory:")  # isolate to memory
-    result = duckdb.sql(
+    result = sesion_duckdb.consultar(
         """
         SELECT
             out_devengo_fluct.*,
@@ -45,80 +63,218 @@ def cruzar_bt(
             AND out_devengo_fluct.tipo_contabilidad_codigo = relacion_bt.tipo_contabilidad
             AND out_devengo_fluct.tipo_reserva = relacion_bt.tipo_reserva
             AND out_devengo_fluct.transicion_codigo = relacion_bt.transicion
-        """
-    ).pl()
-    con.close()
-    print("Registros despues del cruce BT: ", result.shape[0])
-    return result
+        """,
+        {"out_devengo_fluct": out_devengo_fluct, "relacion_bt": relacion_bt},
+    )
+    return aux_tools.igualar_tipo_frame(result, referencia)
 
 
 def pivotear_output(
-    out_deterioro_fluct: pl.DataFrame, cols_calculadas: list
+    out_deterioro_fluct: pl.DataFrame,
+    cols_calculadas: list,
+    columnas_indice: list[str] | None = None,
 ) -> pl.DataFrame:
     """
     El output de devengo es wide, se transforma a long para cruzar con BTs.
+    Cada columna calculada genera sus movimientos por separado y los valores nulos o
+    en cero se descartan antes de duplicar las columnas indice. Sin columnas_indice se
+    conservan todas las columnas no calculadas
     """
-    columnas_indice = [
-        col for col in out_deterioro_fluct.columns if col not in cols_calculadas
+    columnas = out_deterioro_fluct.collect_schema().names()
+    if columnas_indice is None:
+        columnas_indice = [col for col in columnas if col not in cols_calculadas]
+
+    tasa_valoracion = (
+        pl.when(pl.col("tipo_contabilidad").is_in(["ifrs4_local", "ifrs17_local"]))
+        .then(pl.col("tasa_cambio_fecha_valoracion_local"))
+        .otherwise(pl.col("tasa_cambio_fecha_valoracion_corporativo"))
+    )
+    # columnas necesarias para convertir a pesos, aunque no se conserven en el indice
+    columnas_tasas = [
+        "tipo_contabilidad",
+        "tasa_cambio_fecha_constitucion",
+        "tasa_cambio_fecha_valoracion_local",
+        "tasa_cambio_fecha_valoracion_corporativo",
     ]
+    columnas_base = list(
+        dict.fromkeys(
+            columnas_indice + [col for col in columnas_tasas if col in columnas]
+        )
+    )
 
-    multiplicador = (
-        pl.when(pl.col("tipo_movimiento") == "valor_constitucion")
-        .then(pl.col("tasa_cambio_fecha_constitucion"))
-        .when(
-            pl.col("tipo_movimiento").is_in(
-                ["fluctuacion_constitucion", "fluctuacion_liberacion"]
+    movimientos = []
+    for tipo_movimiento in [col for col in columnas if col in cols_calculadas]:
+        if tipo_movimiento == "valor_constitucion":
+            multiplicador = pl.col("tasa_cambio_fecha_constitucion")
+        elif tipo_movimiento in ["fluctuacion_constitucion", "fluctuacion_liberacion"]:
+            multiplicador = pl.lit(1.0)
+        else:
+            multiplicador = tasa_valoracion
+
+        if tipo_movimiento in [
+            "valor_constitucion",
+            "fluctuacion_constitucion",
+            "constitucion_deterioro",
+            "saldo",
+            "acreditacion_intereses",  # Nuevo para componente de financiacion
+        ]:
+            anio_liberacion = pl.lit("no_aplica").cast(
+                out_deterioro_fluct.collect_schema()["anio_liberacion"]
             )
+        else:
+            anio_liberacion = pl.col("anio_liberacion")
+
+        # la fluctuacion solo tiene valor en pesos
+        if tipo_movimiento in ["fluctuacion_constitucion", "fluctuacion_liberacion"]:
+            valor_md = pl.lit(0.0)
+        else:
+            valor_md = pl.col("_valor")
+
+        movimientos.append(
+            out_deterioro_fluct.select(
+                columnas_base + [pl.col(tipo_movimiento).alias("_valor")]
+            )
+            # solo los valores validos pasan a filas
+            .filter(pl.col("_valor").is_not_null() & (pl.col("_valor") != 0))
+            .with_columns(
+                anio_liberacion.alias("anio_liberacion"),
+                pl.lit(tipo_movimiento).alias("tipo_movimiento"),
+                valor_md.alias("valor_md"),
+                (multiplicador * pl.col("_valor")).alias("valor_ml"),
+            )
+            .select(columnas_indice + ["tipo_movimiento", "valor_md", "valor_ml"])
         )
-        .then(1)
-        .otherwise(
-            pl.when(pl.col("tipo_contabilidad").is_in(["ifrs4_local", "ifrs17_local"]))
-            .then(pl.col("tasa_cambio_fecha_valoracion_local"))
-            .otherwise(pl.col("tasa_cambio_fecha_valoracion_corporativo"))
-        )
+
+    return pl.concat(movimientos, how="vertical_relaxed")
+
+
+def adjuntar_descriptivas(
+    movimientos: pl.DataFrame,
+    out_deterioro_fluct: pl.DataFrame,
+    cols_calculadas: list,
+    columnas_indice: list[str],
+) -> pl.DataFrame:
+    """
+    Devuelve a los movimientos las columnas descriptivas del output de devengo por el
+    identificador de fila. Los componentes no devengables ya traen sus columnas
+    """
+    columnas_out = out_deterioro_fluct.collect_schema().names()
+    columnas_mov = movimientos.collect_schema().names()
+    descriptivas = [
+        col
+        for col in columnas_out
+        if col not in cols_calculadas and col not in columnas_indice
+    ]
+    # mismo orden de columnas que al pivotear el output completo
+    columnas = [
+        col
+        for col in dict.fromkeys(columnas_out + columnas_mov)
+        if col not in cols_calculadas and col != "_id_fila"
+    ]
+
+    devengo = movimientos.filter(pl.col("_id_fila").is_not_null()).drop(
+        [col for col in descriptivas if col in columnas_mov]
     )
+    no_devengables = movimientos.filter(pl.col("_id_fila").is_null())
+    return pl.concat(
+        [
+            devengo.join(
+                out_deterioro_fluct.select(["_id_fila"] + descriptivas),
+                on="_id_fila",
+                how="left",
+            ),
+            no_devengables,
+        ],
+        how="diagonal_relaxed",
+    ).select(columnas)
+
 
+def resolver_tuplas(
+    tuplas: pl.DataFrame,
+    tabla_mapeo_bt: pl.DataFrame,
+    tabla_tipo_seg: pl.DataFrame,
+    tabla_nomenclatura: pl.DataFrame,
+) -> pl.DataFrame:
+    """
+    Homologa y cruza con la tabla de BTs las tuplas de atributos distintas. Una tupla
+    puede resolver a varios registros si la homologación o la relación de BTs
+    tiene más de una coincidencia
+    """
+    # las tablas de homologación son de texto, las categóricas se cruzan como texto
+    esquema = tuplas.collect_schema()
     return (
-        out_deterioro_fluct
-        # columnas calculadas a filas
-        .unpivot(
-            index=columnas_indice,
-            variable_name="tipo_movimiento",
-            value_name="valor_md",
-        )
-        # convierte valores validos a pesos
-        .filter(pl.col("valor_md").is_not_null() & (pl.col("valor_md") != 0))
-        .with_columns((multiplicador * pl.col("valor_md")).alias("valor_ml"))
-        .with_columns(
-            pl.when(
-                pl.col("tipo_movimiento").is_in(
-                    [
-                        "valor_constitucion",
-                        "fluctuacion_constitucion",
-                        "constitucion_deterioro",
-                        "saldo",
-                        "acreditacion_intereses",   # Nuevo para componente de financiacion
-                    ]
-                )
-            )
-            .then(pl.lit("no_aplica"))
-            .otherwise(pl.col("anio_liberacion"))
-            .alias("anio_liberacion")
-        )
-        .with_columns(
-            pl.when(
-                pl.col("tipo_movimiento").is_in(
-                    [
-                        "fluctuacion_constitucion", 
-                        "fluctuacion_liberacion"
-                    ]
-                )
-            )
-            .then(pl.lit(0.0))
-            .otherwise(pl.col("valor_md"))
-            .alias("valor_md")
+        tuplas.with_columns(pl.col(pl.Categorical).cast(pl.String))
+        .pipe(homologar_campos, tabla_nomenclatura)
+        .pipe(asignar_tipo_seguro, tabla_tipo_seg)
+        .pipe(cruzar_bt, tabla_mapeo_bt)
+        .with_columns(pl.col(col).cast(esquema[col]) for col in ATRIBUTOS_MAPEO)
+    )
+
+
+def compilar_mapeo_bt(
+    tuplas: pl.DataFrame,
+    tabla_mapeo_bt: pl.DataFrame,
+    tabla_tipo_seg: pl.DataFrame,
+    tabla_nomenclatura: pl.DataFrame,
+    mapeo: pl.DataFrame | None = None,
+) -> pl.DataFrame:
+    """
+    Mapeo de cada tupla de atributos a sus códigos homologados y su BT. Con el mapeo
+    ya compilado en la ejecución solo se resuelven las tuplas que aún no estén en él
+    """
+    if mapeo is not None:
+        tuplas = tuplas.join(
+            mapeo.select(ATRIBUTOS_MAPEO).unique(),
+            on=ATRIBUTOS_MAPEO,
+            how="anti",
+            nulls_equal=True,
         )
+        if tuplas.height == 0:
+            return mapeo
+
+    resueltas = resolver_tuplas(
+        tuplas,
+        *[
+            aux_tools.materializar(tabla)
+            for tabla in [tabla_mapeo_bt, tabla_tipo_seg, tabla_nomenclatura]
+        ],
     )
+    if mapeo is None:
+        return resueltas
+    return pl.concat([mapeo, resueltas], how="vertical_relaxed")
+
+
+def aplicar_mapeo_bt(
+    movimientos: pl.DataFrame,
+    tabla_mapeo_bt: pl.DataFrame,
+    tabla_tipo_seg: pl.DataFrame,
+    tabla_nomenclatura: pl.DataFrame,
+    mapeo_bt: dict[str, pl.DataFrame] | None = None,
+) -> pl.DataFrame:
+    """
+    Asigna a cada movimiento sus códigos homologados, tipo de seguro y BT con un solo
+    cruce por su tupla de atributos. mapeo_bt guarda el mapeo compilado en la ejecución
+    para reusarlo entre bloques, sin él se compila solo para estos movimientos
+    """
+    referencia = movimientos
+    movimientos = aux_tools.materializar(
+        movimientos.with_columns(pl.col("tipo_reasegurador").fill_null("no_aplica"))
+    )
+    tuplas = movimientos.select(ATRIBUTOS_MAPEO).unique()
+    mapeo = compilar_mapeo_bt(
+        tuplas,
+        tabla_mapeo_bt,
+        tabla_tipo_seg,
+        tabla_nomenclatura,
+        None if mapeo_bt is None else mapeo_bt.get("mapeo"),
+    )
+    if mapeo_bt is not None:
+        mapeo_bt["mapeo"] = mapeo
+
+    resultado = movimientos.join(
+        mapeo, on=ATRIBUTOS_MAPEO, how="left", nulls_equal=True
+    )
+    return aux_tools.igualar_tipo_frame(resultado, referencia)
 
 
 def homologar_campos(
@@ -190,8 +346,12 @@ def agregar_marca_onerosidad(
     output_contable = output_contable.with_columns( 
         pl.col("poliza").cast(pl.Utf8) 
     ) 
-    onerosidad = onerosidad.with_columns( 
-        pl.col("poliza").cast(pl.Utf8)
+    # las llaves de la onerosidad con el mismo tipo del output (texto o categóricas)
+    esquema = output_contable.collect_schema()
+    onerosidad = onerosidad.with_columns(
+        pl.col("poliza").cast(pl.Utf8),
+        pl.col("compania").cast(esquema["compania"]),
+        pl.col("ramo_sura").cast(esquema["ramo_sura"]),
     )
     polizas_onerosas = (
         onerosidad.filter(pl.col("fecha_calculo_onerosidad") <= fe_valoracion)
@@ -216,15 +376,29 @@ def gen_output_contable(
     tabla_tipo_seg: pl.DataFrame,
     tabla_nomenclatura: pl.DataFrame,
     componentes_no_devengables: list[pl.DataFrame],
+    mapeo_bt: dict[str, pl.DataFrame] | None = None,
 ) -> pl.DataFrame:
     """
-    Se encarga de aplicar los pasos para obtener el output segun requerimientos contables
+    Se encarga de aplicar los pasos para obtener el output segun requerimientos contables,
+    mapeo_bt es el mapeo de BTs compilado en la ejecución (ver aplicar_mapeo_bt)
     """
 
+    # los cruces se hacen solo con las llaves de mapeo y el identificador de fila,
+    # las columnas descriptivas se agregan al final
+    out_det_fluc = out_det_fluc.with_row_index("_id_fila")
+    llaves = ["_id_fila"] + [
+        col for col in LLAVES_MAPEO if col in out_det_fluc.collect_schema().names()
+    ]
+
     return (
-        out_det_fluc.pipe(pivotear_output, params.COLUMNAS_CALCULO)
+        out_det_fluc.pipe(pivotear_output, params.COLUMNAS_CALCULO, llaves)
         .pipe(agregar_componentes_no_devengables, componentes_no_devengables)
-        .pipe(homologar_campos, tabla_nomenclatura)
-        .pipe(asignar_tipo_seguro, tabla_tipo_seg)
-        .pipe(cruzar_bt, tabla_mapeo_bt)
+        .pipe(
+            aplicar_mapeo_bt,
+            tabla_mapeo_bt,
+            tabla_tipo_seg,
+            tabla_nomenclatura,
+            mapeo_bt,
+        )
+        .pipe(adjuntar_descriptivas, out_det_fluc, params.COLUMNAS_CALCULO, llaves)
     )
@@ -0,0 +1,91 @@
+"""
+Ejecución de la cartera en paralelo por ramo con un pool de procesos.
+Los insumos se escriben una sola vez en archivos Arrow IPC sin comprimir y cada proceso
+los lee con memory map, así las tablas transversales se comparten entre procesos a
+través del cache del sistema operativo sin copiarlas ni serializarlas
+"""
+
+import contextlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import polars as pl
+import src.aux_tools as aux_tools
+import src.bloques as bloques
+
+
+def compartir_insumos(
+    insumos: dict[str, pl.DataFrame | pl.LazyFrame], carpeta: Path
+) -> dict[str, Path]:
+    """
+    Escribe cada insumo en un archivo IPC de la carpeta y devuelve las rutas
+    """
+    carpeta.mkdir(parents=True, exist_ok=True)
+    rutas = {}
+    for nombre, df in insumos.items():
+        rutas[nombre] = carpeta / f"{nombre}.arrow"
+        df.lazy().sink_ipc(rutas[nombre], compression="uncompressed")
+    return rutas
+
+
+def leer_insumos_compartidos(rutas: dict[str, Path]) -> dict[str, pl.LazyFrame]:
+    return {nombre: pl.scan_ipc(ruta, memory_map=True) for nombre, ruta in rutas.items()}
+
+
+def valores_fragmento(
+    insumos: dict[str, pl.DataFrame | pl.LazyFrame], columna: str = "ramo_sura"
+) -> list:
+    """
+    Valores de la columna de fragmentación presentes en los insumos de cartera
+    """
+    valores = pl.concat(
+        [
+            insumos[nombre].lazy().select(pl.col(columna).cast(pl.String)).unique()
+            for nombre in bloques.INSUMOS_CARTERA
+            if nombre in insumos
+        ]
+    ).unique()
+    return aux_tools.materializar(valores).get_column(columna).sort().to_list()
+
+
+def filtrar_fragmento(
+    insumos: dict[str, pl.DataFrame | pl.LazyFrame],
+    valor: str | None,
+    columna: str = "ramo_sura",
+) -> dict[str, pl.DataFrame | pl.LazyFrame]:
+    """
+    Insumos de un fragmento: los de cartera con ese valor de la columna (nulos incluidos)
+    y los transversales completos
+    """
+    return {
+        nombre: (
+            df.filter(pl.col(columna).cast(pl.String).eq_missing(valor))
+            if nombre in bloques.INSUMOS_CARTERA
+            else df
+        )
+        for nombre, df in insumos.items()
+    }
+
+
+@contextlib.contextmanager
+def pool_procesos(procesos: int) -> Iterator[ProcessPoolExecutor]:
+    """
+    Pool de procesos con inicio spawn, polars no es seguro con fork porque el proceso
+    hijo hereda su pool de hilos. Los hilos de polars se reparten entre los procesos
+    para no sobresuscribir la máquina
+    """
+    hilos_anterior = os.environ.get("POLARS_MAX_THREADS")
+    os.environ["POLARS_MAX_THREADS"] = str(max(1, (os.cpu_count() or 1) // procesos))
+    try:
+        with ProcessPoolExecutor(
+            max_workers=procesos, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            yield pool
+    finally:
+        if hilos_anterior is None:
+            os.environ.pop("POLARS_MAX_THREADS", None)
+        else:
+            os.environ["POLARS_MAX_THREADS"] = hilos_anterior
@@ -20,6 +20,29 @@ RUTA_CUENTA_CORRIENTE_ARL = base_dir.parent / "inputs" / "cuenta_corriente_arl.x
 RUTA_GASTOS = base_dir.parent / "inputs" / "gastos - tests.xlsx"
 RUTA_CAMARA_SOAT = base_dir.parent / "inputs" / "camara_soat.xlsx"
 
+# Cache columnar de los insumos de excel (ver src/cache_insumos.py)
+USAR_CACHE_INSUMOS = True
+RUTA_CACHE_INSUMOS = base_dir.parent / "inputs" / ".cache"
+
+# Columnas de texto de baja cardinalidad como categóricas (ver src/categorias.py)
+CODIFICAR_CATEGORICAS = True
+
+# Devengo incremental desde el estado del cierre anterior (ver src/incremental.py)
+DEVENGO_INCREMENTAL = False
+RUTA_ESTADO_DEVENGO = base_dir.parent / "output" / "estado_devengo"
+
+# Ejecución por bloques de cartera con memoria acotada (ver main.run_pcr_por_bloques)
+FILAS_POR_BLOQUE = 500_000
+# Sesión de DuckDB de los cruces (ver src/sesion_duckdb.py), None usa el valor por defecto
+DUCKDB_HILOS = None
+DUCKDB_LIMITE_MEMORIA = None  # por ejemplo "16GB"
+# carpeta (como texto) para derramar a disco cuando se supera el límite de memoria
+DUCKDB_CARPETA_TEMPORAL = None
+
+# Procesos para la ejecución en paralelo por ramo (ver main.run_pcr_paralelo), None usa
+# todos los núcleos
+PROCESOS_PARALELOS = None
+
 # Insumos transversales
 HOJA_PARAMETROS_CONTAB = "param_contabilidad_nuevo"
 HOJA_EXCEPCIONES_50_50 = "excepciones_50_50"
@@ -52,21 +75,41 @@ FECHA_VALORACION = date(2025, 2, 28)
 FECHA_TRANSICION = date(2024, 12, 31)
 FECHA_VALORACION_ANTERIOR = FECHA_VALORACION + relativedelta(months=-1)
 
-# Rutas salidas
+# Rutas salidas, sin extensión porque cada formato agrega la suya (ver src/salidas.py)
 RUTA_SALIDA_DEVENGO = (
     base_dir.parent
     / "output"
-    / f"output_devengo_fluc_{FECHA_VALORACION.strftime('%d%m%Y')}.xlsx"
+    / f"output_devengo_fluc_{FECHA_VALORACION.strftime('%d%m%Y')}"
 )
 RUTA_SALIDA_CONTABLE = (
     base_dir.parent
     / "output"
-    / f"output_contable_{FECHA_VALORACION.strftime('%d%m%Y')}.xlsx"
+    / f"output_contable_{FECHA_VALORACION.strftime('%d%m%Y')}"
 )
 
+# Diagnóstico de coincidencias de los cruces con parámetros (ver src/diagnosticos.py)
+DIAGNOSTICO_CRUCES = False
+
+# Perfil de tiempo y memoria por etapa de cada ejecución (ver src/perfilador.py)
+PERFILAR_ETAPAS = False
+RUTA_PERFIL = base_dir.parent / "output" / "perfil"
+INTERVALO_MUESTREO_MEMORIA = 0.05  # segundos
+
+# Formato de los outputs: "parquet" (particionado), "ipc" o "csv"
+FORMATO_SALIDA = "parquet"
+COLUMNAS_PARTICION_SALIDA = ["fecha_valoracion", "tipo_contabilidad", "ramo_sura"]
+# Excel solo como muestra pequeña para revisión
+EXPORTAR_MUESTRA_EXCEL = False
+FILAS_MUESTRA_EXCEL = 10_000
+
 # Parametros generales
 NIVELES_DETALLE = ["recibo", "cobertura"]
 MONEDA_DESTINO = "COP"
+# si una fecha no tiene tasa de cambio se usa la última disponible de la moneda
+TASA_CAMBIO_ASOF = False
+# días máximos entre la primera y la última tasa de una moneda en el índice denso de tasas
+# (ver src/indice_tasas.py)
+MAX_DIAS_TASAS_CAMBIO = 36_600  # unos 100 años
 
 # Ayudan a controlar campos de salida, orden y nombres
 CAMPOS_OUTPUT_CONTABLE = [
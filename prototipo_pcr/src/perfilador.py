@@ -0,0 +1,204 @@
+"""
+Perfilador opcional de las etapas del proceso.
+Con params.PERFILAR_ETAPAS cada función pública de los módulos de cálculo (prep_insumo,
+cruces, devenga, fluctuacion, deterioro, mapeo_contable) se envuelve mientras dura la
+ejecución y registra tiempo real, tiempo de CPU, pico de memoria residente y filas y
+columnas de entrada y salida. Al terminar se escribe un reporte JSON por ejecución en
+params.RUTA_PERFIL para comparar un cierre contra otro.
+En modo lazy las etapas solo construyen el plan: el tiempo se concentra en las que
+materializan y las filas de los LazyFrame no se cuentan para no colectarlos
+"""
+
+import contextlib
+import datetime as dt
+import functools
+import json
+import threading
+import time
+import types
+from pathlib import Path
+from typing import Callable, Iterator
+
+import polars as pl
+import psutil
+import src.cruces as cruces
+import src.deterioro as deterioro
+import src.devenga as devenga
+import src.fluctuacion as fluctuacion
+import src.mapeo_contable as mapeo_contable
+import src.parametros as params
+import src.prep_insumo as prep_insumo
+
+MODULOS_PERFILADOS = [
+    prep_insumo,
+    cruces,
+    devenga,
+    fluctuacion,
+    deterioro,
+    mapeo_contable,
+]
+
+# etapas terminadas y etapas en curso (anidadas) de la ejecución perfilada
+_registros: list[dict] = []
+_abiertas: list[dict] = []
+_inicio_ejecucion = 0.0
+_proceso = psutil.Process()
+
+
+def rss_mb() -> float:
+    return _proceso.memory_info().rss / 2**20
+
+
+def forma(df: object) -> tuple[int | None, int | None]:
+    """
+    Filas y columnas de un frame, las filas de un LazyFrame no se cuentan
+    """
+    if isinstance(df, pl.DataFrame):
+        return df.height, df.width
+    if isinstance(df, pl.LazyFrame):
+        return None, len(df.collect_schema())
+    return None, None
+
+
+def actualizar_pico(rss: float) -> None:
+    for registro in list(_abiertas):
+        registro["rss_pico_mb"] = max(registro["rss_pico_mb"], rss)
+
+
+@contextlib.contextmanager
+def etapa(nombre: str, entrada: object = None) -> Iterator[dict]:
+    """
+    Registra una etapa, se puede anidar dentro de otra
+    """
+    if not params.PERFILAR_ETAPAS:
+        yield {}
+        return
+    rss = rss_mb()
+    filas, columnas = forma(entrada)
+    registro = {
+        "etapa": nombre,
+        "padre": _abiertas[-1]["etapa"] if _abiertas else None,
+        "nivel": len(_abiertas),
+        "orden": len(_registros) + len(_abiertas),
+        "inicio_s": time.perf_counter() - _inicio_ejecucion,
+        "filas_entrada": filas,
+        "columnas_entrada": columnas,
+        "filas_salida": None,
+        "columnas_salida": None,
+        "rss_inicio_mb": rss,
+        "rss_pico_mb": rss,
+    }
+    _abiertas.append(registro)
+    inicio, inicio_cpu = time.perf_counter(), time.process_time()
+    try:
+        yield registro
+    finally:
+        registro["wall_s"] = time.perf_counter() - inicio
+        # CPU de todo el proceso, incluye los hilos de polars y DuckDB
+        registro["cpu_s"] = time.process_time() - inicio_cpu
+        registro["rss_fin_mb"] = rss_mb()
+        actualizar_pico(registro["rss_fin_mb"])
+        _abiertas.pop()
+        _registros.append(registro)
+
+
+def instrumentar(funcion: Callable, nombre: str) -> Callable:
+    """
+    Envuelve la función en una etapa. Solo se reportan las llamadas que reciben
+    o devuelven un frame, las que construyen expresiones se descartan
+    """
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        entrada = next(
+            (
+                arg
+                for arg in (*args, *kwargs.values())
+                if isinstance(arg, (pl.DataFrame, pl.LazyFrame))
+            ),
+            None,
+        )
+        with etapa(nombre, entrada) as registro:
+            resultado = funcion(*args, **kwargs)
+            registro["filas_salida"], registro["columnas_salida"] = forma(resultado)
+        if entrada is None and registro["columnas_salida"] is None:
+            _registros.remove(registro)
+        return resultado
+
+    return envoltura
+
+
+def muestrear_memoria(detener: threading.Event) -> None:
+    """
+    Las etapas materializan en hilos de polars y DuckDB, el pico se muestrea
+    mientras corren
+    """
+    while not detener.wait(params.INTERVALO_MUESTREO_MEMORIA):
+        actualizar_pico(rss_mb())
+
+
+def ruta_reporte(fe_valoracion: dt.date) -> Path:
+    return (
+        params.RUTA_PERFIL
+        / f"perfil_{fe_valoracion:%Y%m%d}_{dt.datetime.now():%Y%m%dT%H%M%S}.json"
+    )
+
+
+def escribir_reporte(ruta: Path, metadatos: dict) -> Path:
+    etapas = sorted(_registros, key=lambda registro: registro["orden"])
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.write_text(
+        json.dumps({**metadatos, "etapas": etapas}, indent=2, default=str)
+    )
+    return ruta
+
+
+@contextlib.contextmanager
+def perfilar(nombre: str, **metadatos) -> Iterator[None]:
+    """
+    Perfila la ejecución si params.PERFILAR_ETAPAS está activo: instrumenta los módulos
+    de cálculo, la registra como la etapa nombre y al salir restaura las funciones
+    originales y escribe el reporte
+    """
+    global _inicio_ejecucion
+    if not params.PERFILAR_ETAPAS:
+        yield
+        return
+
+    originales = [
+        (modulo, nombre_funcion, funcion)
+        for modulo in MODULOS_PERFILADOS
+        for nombre_funcion, funcion in vars(modulo).items()
+        if isinstance(funcion, types.FunctionType)
+        and funcion.__module__ == modulo.__name__
+        and not nombre_funcion.startswith("_")
+    ]
+    for modulo, nombre_funcion, funcion in originales:
+        etiqueta = f"{modulo.__name__.removeprefix('src.')}.{nombre_funcion}"
+        setattr(modulo, nombre_funcion, instrumentar(funcion, etiqueta))
+
+    _registros.clear()
+    _inicio_ejecucion = time.perf_counter()
+    detener = threading.Event()
+    muestreo = threading.Thread(target=muestrear_memoria, args=(detener,), daemon=True)
+    muestreo.start()
+    inicio = dt.datetime.now()
+    try:
+        with etapa(nombre):
+            yield
+    finally:
+        detener.set()
+        muestreo.join()
+        for modulo, nombre_funcion, funcion in originales:
+            setattr(modulo, nombre_funcion, funcion)
+        ruta = escribir_reporte(
+            ruta_reporte(params.FECHA_VALORACION),
+            {
+                "ejecucion": nombre,
+                "fecha_valoracion": params.FECHA_VALORACION,
+                "inicio": inicio,
+                **metadatos,
+            },
+        )
+        _registros.clear()
+        print(f"Perfil de etapas en {ruta}")
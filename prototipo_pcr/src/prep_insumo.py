@@ -6,10 +6,11 @@ cada tipo de insumo tiene una función para hacer explícitos los pasos específ
 
 import polars as pl
 import datetime as dt
-import duckdb
+import src.sesion_duckdb as sesion_duckdb
 import src.cruces as cruces
 import src.parametros as params
 import src.aux_tools as aux_tools
+import src.esquemas as esquemas
 
 # la fecha de inicio y fin de vigencia dependiendo del nivel de detalle
 fe_ini_vig_nivel = aux_tools.get_fecha_nivel(
@@ -19,42 +20,190 @@ fe_fin_vig_nivel = aux_tools.get_fecha_nivel(
     "nivel_detalle", params.NIVELES_DETALLE, "fecha_fin_vigencia"
 )
 
-def prep_input_prima_directo(
-    produccion_df: pl.DataFrame,
-    param_contabilidad: pl.DataFrame,
-    excepciones_df: pl.DataFrame,
-    fe_valoracion: dt.date,
+# tipo de insumo que corresponde a cada tipo de gasto segun la tabla fuente
+MAPEO_GASTOS_DIRECTO = {
+    "expedicion_comisiones": "gasto_comi_directo",
+    "expedicion_otros": "gasto_otro_directo",
+    "terremoto_factor_pprr": "terremoto_factor_pprr",
+    "terremoto_nota_tecnica": "terremoto_nota_tecnica",
+}
+MAPEO_GASTOS_REA = {
+    "expedicion_comisiones": "gasto_comi_rea_prop",
+    "expedicion_otros": "gasto_otro_rea_prop",
+}
+
+
+def tipo_insumo_gasto(mapping_gastos: dict[str, str]) -> pl.Expr:
+    """
+    Mapea el tipo insumo segun el tipo de gasto, los ramos de matematica llevan prefijo
+    """
+    return (
+        pl.when(pl.col("ramo_sura").is_in(params.RAMOS_MATEMATICA))
+        .then(
+            pl.lit("matematica_local_") + pl.col("tipo_gasto").replace(mapping_gastos)
+        )
+        .otherwise(pl.col("tipo_gasto").replace(mapping_gastos))
+    )
+
+
+def agregar_fechas_recibo(base: pl.DataFrame) -> pl.DataFrame:
+    """
+    Fechas de vigencia, constitucion y devengo de los insumos que se constituyen
+    en la fecha de contabilizacion del recibo, segun el nivel de detalle
+    """
+    return (
+        base.with_columns(fe_ini_vig_nivel.alias("fecha_inicio_vigencia"))
+        .with_columns(
+            # NOTA: La fecha de emision es la fecha de contabilizacion en SAP
+            pl.col("fecha_contabilizacion_recibo").alias("fecha_constitucion")
+        )
+        .with_columns(
+            pl.max_horizontal([pl.col("fecha_constitucion"), fe_ini_vig_nivel]).alias(
+                "fecha_inicio_devengo"
+            )
+        )
+        .with_columns(fe_fin_vig_nivel.alias("fecha_fin_devengo"))
+    )
+
+
+def parametrizar_por_llaves(
+    base: pl.DataFrame, param_contabilidad: pl.DataFrame, excepciones_df: pl.DataFrame
 ) -> pl.DataFrame:
-    # realiza los cruces base entre produccion del directo y parametros
-    input_prima_directo = (
-        produccion_df.filter(pl.col("fecha_contabilizacion_recibo") <= fe_valoracion)
-        .pipe(cruces.cruzar_param_contabilidad, param_contabilidad)
-        .pipe(cruces.cruzar_excepciones_50_50, excepciones_df)
+    """
+    Cruza la base con los parametros contables y las excepciones 50/50. Ambos cruces
+    dependen solo de unas pocas columnas llave (tipo_insumo, tipo_negocio,
+    tipo_contabilidad y las de la tabla de excepciones), se hacen sobre sus
+    combinaciones distintas y el resultado se une a la base, asi los registros
+    completos no pasan por DuckDB. Las filas con tipo_contabilidad se restringen a la
+    suya, las que no lo traen se abren en todas las del parametro
+    """
+    if "tipo_contabilidad" not in base.collect_schema().names():
+        base = base.with_columns(pl.lit(None, pl.String).alias("tipo_contabilidad"))
+    columnas = base.collect_schema().names()
+    excepciones_df = aux_tools.materializar(excepciones_df)
+    llaves = list(
+        dict.fromkeys(
+            ["tipo_insumo", "tipo_negocio", "tipo_contabilidad"]
+            + [col for col in excepciones_df.columns if col in columnas]
+        )
     )
-    # la fecha de inicio vigencia se guarda en una columna segun el nivel de detalle
-    input_prima_directo = input_prima_directo.with_columns(
-        fe_ini_vig_nivel.alias("fecha_inicio_vigencia")
+    llaves_cruce = [f"_llave_{col}" for col in llaves]
+    parametros = (
+        aux_tools.materializar(base.select(llaves).unique())
+        .with_columns(pl.col(llaves).name.prefix("_llave_"))
+        .pipe(
+            cruces.cruzar_param_contabilidad,
+            param_contabilidad,
+            restriccion_parcial=True,
+        )
+        .pipe(cruces.cruzar_excepciones_50_50, excepciones_df)
     )
-    # la fecha de constitucion de reserva es la de emision del recibo
-    # NOTA: La fecha de emision es la fecha de contabilizacion en SAP
-    input_prima_directo = input_prima_directo.with_columns(
-        pl.col("fecha_contabilizacion_recibo").alias("fecha_constitucion")
+    # las columnas que la base ya trae se reemplazan por las del cruce
+    repetidas = [col for col in parametros.columns if col in columnas]
+    return (
+        base.join(
+            aux_tools.igualar_tipo_frame(parametros, base),
+            left_on=llaves,
+            right_on=llaves_cruce,
+            how="inner",
+            nulls_equal=True,
+            suffix="_param",
+            maintain_order="left",
+        )
+        .with_columns(pl.col(f"{col}_param").alias(col) for col in repetidas)
+        .drop(f"{col}_param" for col in repetidas)
     )
-    # la fecha de inicio y fin de vigencia dependiendo del nivel de detalle
-    input_prima_directo = input_prima_directo.with_columns(
-        pl.max_horizontal([pl.col("fecha_constitucion"), fe_ini_vig_nivel]).alias(
-            "fecha_inicio_devengo"
+
+
+def filtrar_contabilizados(fuente_df: pl.DataFrame, fe_valoracion: dt.date) -> pl.DataFrame:
+    """
+    Recibos contabilizados a la fecha de valoracion, base comun de los insumos de
+    prima, descuento y gasto
+    """
+    return fuente_df.filter(pl.col("fecha_contabilizacion_recibo") <= fe_valoracion)
+
+
+def valor_prima(reaseguro: bool) -> pl.Expr:
+    return pl.col("valor_prima_cedida" if reaseguro else "valor_prima_emitida")
+
+
+def proyectar_prima(base: pl.DataFrame, reaseguro=False) -> pl.DataFrame:
+    """
+    Insumo de prima emitida o cedida, el valor base del devengo es la prima
+    """
+    return base.with_columns(valor_prima(reaseguro).alias("valor_base_devengo"))
+
+
+def proyectar_dcto(
+    base: pl.DataFrame, descuento_df: pl.DataFrame, reaseguro=False
+) -> pl.DataFrame:
+    """
+    Insumo de descuento comercial, el valor base del devengo es el porc descuento
+    comercial aplicado a la prima tarifa reconstruida
+    """
+    # se reconstruye la prima antes de otorgar los descuentos o prima tarifa
+    pct_dcto_total = pl.col("podto_comercial") + pl.col("podto_tecnico")
+    prima_reconstruida = valor_prima(reaseguro) / (1 - pct_dcto_total)
+    return (
+        base.with_columns(
+            pl.lit("dcto_rea_prop" if reaseguro else "dcto_directo").alias("tipo_insumo")
+        )
+        .pipe(cruces.cruzar_descuento, descuento_df, reaseguro)
+        .with_columns(
+            (prima_reconstruida * pl.col("podto_comercial")).alias("valor_base_devengo")
         )
     )
-    # la fecha de fin del devengo
-    input_prima_directo = input_prima_directo.with_columns(
-        fe_fin_vig_nivel.alias("fecha_fin_devengo")
+
+
+def proyectar_gasto(
+    base: pl.DataFrame, gasto_df: pl.DataFrame, reaseguro=False
+) -> pl.DataFrame:
+    """
+    Insumo de gasto de expedicion, el valor base del devengo es el porc de gasto
+    aplicado sobre la prima
+    """
+    mapping_gastos = MAPEO_GASTOS_REA if reaseguro else MAPEO_GASTOS_DIRECTO
+    proyeccion = base.pipe(cruces.cruzar_gastos_expedicion, gasto_df, reaseguro)
+    if reaseguro:
+        proyeccion = proyeccion.filter(
+            pl.col("tipo_gasto").is_in(list(mapping_gastos.keys()))
+        )
+    return proyeccion.filter(
+        # sin tipo_contabilidad el gasto no cruza con ningun parametro
+        pl.col("tipo_contabilidad").is_not_null()
+    ).with_columns(
+        tipo_insumo_gasto(mapping_gastos).alias("tipo_insumo"),
+        (valor_prima(reaseguro) * pl.col("porc_gasto")).alias("valor_base_devengo"),
     )
-    # el valor base del devengo
-    input_prima_directo = input_prima_directo.with_columns(
-        pl.col("valor_prima_emitida").alias("valor_base_devengo")
+
+
+def preparar_proyecciones(
+    proyecciones: list[pl.DataFrame],
+    param_contabilidad: pl.DataFrame,
+    excepciones_df: pl.DataFrame,
+) -> pl.DataFrame:
+    """
+    Apila las proyecciones de una misma tabla fuente y les agrega parametros,
+    excepciones 50/50 y fechas de devengo en un solo paso
+    """
+    return (
+        pl.concat(proyecciones, how="diagonal_relaxed")
+        .pipe(parametrizar_por_llaves, param_contabilidad, excepciones_df)
+        .pipe(agregar_fechas_recibo)
+        .pipe(esquemas.conformar_input_devengo)
+    )
+
+
+def prep_input_prima_directo(
+    produccion_df: pl.DataFrame,
+    param_contabilidad: pl.DataFrame,
+    excepciones_df: pl.DataFrame,
+    fe_valoracion: dt.date,
+) -> pl.DataFrame:
+    base = filtrar_contabilizados(produccion_df, fe_valoracion)
+    return preparar_proyecciones(
+        [proyectar_prima(base)], param_contabilidad, excepciones_df
     )
-    return input_prima_directo
 
 
 # Prepara el insumo de descuento comercial directo
@@ -65,38 +214,10 @@ def prep_input_dcto_directo(
     descuento_df: pl.DataFrame,
     fe_valoracion: dt.date,
 ) -> pl.DataFrame:
-    # se reconstruye la prima antes de otorgar los descuentos o prima tarifa
-    pct_dcto_total = pl.col("podto_comercial") + pl.col("podto_tecnico")
-    prima_reconstruida = pl.col("valor_prima_emitida") / (1 - pct_dcto_total)
-
-    # cambia el tipo de insumo al descuento y aplica los cruces de parametros
-    input_dcto_directo = (
-        produccion_df.with_columns(pl.lit("dcto_directo").alias("tipo_insumo"))
-        .pipe(cruces.cruzar_param_contabilidad, param_contabilidad)
-        .pipe(cruces.cruzar_excepciones_50_50, excepciones_df)
-        .pipe(cruces.cruzar_descuento, descuento_df)
-    )
-    # la fecha de constitucion de reserva es la de emision del recibo
-    input_dcto_directo = (
-        input_dcto_directo.filter(
-            pl.col("fecha_contabilizacion_recibo") <= fe_valoracion
-        )
-        .with_columns(fe_ini_vig_nivel.alias("fecha_inicio_vigencia"))
-        .with_columns(
-            pl.col("fecha_contabilizacion_recibo").alias("fecha_constitucion")
-        )
-        .with_columns(
-            pl.max_horizontal([pl.col("fecha_constitucion"), fe_ini_vig_nivel]).alias(
-                "fecha_inicio_devengo"
-            )
-        )
-        .with_columns(fe_fin_vig_nivel.alias("fecha_fin_devengo"))
-        .with_columns(
-            # valor base del devengo es el porc descuento comercial aplicado a la prima tarifa reconstruida
-            (prima_reconstruida * pl.col("podto_comercial")).alias("valor_base_devengo")
-        )
+    base = filtrar_contabilizados(produccion_df, fe_valoracion)
+    return preparar_proyecciones(
+        [proyectar_dcto(base, descuento_df)], param_contabilidad, excepciones_df
     )
-    return input_dcto_directo
 
 
 # Prepara el insumo de gasto de expedicion directo
@@ -107,45 +228,10 @@ def prep_input_gasto_directo(
     gasto_df: pl.DataFrame,
     fe_valoracion: dt.date,
 ) -> pl.DataFrame:
-    mapping_gastos = {
-        "expedicion_comisiones": "gasto_comi_directo",
-        "expedicion_otros": "gasto_otro_directo",
-        "terremoto_factor_pprr": "terremoto_factor_pprr",
-        "terremoto_nota_tecnica": "terremoto_nota_tecnica",
-    }
-
-    input_gasto_directo = (
-        produccion_df.filter(pl.col("fecha_contabilizacion_recibo") <= fe_valoracion)
-        .pipe(cruces.cruzar_gastos_expedicion, gasto_df)
-        .with_columns(
-            # mapea el tipo insumo segun el tipo de gasto
-            tipo_insumo=pl.when(pl.col("ramo_sura").is_in(params.RAMOS_MATEMATICA))
-            .then(
-                pl.lit("matematica_local_")
-                + pl.col("tipo_gasto").replace(mapping_gastos)
-            )
-            .otherwise(pl.col("tipo_gasto").replace(mapping_gastos))
-        )
-        .pipe(cruces.cruzar_param_contabilidad, param_contabilidad)
-        .pipe(cruces.cruzar_excepciones_50_50, excepciones_df)
-        .with_columns(fe_ini_vig_nivel.alias("fecha_inicio_vigencia"))
-        .with_columns(
-            pl.col("fecha_contabilizacion_recibo").alias("fecha_constitucion")
-        )
-        .with_columns(
-            pl.max_horizontal([pl.col("fecha_constitucion"), fe_ini_vig_nivel]).alias(
-                "fecha_inicio_devengo"
-            )
-        )
-        .with_columns(fe_fin_vig_nivel.alias("fecha_fin_devengo"))
-        .with_columns(
-            # valor base del devengo es el porc de gasto aplicado sobre la prima emitida
-            (pl.col("valor_prima_emitida") * pl.col("porc_gasto")).alias(
-                "valor_base_devengo"
-            )
-        )
+    base = filtrar_contabilizados(produccion_df, fe_valoracion)
+    return preparar_proyecciones(
+        [proyectar_gasto(base, gasto_df)], param_contabilidad, excepciones_df
     )
-    return input_gasto_directo
 
 
 # Prepara el insumo de prima cedida reaseguro proporcional
@@ -155,25 +241,11 @@ def prep_input_prima_rea(
     excepciones_df: pl.DataFrame,
     fe_valoracion: dt.date,
 ) -> pl.DataFrame:
-    # realiza los cruces base entre cesion del reaseguro y parametros
-    input_prima_rea = (
-        cesion_rea_df.filter(pl.col("fecha_contabilizacion_recibo") <= fe_valoracion)
-        .pipe(cruces.cruzar_param_contabilidad, param_contabilidad)
-        .pipe(cruces.cruzar_excepciones_50_50, excepciones_df)
-        .with_columns(fe_ini_vig_nivel.alias("fecha_inicio_vigencia"))
-        .with_columns(
-            # se constituye en la fe emision recibo de rea
-            pl.col("fecha_contabilizacion_recibo").alias("fecha_constitucion")
-        )
-        .with_columns(
-            pl.max_horizontal([pl.col("fecha_constitucion"), fe_ini_vig_nivel]).alias(
-                "fecha_inicio_devengo"
-            )
-        )
-        .with_columns(fe_fin_vig_nivel.alias("fecha_fin_devengo"))
-        .with_columns((pl.col("valor_prima_cedida")).alias("valor_base_devengo"))
+    # se constituye en la fe emision recibo de rea
+    base = filtrar_contabilizados(cesion_rea_df, fe_valoracion)
+    return preparar_proyecciones(
+        [proyectar_prima(base, reaseguro=True)], param_contabilidad, excepciones_df
     )
-    return input_prima_rea
 
 
 # Prepara el insumo de descuento comercial aplicado al reaseguro proporcional
@@ -184,35 +256,12 @@ def prep_input_dcto_rea(
     descuento_df: pl.DataFrame,
     fe_valoracion: dt.date,
 ) -> pl.DataFrame:
-    # se reconstruye la prima antes de otorgar los descuentos o prima tarifa
-    pct_dcto_total = pl.col("podto_comercial") + pl.col("podto_tecnico")
-    prima_reconstruida_ced = pl.col("valor_prima_cedida") / (1 - pct_dcto_total)
-
-    # cambia el tipo de insumo al descuento y aplica los cruces de parametros
-    input_dcto_rea = (
-        cesion_rea_df.filter(pl.col("fecha_contabilizacion_recibo") <= fe_valoracion)
-        .with_columns(pl.lit("dcto_rea_prop").alias("tipo_insumo"))
-        .pipe(cruces.cruzar_param_contabilidad, param_contabilidad)
-        .pipe(cruces.cruzar_excepciones_50_50, excepciones_df)
-        .pipe(cruces.cruzar_descuento, descuento_df, True)
-        .with_columns(fe_ini_vig_nivel.alias("fecha_inicio_vigencia"))
-        .with_columns(
-            pl.col("fecha_contabilizacion_recibo").alias("fecha_constitucion")
-        )
-        .with_columns(
-            pl.max_horizontal([pl.col("fecha_constitucion"), fe_ini_vig_nivel]).alias(
-                "fecha_inicio_devengo"
-            )
-        )
-        .with_columns(fe_fin_vig_nivel.alias("fecha_fin_devengo"))
-        .with_columns(
-            # valor base del devengo es el porc descuento comercial aplicado a la prima reconstruida cedida
-            (prima_reconstruida_ced * pl.col("podto_comercial")).alias(
-                "valor_base_devengo"
-            )
-        )
+    base = filtrar_contabilizados(cesion_rea_df, fe_valoracion)
+    return preparar_proyecciones(
+        [proyectar_dcto(base, descuento_df, reaseguro=True)],
+        param_contabilidad,
+        excepciones_df,
     )
-    return input_dcto_rea
 
 
 # Prepara el insumo de gasto expedicion del reaseguro proporcional
@@ -223,44 +272,41 @@ def prep_input_gasto_rea(
     gasto_df: pl.DataFrame,
     fe_valoracion: dt.date,
 ) -> pl.DataFrame:
-    mapping_gastos = {
-        "expedicion_comisiones": "gasto_comi_rea_prop",
-        "expedicion_otros": "gasto_otro_rea_prop",
-    }
-
-    input_gasto_rea = (
-        cesion_rea_df.filter(pl.col("fecha_contabilizacion_recibo") <= fe_valoracion)
-        .pipe(cruces.cruzar_gastos_expedicion, gasto_df, True)
-        .filter(pl.col("tipo_gasto").is_in(list(mapping_gastos.keys())))
-        .with_columns(
-            # mapea el tipo insumo segun el tipo de gasto
-            tipo_insumo=pl.when(pl.col("ramo_sura").is_in(params.RAMOS_MATEMATICA))
-            .then(
-                pl.lit("matematica_local_")
-                + pl.col("tipo_gasto").replace(mapping_gastos)
-            )
-            .otherwise(pl.col("tipo_gasto").replace(mapping_gastos))
-        )
-        .pipe(cruces.cruzar_param_contabilidad, param_contabilidad)
-        .pipe(cruces.cruzar_excepciones_50_50, excepciones_df)
-        .with_columns(fe_ini_vig_nivel.alias("fecha_inicio_vigencia"))
-        .with_columns(
-            pl.col("fecha_contabilizacion_recibo").alias("fecha_constitucion")
-        )
-        .with_columns(
-            pl.max_horizontal([pl.col("fecha_constitucion"), fe_ini_vig_nivel]).alias(
-                "fecha_inicio_devengo"
-            )
-        )
-        .with_columns(fe_fin_vig_nivel.alias("fecha_fin_devengo"))
-        .with_columns(
-            # valor base del devengo es el porc de gasto aplicado sobre la prima cedida
-            (pl.col("valor_prima_cedida") * pl.col("porc_gasto")).alias(
-                "valor_base_devengo"
-            )
-        )
+    base = filtrar_contabilizados(cesion_rea_df, fe_valoracion)
+    return preparar_proyecciones(
+        [proyectar_gasto(base, gasto_df, reaseguro=True)],
+        param_contabilidad,
+        excepciones_df,
+    )
+
+
+def prep_inputs_base_comun(
+    fuente_df: pl.DataFrame,
+    param_contabilidad: pl.DataFrame,
+    excepciones_df: pl.DataFrame,
+    descuento_df: pl.DataFrame,
+    gasto_df: pl.DataFrame,
+    fe_valoracion: dt.date,
+    reaseguro=False,
+) -> pl.DataFrame:
+    """
+    Prepara en un solo paso los insumos de prima, descuento y gasto que salen de la
+    misma tabla fuente (produccion del directo o cesion del reaseguro).
+    La base se filtra una vez y cada insumo es una proyeccion de ella; los parametros
+    y excepciones 50/50 se cruzan una sola vez sobre las llaves de las proyecciones
+    apiladas. Equivale a concatenar lo que devuelven prep_input_prima_*,
+    prep_input_dcto_* y prep_input_gasto_*, que preparan una sola proyeccion
+    """
+    base = filtrar_contabilizados(fuente_df, fe_valoracion)
+    return preparar_proyecciones(
+        [
+            proyectar_prima(base, reaseguro),
+            proyectar_dcto(base, descuento_df, reaseguro),
+            proyectar_gasto(base, gasto_df, reaseguro),
+        ],
+        param_contabilidad,
+        excepciones_df,
     )
-    return input_gasto_rea
 
 
 # Prepara el insumo de comision de reaseguro proporcional
@@ -289,7 +335,7 @@ def prep_input_comi_rea(
         .with_columns(fe_fin_vig_nivel.alias("fecha_fin_devengo"))
         .with_columns(pl.col("valor_comision_rea").alias("valor_base_devengo"))
     )
-    return input_comi_rea
+    return input_comi_rea.pipe(esquemas.conformar_input_devengo)
 
 
 # Prepara el insumo de onerosidad
@@ -323,7 +369,7 @@ def prep_input_onerosidad(
         .with_columns(pl.col("valor_onerosidad").alias("valor_base_devengo"))
     )
 
-    return input_onerosidad
+    return input_onerosidad.pipe(esquemas.conformar_input_devengo)
 
 
 def prep_input_recup_onerosidad_pp(
@@ -380,6 +426,7 @@ def prep_input_recup_onerosidad_pp(
             * pl.col("porc_cesion")
             * pl.col("porc_participacion_reasegurador")
         )
+        .pipe(esquemas.conformar_input_devengo)
     )
 
 
@@ -393,7 +440,7 @@ def cruzar_costo_seguim(
     para la fecha de valoración de interés
     """
     fe_valoracion_str = fe_valoracion.strftime("%Y-%m-%d")
-    return duckdb.sql(
+    resultado = sesion_duckdb.consultar(
         f"""
         SELECT 
             costo.*,
@@ -406,8 +453,11 @@ def cruzar_costo_seguim(
             LEFT JOIN seguimiento_costo AS seguim
             ON costo.contrato_reaseguro == seguim.contrato_reaseguro
             AND seguim.fecha_cierre = DATE '{fe_valoracion_str}'
-        """
-    ).pl()
+        """,
+        {"costo_contrato": costo_contrato},
+        {"seguimiento_costo": seguimiento_costo},
+    )
+    return aux_tools.igualar_tipo_frame(resultado, costo_contrato)
 
 
 # Prepara el insumo de costo contrato reaseguro no proporcional
@@ -426,7 +476,7 @@ def prep_input_costo_con(
     """
 
     # si ya viene devengandose, se recalcula el devengamiento diario
-    if "saldo_anterior" in costo_contrato.columns:
+    if "saldo_anterior" in costo_contrato.collect_schema().names():
         base_devengo = pl.col(
             "saldo_anterior"
         )  # si es de un output anterior, ya viene abierto por reasegurador
@@ -484,7 +534,7 @@ def prep_input_costo_con(
         )
     )
 
-    return input_costo_con
+    return input_costo_con.pipe(esquemas.conformar_input_devengo)
 
 
 def prep_input_recup_onerosidad_np(
@@ -503,7 +553,7 @@ def prep_input_recup_onerosidad_np(
     """
 
     # si ya viene devengandose, se recalcula el devengamiento diario
-    if "saldo_anterior" in recup_onerosidad_df.columns:
+    if "saldo_anterior" in recup_onerosidad_df.collect_schema().names():
         base_devengo = pl.col(
             "saldo_anterior"
         )  # si es de un output anterior, ya viene abierto por reasegurador
@@ -555,6 +605,7 @@ def prep_input_recup_onerosidad_np(
             # los calculos deben estar abiertos por reasegurador (se garantiza en la condicion de arriba)
             (base_devengo).alias("valor_base_devengo")
         )
+        .pipe(esquemas.conformar_input_devengo)
     )
 
 
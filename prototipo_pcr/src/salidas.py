@@ -0,0 +1,87 @@
+"""
+Escritura de los outputs del proceso en formatos columnares usando los sinks de polars,
+de forma que el resultado se escribe en streaming y sin el límite de filas de excel
+"""
+
+import shutil
+from pathlib import Path
+from typing import Callable
+
+import polars as pl
+import src.parametros as params
+
+
+def columnas_particion(df: pl.LazyFrame) -> list[str]:
+    """
+    Columnas de partición configuradas que efectivamente existen en el output
+    """
+    columnas = df.collect_schema().names()
+    return [col for col in params.COLUMNAS_PARTICION_SALIDA if col in columnas]
+
+
+def escribir_parquet(df: pl.LazyFrame, ruta: Path) -> Path:
+    """
+    Escribe un dataset parquet particionado tipo hive (columna=valor/) por las columnas
+    de partición, cada partición queda en su propia carpeta
+    """
+    particion = columnas_particion(df)
+    if not particion:
+        destino = ruta.with_suffix(".parquet")
+        df.sink_parquet(destino, mkdir=True)
+        return destino
+    # se limpia la carpeta para no dejar particiones de ejecuciones anteriores
+    if ruta.exists():
+        shutil.rmtree(ruta)
+    df.sink_parquet(pl.PartitionByKey(ruta, by=particion), mkdir=True)
+    return ruta
+
+
+def escribir_ipc(df: pl.LazyFrame, ruta: Path) -> Path:
+    destino = ruta.with_suffix(".arrow")
+    df.sink_ipc(destino, mkdir=True)
+    return destino
+
+
+def escribir_csv(df: pl.LazyFrame, ruta: Path) -> Path:
+    destino = ruta.with_suffix(".csv")
+    df.sink_csv(destino, mkdir=True)
+    return destino
+
+
+# Backends disponibles, se pueden agregar nuevos formatos registrándolos aquí
+ESCRITORES: dict[str, Callable[[pl.LazyFrame, Path], Path]] = {
+    "parquet": escribir_parquet,
+    "ipc": escribir_ipc,
+    "csv": escribir_csv,
+}
+
+
+def exportar_muestra_excel(df: pl.LazyFrame, ruta: Path, filas: int) -> Path:
+    """
+    Exporta solo las primeras filas del output a excel para revisión manual
+    """
+    destino = ruta.with_name(f"{ruta.name}_muestra.xlsx")
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    df.head(filas).collect().write_excel(destino)
+    return destino
+
+
+def escribir_salida(
+    df: pl.DataFrame | pl.LazyFrame, ruta: Path, formato: str | None = None
+) -> Path:
+    """
+    Escribe el output en el formato configurado (params.FORMATO_SALIDA por defecto).
+    La ruta se recibe sin extensión, cada backend agrega la suya.
+    Si params.EXPORTAR_MUESTRA_EXCEL está activo también se genera una muestra en excel.
+    """
+    formato = formato or params.FORMATO_SALIDA
+    if formato not in ESCRITORES:
+        raise ValueError(
+            f"Formato de salida {formato} no soportado, opciones: {list(ESCRITORES)}"
+        )
+    ruta = Path(ruta)
+    df = df.lazy()
+    destino = ESCRITORES[formato](df, ruta)
+    if params.EXPORTAR_MUESTRA_EXCEL:
+        exportar_muestra_excel(df, ruta, params.FILAS_MUESTRA_EXCEL)
+    return destino
@@ -0,0 +1,111 @@
+"""
+Sesión de DuckDB compartida por los cruces del proceso.
+Una sola conexión por ejecución con hilos, límite de memoria y carpeta temporal para
+derramar a disco configurables (ver parametros.py). Las tablas de parámetros se
+registran una sola vez y se reusan mientras sean el mismo objeto, las bases de cada
+cruce se registran solo durante su consulta.
+"""
+
+import contextlib
+from typing import Iterator
+
+import duckdb
+import polars as pl
+import src.aux_tools as aux_tools
+import src.categorias as categorias
+import src.parametros as params
+
+# conexión activa y parámetros registrados en ella: nombre -> (objeto original, tabla)
+_conexion: duckdb.DuckDBPyConnection | None = None
+_parametros: dict[str, tuple[object, pl.DataFrame]] = {}
+# sesiones abiertas anidadas, la conexión se cierra al salir de la más externa
+_profundidad = 0
+
+
+def configuracion() -> dict[str, str | int]:
+    """
+    Configuración de la conexión según los parámetros definidos
+    """
+    config = {
+        "threads": params.DUCKDB_HILOS,
+        "memory_limit": params.DUCKDB_LIMITE_MEMORIA,
+        "temp_directory": params.DUCKDB_CARPETA_TEMPORAL,
+    }
+    # sin valor se deja el valor por defecto de DuckDB
+    return {llave: valor for llave, valor in config.items() if valor is not None}
+
+
+def conexion() -> duckdb.DuckDBPyConnection:
+    """
+    Conexión activa, si no hay una sesión abierta se crea con la configuración
+    """
+    global _conexion
+    if _conexion is None:
+        _conexion = duckdb.connect(config=configuracion())
+    return _conexion
+
+
+def cerrar() -> None:
+    global _conexion
+    if _conexion is not None:
+        _conexion.close()
+    _conexion = None
+    _parametros.clear()
+
+
+@contextlib.contextmanager
+def sesion() -> Iterator[duckdb.DuckDBPyConnection]:
+    """
+    Sesión con alcance de una ejecución del proceso: al salir se cierra la conexión
+    y se liberan las tablas de parámetros registradas. Una sesión anidada reusa la
+    conexión de la externa y solo la más externa la cierra
+    """
+    global _profundidad
+    if _profundidad == 0:
+        # descarta una conexión abierta fuera de una sesión
+        cerrar()
+    _profundidad += 1
+    try:
+        yield conexion()
+    finally:
+        _profundidad -= 1
+        if _profundidad == 0:
+            cerrar()
+
+
+def registrar_parametro(nombre: str, tabla: pl.DataFrame | pl.LazyFrame) -> None:
+    """
+    Registra una tabla de parámetros materializada, si ya está registrada con ese
+    nombre y el mismo objeto no se vuelve a registrar. El registro se guarda por nombre
+    junto al objeto original y se libera al cerrar la sesión
+    """
+    registrada = _parametros.get(nombre)
+    if registrada is not None and registrada[0] is tabla:
+        return
+    materializada = aux_tools.materializar(tabla)
+    conexion().register(nombre, materializada)
+    _parametros[nombre] = (tabla, materializada)
+
+
+def consultar(
+    sql: str,
+    tablas: dict[str, pl.DataFrame | pl.LazyFrame],
+    parametros: dict[str, pl.DataFrame | pl.LazyFrame] | None = None,
+) -> pl.DataFrame:
+    """
+    Ejecuta la consulta con las tablas registradas con los nombres usados en el sql.
+    Las tablas se liberan al terminar, los parametros quedan registrados en la sesión
+    """
+    con = conexion()
+    for nombre, tabla in (parametros or {}).items():
+        registrar_parametro(nombre, tabla)
+    for nombre, tabla in tablas.items():
+        con.register(nombre, tabla)
+    try:
+        # las categóricas llegan a DuckDB como ENUM y vuelven como texto
+        return categorias.codificar(
+            con.execute(sql).pl(), categorias.categoricas(list(tablas.values()))
+        )
+    finally:
+        for nombre in tablas:
+            con.unregister(nombre)
@@ -3,6 +3,7 @@ from datetime import date
 from typing import Optional, List
 import polars as pl
 import pytest
+from src import prep_insumo
 
 
 @dataclass
@@ -204,4 +205,41 @@ def validar_resultados_multiples(
         except AssertionError as e:
             raise AssertionError(
                 f"Fallo en fecha_contab={registro.fecha_contabilizacion_recibo}, tipo_op={registro.tipo_op}: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+@pytest.fixture
+def input_prima_directo(param_contabilidad: pl.DataFrame, excepciones_df: pl.DataFrame):
+    """
+    Prepara para devengo una prima directa de 1200 por cada vigencia (inicio, fin),
+    por defecto una sola vigencia en 2025. Con lazy=True la preparación queda lazy.
+    Los insumos preparados ya traen las columnas de financiación nulas (ver src/esquemas.py)
+    """
+    def preparar(
+        fecha_valoracion: date = date(2025, 3, 31),
+        vigencias: tuple[tuple[date, date], ...] = ((date(2025, 1, 1), date(2025, 12, 31)),),
+        lazy: bool = False,
+    ) -> pl.DataFrame | pl.LazyFrame:
+        df = pl.concat(
+            [
+                crear_input_devengo(
+                    Fechas(
+                        fecha_valoracion=fecha_valoracion,
+                        fecha_expedicion_poliza=inicio,
+                        fecha_contabilizacion_recibo=inicio,
+                        fecha_inicio_vigencia_recibo=inicio,
+                        fecha_fin_vigencia_recibo=fin,
+                        fecha_inicio_vigencia_cobertura=inicio,
+                        fecha_fin_vigencia_cobertura=fin,
+                    ),
+                    "produccion_directo",
+                    "directo",
+                    1200,
+                )
+                for inicio, fin in vigencias
+            ]
+        )
+        return prep_insumo.prep_input_prima_directo(
+            df.lazy() if lazy else df, param_contabilidad, excepciones_df, fecha_valoracion
+        )
+
+    return preparar
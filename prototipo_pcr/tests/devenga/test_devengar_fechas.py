@@ -0,0 +1,58 @@
+from datetime import date
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+from src import devenga
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_devengar_fechas_igual_a_devengar_por_fecha(input_prima_directo, lazy: bool):
+    """
+    Devengar varias fechas en una consulta debe dar lo mismo que devengar a cada fecha
+    los registros constituidos a esa fecha
+    """
+    input_devengo = input_prima_directo()
+    cierres = devenga.cierres_mensuales(date(2024, 12, 1), date(2026, 1, 31))
+    assert cierres[0] == date(2024, 12, 31) and cierres[-1] == date(2026, 1, 31)
+
+    resultado = devenga.devengar_fechas(
+        input_devengo.lazy() if lazy else input_devengo, cierres
+    )
+    esperado = pl.concat(
+        [
+            devenga.devengar(input_devengo.filter(pl.col("fecha_constitucion") <= fecha), fecha)
+            for fecha in cierres
+        ],
+        how="diagonal",
+    )
+
+    assert_frame_equal(resultado.lazy().collect(), esperado)
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_devengar_fechas_igual_a_preparar_cada_fecha(input_prima_directo, lazy: bool):
+    """
+    Un recibo contabilizado dentro del rango de fechas solo se devenga desde el cierre
+    en que ya está contabilizado, como si se preparara el input a cada fecha
+    """
+    vigencias = (
+        (date(2025, 1, 1), date(2025, 12, 31)),
+        (date(2025, 3, 15), date(2026, 3, 14)),
+    )
+    cierres = devenga.cierres_mensuales(date(2025, 1, 1), date(2025, 4, 30))
+
+    resultado = devenga.devengar_fechas(
+        input_prima_directo(cierres[-1], vigencias, lazy=lazy), cierres
+    ).lazy().collect()
+    esperado = pl.concat(
+        [
+            devenga.devengar(input_prima_directo(fecha, vigencias), fecha)
+            for fecha in cierres
+        ],
+        how="diagonal",
+    )
+
+    assert resultado.filter(
+        pl.col("fecha_constitucion") == date(2025, 3, 15)
+    ).get_column("fecha_valoracion").unique().sort().to_list() == cierres[2:]
+    assert_frame_equal(resultado, esperado, check_row_order=False)
@@ -0,0 +1,16 @@
+from datetime import date
+import polars as pl
+from polars.testing import assert_frame_equal
+from src import devenga
+
+
+def test_devengo_lazy_igual_a_eager(input_prima_directo):
+    """
+    El modo lazy debe producir exactamente el mismo output de devengo que el modo eager
+    """
+    fecha_valoracion = date(2025, 3, 31)
+    resultado_eager = devenga.devengar(input_prima_directo(), fecha_valoracion)
+    resultado_lazy = devenga.devengar(input_prima_directo(lazy=True), fecha_valoracion)
+
+    assert isinstance(resultado_lazy, pl.LazyFrame)
+    assert_frame_equal(resultado_eager, resultado_lazy.collect())
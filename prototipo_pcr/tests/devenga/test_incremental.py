@@ -0,0 +1,96 @@
+from datetime import date
+import polars as pl
+from polars.testing import assert_frame_equal
+from src import devenga, incremental, parametros
+
+
+def test_devengo_incremental_igual_a_recalculo(input_prima_directo):
+    """
+    Arrastrar los registros cerrados desde el estado del cierre anterior debe dar
+    el mismo output que devengar todo el input en el nuevo cierre
+    """
+    input_devengo = input_prima_directo(
+        date(2025, 2, 28),
+        vigencias=(
+            # ya termino de devengar en el cierre anterior
+            (date(2024, 1, 1), date(2024, 12, 31)),
+            # sigue en curso
+            (date(2025, 1, 1), date(2025, 12, 31)),
+        ),
+    )
+
+    estado_anterior = incremental.devengar_incremental(
+        input_devengo, date(2025, 1, 31), None
+    )
+    assert estado_anterior.filter(incremental.es_arrastrable()).height > 0
+
+    resultado = incremental.devengar_incremental(
+        input_devengo, date(2025, 2, 28), estado_anterior
+    )
+    esperado = devenga.devengar(input_devengo, date(2025, 2, 28))
+
+    assert resultado.columns == esperado.columns
+    assert_frame_equal(
+        resultado.sort(pl.all(), nulls_last=True),
+        esperado.sort(pl.all(), nulls_last=True),
+    )
+
+
+def test_devengo_incremental_por_bloque_con_estado_lazy(
+    input_prima_directo, tmp_path, monkeypatch
+):
+    """
+    Con el estado anterior guardado por bloques y leído lazy, cada bloque solo trae del
+    estado sus registros y el resultado por bloque es el mismo que con todo el estado
+    en memoria
+    """
+    monkeypatch.setattr(parametros, "RUTA_ESTADO_DEVENGO", tmp_path)
+    bloques = [
+        input_prima_directo(
+            date(2025, 2, 28), vigencias=((date(2024, 1, 1), date(2024, 12, 31)),)
+        ),
+        input_prima_directo(
+            date(2025, 2, 28), vigencias=((date(2023, 1, 1), date(2023, 12, 31)),)
+        ),
+    ]
+    for i, bloque in enumerate(bloques):
+        incremental.guardar_estado(
+            incremental.devengar_incremental(bloque, date(2025, 1, 31), None),
+            date(2025, 1, 31),
+            i,
+        )
+    estado_lazy = incremental.leer_estado(date(2025, 1, 31), lazy=True)
+    assert isinstance(estado_lazy, pl.LazyFrame)
+
+    for bloque in bloques:
+        resultado = incremental.devengar_incremental(
+            bloque, date(2025, 2, 28), estado_lazy
+        )
+        esperado = incremental.devengar_incremental(
+            bloque, date(2025, 2, 28), incremental.leer_estado(date(2025, 1, 31))
+        )
+        # el registro del bloque se arrastra, el del otro bloque no se trae
+        assert resultado.height == bloque.height
+        assert_frame_equal(resultado, esperado)
+
+
+def test_devengo_incremental_recalcula_registro_modificado(input_prima_directo):
+    """
+    Un registro cerrado cuyo insumo cambia entre cierres no se arrastra del estado,
+    el estado se reconoce por todas las columnas del input y no por un hash
+    """
+    input_anterior = input_prima_directo(
+        date(2025, 2, 28), vigencias=((date(2024, 1, 1), date(2024, 12, 31)),)
+    )
+    estado_anterior = incremental.devengar_incremental(
+        input_anterior, date(2025, 1, 31), None
+    )
+    assert estado_anterior.filter(incremental.es_arrastrable()).height == input_anterior.height
+
+    input_actual = input_anterior.with_columns(pl.col("valor_base_devengo") * 2)
+    resultado = incremental.devengar_incremental(
+        input_actual, date(2025, 2, 28), estado_anterior
+    )
+
+    assert_frame_equal(resultado, devenga.devengar(input_actual, date(2025, 2, 28)))
+    assert resultado.get_column("valor_base_devengo").abs().unique().to_list() == [2400.0]
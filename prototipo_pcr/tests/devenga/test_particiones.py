@@ -0,0 +1,65 @@
+import polars as pl
+import pytest
+from src import devenga
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_particionar_reglas(lazy: bool):
+    """
+    Los registros con componente de financiacion van a su particion y ademas a la de su
+    kernel si es componente de inversion o costo de contrato, los demas a una sola
+    """
+    input_devengo = pl.DataFrame(
+        {
+            "id": [1, 2, 3, 4, 5, 6],
+            "_kernel": ["diario", "5050", "comp_inv", "comp_inv", "diario", None],
+            "_financiacion": [False, False, False, True, True, True],
+        }
+    )
+    if lazy:
+        input_devengo = input_devengo.lazy()
+
+    particiones = devenga.particionar_reglas(input_devengo)
+    ids = {
+        nombre: None if df is None else sorted(df.lazy().collect()["id"].to_list())
+        for nombre, df in particiones.items()
+    }
+
+    assert ids == {
+        "comp_financiacion": [4, 5, 6],
+        "comp_inv": [3, 4],
+        "costo_contrato": None,
+        "5050": [2],
+        "diario": [1],
+    }
+    assert particiones["diario"].lazy().collect_schema().names() == ["id"]
+
+
+def test_particionar_reglas_lazy_evalua_el_input_una_vez():
+    """
+    En modo lazy el plan del input se ejecuta una sola vez aunque se colecten
+    todas las particiones
+    """
+    ejecuciones = []
+
+    def contar(df: pl.DataFrame) -> pl.DataFrame:
+        ejecuciones.append(df.height)
+        return df
+
+    input_devengo = (
+        pl.LazyFrame(
+            {
+                "id": [1, 2, 3],
+                "_kernel": ["diario", "5050", "comp_inv"],
+                "_financiacion": [False, False, True],
+            }
+        )
+        .map_batches(contar, streamable=False)
+    )
+
+    particiones = devenga.particionar_reglas(input_devengo)
+    for particion in particiones.values():
+        if particion is not None:
+            particion.collect()
+
+    assert len(ejecuciones) == 1
@@ -0,0 +1,90 @@
+from datetime import date
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+from src import devenga
+import src.parametros as params
+
+
+@pytest.mark.parametrize(
+    "tipo_insumo", [None, "componente_inversion_directo"], ids=["prima", "comp_inv"]
+)
+def test_proyectar_devengo_coincide_con_devengar(input_prima_directo, tipo_insumo):
+    """
+    La proyeccion llega hasta el cierre de fin de devengo y cada cierre proyectado
+    coincide con devengar a esa fecha, con devengo diario, 50/50 (la vigencia de un
+    mes) y componente de inversion (la ultima vigencia queda como prima porque
+    devengar necesita algun registro con estado de devengo)
+    """
+    fecha_valoracion = date(2025, 3, 31)
+    vigencias = (
+        (date(2025, 1, 1), date(2025, 12, 31)),
+        (date(2025, 3, 10), date(2025, 4, 9)),
+        (date(2025, 2, 1), date(2025, 12, 31)),
+    )
+    input_devengo = input_prima_directo(fecha_valoracion, vigencias)
+    if tipo_insumo is not None:
+        input_devengo = input_devengo.with_columns(
+            pl.when(pl.col("fecha_inicio_devengo") != date(2025, 2, 1))
+            .then(pl.lit(tipo_insumo))
+            .otherwise(pl.col("tipo_insumo"))
+            .alias("tipo_insumo")
+        )
+
+    proyeccion = devenga.proyectar_devengo(input_devengo, fecha_valoracion)
+
+    cierres = devenga.cierres_mensuales(date(2025, 3, 1), date(2025, 12, 31))
+    assert sorted(proyeccion["fecha_valoracion"].unique().to_list()) == cierres
+    # al ultimo cierre ya no queda saldo
+    saldo_final = proyeccion.filter(pl.col("fecha_valoracion") == cierres[-1])["saldo"]
+    assert saldo_final.abs().sum() == pytest.approx(0.0)
+    # las columnas del input que devengar reemplaza por las de sus kernels no se comparan
+    columnas = [
+        c for c in proyeccion.columns if c not in params.CAMPOS_OUTPUT_DIARIO
+    ]
+    # cada registro se proyecta hasta el cierre en que termina de devengarse
+    ultimo_cierre = pl.max_horizontal("fecha_fin_devengo", "fecha_constitucion").dt.month_end()
+    for cierre in cierres:
+        devengo = devenga.devengar(input_devengo.filter(ultimo_cierre >= cierre), cierre)
+        assert_frame_equal(
+            proyeccion.filter(pl.col("fecha_valoracion") == cierre).select(
+                c for c in columnas if c in devengo.columns
+            ),
+            devengo.select(c for c in columnas if c in devengo.columns),
+            check_row_order=False,
+        )
+
+
+def test_proyectar_devengo_lazy(input_prima_directo):
+    """
+    Con un input lazy la proyeccion queda lazy para escribirse en streaming
+    """
+    fecha_valoracion = date(2025, 3, 31)
+    proyeccion = devenga.proyectar_devengo(
+        input_prima_directo(fecha_valoracion, lazy=True), fecha_valoracion
+    )
+
+    assert isinstance(proyeccion, pl.LazyFrame)
+    assert_frame_equal(
+        proyeccion.collect(),
+        devenga.proyectar_devengo(input_prima_directo(fecha_valoracion), fecha_valoracion),
+    )
+
+
+@pytest.mark.parametrize("tipo_insumo", ["costo_contrato_rea_noprop", "recup_onerosidad_np"])
+def test_proyeccion_rechaza_costo_contrato(input_prima_directo, tipo_insumo: str):
+    """
+    El costo de contrato se devenga con el seguimiento del cierre actual, no se puede
+    proyectar ni devengar a varios cierres
+    """
+    fecha_valoracion = date(2025, 3, 31)
+    input_devengo = input_prima_directo(fecha_valoracion).with_columns(
+        pl.lit(tipo_insumo).alias("tipo_insumo")
+    )
+
+    with pytest.raises(ValueError, match="costo de contrato"):
+        devenga.proyectar_devengo(input_devengo, fecha_valoracion)
+    with pytest.raises(ValueError, match="costo de contrato"):
+        devenga.devengar_fechas(
+            input_devengo, [fecha_valoracion, date(2025, 4, 30)]
+        )
@@ -0,0 +1,37 @@
+import polars as pl
+from src import bloques
+
+
+def test_filtrar_bloque_mantiene_cruces_locales():
+    """
+    Cada registro de cartera queda en un solo bloque y la misma póliza cae en el mismo
+    bloque aunque un insumo la traiga como texto y otro como entero
+    """
+    polizas = list(range(100, 140))
+    insumos = {
+        "produccion_dir": pl.DataFrame(
+            {
+                "compania": ["01"] * 40,
+                "ramo_sura": ["040"] * 40,
+                "poliza": [str(poliza) for poliza in polizas],
+            }
+        ),
+        "descuentos": pl.DataFrame(
+            {"compania": ["01"] * 40, "ramo_sura": ["040"] * 40, "poliza": polizas}
+        ),
+        "param_contab": pl.DataFrame({"tipo_insumo": ["produccion_directo"]}),
+    }
+
+    n_bloques = bloques.contar_bloques(insumos, filas_por_bloque=10)
+    assert n_bloques == 4
+
+    vistos = []
+    for bloque in range(n_bloques):
+        insumos_bloque = bloques.filtrar_bloque(insumos, bloque, n_bloques)
+        produccion = insumos_bloque["produccion_dir"]["poliza"].cast(pl.Int64).to_list()
+        descuentos = insumos_bloque["descuentos"]["poliza"].to_list()
+        assert sorted(produccion) == sorted(descuentos)
+        assert insumos_bloque["param_contab"].height == 1
+        vistos.extend(produccion)
+
+    assert sorted(vistos) == polizas
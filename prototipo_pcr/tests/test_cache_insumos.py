@@ -0,0 +1,98 @@
+import os
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+from src import cache_insumos
+import src.parametros as params
+
+
+@pytest.fixture
+def insumo(tmp_path, monkeypatch):
+    monkeypatch.setattr(params, "RUTA_CACHE_INSUMOS", tmp_path / ".cache")
+    monkeypatch.setattr(params, "USAR_CACHE_INSUMOS", True)
+    ruta = tmp_path / "insumo.xlsx"
+    pl.DataFrame({"ramo": ["AAV", "AAU"], "valor": [1, 2]}).write_excel(
+        ruta, worksheet="Hoja1"
+    )
+    return ruta
+
+
+def test_cache_se_reutiliza(insumo, monkeypatch):
+    """
+    La segunda lectura debe salir del archivo IPC sin volver a leer el excel
+    """
+    primera = cache_insumos.leer_insumo(insumo, "Hoja1")
+
+    def falla(*args, **kwargs):
+        raise AssertionError("no debería leer el excel")
+
+    monkeypatch.setattr(pl, "read_excel", falla)
+    assert_frame_equal(primera, cache_insumos.leer_insumo(insumo, "Hoja1"))
+    assert_frame_equal(
+        primera, cache_insumos.leer_insumo(insumo, "Hoja1", lazy=True).collect()
+    )
+
+    # si solo cambia el mtime el contenido es el mismo y se sigue usando el cache
+    estado = insumo.stat()
+    os.utime(insumo, ns=(estado.st_atime_ns, estado.st_mtime_ns + 10**9))
+    assert_frame_equal(primera, cache_insumos.leer_insumo(insumo, "Hoja1"))
+
+
+def test_cache_se_invalida_si_cambia_el_insumo(insumo):
+    """
+    Si el contenido del excel cambia se debe volver a convertir
+    """
+    cache_insumos.leer_insumo(insumo, "Hoja1")
+    nuevo = pl.DataFrame({"ramo": ["AAV", "AAU", "AAC"], "valor": [1, 2, 3]})
+    nuevo.write_excel(insumo, worksheet="Hoja1")
+
+    assert_frame_equal(nuevo, cache_insumos.leer_insumo(insumo, "Hoja1"))
+
+
+def test_libros_con_el_mismo_nombre_no_comparten_cache(insumo, monkeypatch):
+    """
+    Dos libros con el mismo nombre en carpetas distintas tienen cada uno su cache
+    """
+    otro = insumo.parent / "otra_carpeta" / insumo.name
+    otro.parent.mkdir()
+    pl.DataFrame({"ramo": ["AAC"], "valor": [3]}).write_excel(otro, worksheet="Hoja1")
+
+    primero = cache_insumos.leer_insumo(insumo, "Hoja1")
+    segundo = cache_insumos.leer_insumo(otro, "Hoja1")
+    assert primero.height == 2 and segundo.height == 1
+
+    def falla(*args, **kwargs):
+        raise AssertionError("no debería leer el excel")
+
+    # ninguno de los dos pisó el cache del otro
+    monkeypatch.setattr(pl, "read_excel", falla)
+    assert_frame_equal(primero, cache_insumos.leer_insumo(insumo, "Hoja1"))
+    assert_frame_equal(segundo, cache_insumos.leer_insumo(otro, "Hoja1"))
+
+
+def test_conversion_interrumpida_no_deja_cache_a_medias(insumo, monkeypatch):
+    """
+    Si la escritura del IPC falla el cache anterior queda intacto, sin temporales,
+    y la siguiente lectura vuelve a convertir la hoja
+    """
+    anterior = cache_insumos.leer_insumo(insumo, "Hoja1")
+    ruta_ipc, ruta_meta = cache_insumos.rutas_cache(insumo, "Hoja1")
+    nuevo = pl.DataFrame({"ramo": ["AAV", "AAU", "AAC"], "valor": [1, 2, 3]})
+    nuevo.write_excel(insumo, worksheet="Hoja1")
+
+    write_ipc = pl.DataFrame.write_ipc
+
+    def escribe_a_medias(df, destino, **kwargs):
+        write_ipc(df.head(1), destino, **kwargs)
+        raise OSError("disco lleno")
+
+    with monkeypatch.context() as parche:
+        parche.setattr(pl.DataFrame, "write_ipc", escribe_a_medias)
+        with pytest.raises(OSError):
+            cache_insumos.leer_insumo(insumo, "Hoja1")
+
+    assert sorted(p.name for p in params.RUTA_CACHE_INSUMOS.iterdir()) == sorted(
+        [ruta_ipc.name, ruta_meta.name]
+    )
+    assert_frame_equal(anterior, pl.read_ipc(ruta_ipc))
+    assert_frame_equal(nuevo, cache_insumos.leer_insumo(insumo, "Hoja1"))
@@ -0,0 +1,34 @@
+import polars as pl
+from src import categorias, sesion_duckdb
+
+
+def test_codificar_mantiene_categoricas_en_duckdb():
+    """
+    Solo las columnas de texto conocidas se codifican y los resultados de DuckDB
+    vuelven categóricos si la base lo era
+    """
+    with pl.StringCache():
+        base = categorias.codificar(
+            pl.DataFrame(
+                {"compania": ["01", "02"], "poliza": ["1", "2"], "cohorte": [2024, 2025]}
+            )
+        )
+        assert base.schema["compania"] == pl.Categorical
+        assert base.schema["poliza"] == pl.String
+        assert base.schema["cohorte"] == pl.Int64
+
+        with sesion_duckdb.sesion():
+            resultado = sesion_duckdb.consultar(
+                """
+                SELECT b.compania, b.poliza, p.nombre
+                FROM base b JOIN param p ON b.compania = p.compania
+                """,
+                {"base": base},
+                {"param": pl.DataFrame({"compania": ["02"], "nombre": ["generales"]})},
+            )
+
+    assert resultado.schema["compania"] == pl.Categorical
+    assert resultado.schema["poliza"] == pl.String
+    assert resultado.with_columns(pl.col("compania").cast(pl.String)).rows() == [
+        ("02", "2", "generales")
+    ]
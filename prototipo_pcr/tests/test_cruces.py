@@ -3,25 +3,17 @@ from src import cruces
 import pytest
 
 
-@pytest.mark.parametrize(
-    "canal, producto, porcentajes_esperados",
-    [
-        ("sucursal", "plan_basico", [0.1, 0.9]),
-        ("sucursal", "*", [0.2, 0.8]),
-        ("*", "*", [0.3, 0.7]),
-    ],
-)
-def test_cruzar_gastos_expedicion(
-    canal: str, producto: str, porcentajes_esperados: list[float]
-):
-    produccion = pl.DataFrame(
+def produccion_gastos() -> pl.DataFrame:
+    return pl.DataFrame(
         {
             "tipo_insumo": ["produccion_directo"],
             "tipo_negocio": ["directo"],
+            "numero_documento_sap": [1],
             "poliza": [1],
             "fecha_expedicion_poliza": ["2023-01-30"],
             "recibo": [1],
             "amparo": ["DANOS"],
+            "cdsubgarantia": ["1"],
             "poliza_certificado": [1],
             "compania": ["01"],
             "ramo_sura": ["040"],
@@ -37,21 +29,160 @@ def test_cruzar_gastos_expedicion(
             "valor_prima_emitida": [1200],
         }
     )
-    gastos = pl.DataFrame(
+
+
+def tabla_gastos(
+    canales: list[str],
+    productos: list[str],
+    porcentajes: list[float],
+    tipo_gasto: list[str] | None = None,
+) -> pl.DataFrame:
+    n = len(canales)
+    return pl.DataFrame(
         {
-            "fecha_clave": ["2023-12-31", "2023-12-31"],
-            "fecha_inicio": ["2023-01-01", "2023-01-01"],
-            "fecha_fin": ["2023-12-31", "2023-12-31"],
-            "compania": ["01", "01"],
-            "ramo_sura": ["040", "040"],
-            "canal": [canal, canal],
-            "producto": [producto, producto],
-            "tipo_gasto": ["expedicion_comisiones", "expedicion_otros"],
-            "real_estimado": ["estimado", "estimado"],
-            "porc_gasto": porcentajes_esperados,
+            "fecha_clave": ["2023-12-31"] * n,
+            "fecha_inicio": ["2023-01-01"] * n,
+            "fecha_fin": ["2023-12-31"] * n,
+            "tipo_contabilidad": ["ifrs17_local"] * n,
+            "compania": ["01"] * n,
+            "ramo_sura": ["040"] * n,
+            "canal": canales,
+            "producto": productos,
+            "tipo_gasto": tipo_gasto or ["expedicion_comisiones"] * n,
+            "real_estimado": ["estimado"] * n,
+            "porc_gasto": porcentajes,
         }
     )
 
-    resultado = cruces.cruzar_gastos_expedicion(produccion, gastos)
+
+@pytest.mark.parametrize(
+    "canal, producto, porcentajes_esperados",
+    [
+        ("sucursal", "plan_basico", [0.1, 0.9]),
+        ("sucursal", "*", [0.2, 0.8]),
+        ("*", "*", [0.3, 0.7]),
+        ("*", "plan_basico", [0.4, 0.6]),
+    ],
+)
+def test_cruzar_gastos_expedicion(
+    canal: str, producto: str, porcentajes_esperados: list[float]
+):
+    gastos = tabla_gastos(
+        [canal, canal],
+        [producto, producto],
+        porcentajes_esperados,
+        ["expedicion_comisiones", "expedicion_otros"],
+    )
+
+    resultado = cruces.cruzar_gastos_expedicion(produccion_gastos(), gastos)
     assert resultado.shape[0] == 2
     assert sorted(resultado.get_column("porc_gasto").to_list()) == porcentajes_esperados
+
+
+@pytest.mark.parametrize(
+    "niveles, porcentaje_esperado, prioridad_esperada",
+    [
+        # gana el nivel con canal y producto especificos
+        ([0, 1, 2, 3], 0.1, 1),
+        ([1, 2, 3], 0.2, 2),
+        ([2, 3], 0.3, 3),
+        # canal = '*' con producto especifico no tiene prioridad y queda de ultimo
+        ([3], 0.4, None),
+    ],
+)
+def test_cruzar_gastos_expedicion_prioridad(
+    niveles: list[int], porcentaje_esperado: float, prioridad_esperada: int | None
+):
+    """
+    Con varios niveles de comodin para el mismo gasto el recibo queda con una sola fila,
+    la del nivel de mayor prioridad
+    """
+    todos = [
+        ("sucursal", "plan_basico", 0.1),
+        ("sucursal", "*", 0.2),
+        ("*", "*", 0.3),
+        ("*", "plan_basico", 0.4),
+    ]
+    canales, productos, porcentajes = zip(*(todos[i] for i in niveles))
+    gastos = tabla_gastos(list(canales), list(productos), list(porcentajes))
+
+    resultado = cruces.cruzar_gastos_expedicion(produccion_gastos(), gastos)
+    assert resultado.select("porc_gasto", "prioridad_match", "rn").rows() == [
+        (porcentaje_esperado, prioridad_esperada, 1)
+    ]
+
+
+def test_cruzar_gastos_expedicion_sin_cruce_por_llave():
+    """
+    El nivel canal = '*' con producto especifico cruza por producto, otro producto no
+    cruza; el canal especifico tampoco cruza con otro canal
+    """
+    gastos = tabla_gastos(["*", "otro_canal"], ["otro_producto", "*"], [0.4, 0.2])
+
+    resultado = cruces.cruzar_gastos_expedicion(produccion_gastos(), gastos)
+    assert resultado.height == 0
+
+
+def test_cruzar_excepciones_50_50_gana_la_ultima():
+    base = pl.DataFrame(
+        {
+            "tipo_contabilidad": ["ifrs4_local", "ifrs4_local", "ifrs17_local"],
+            "tipo_insumo": ["produccion_directo", "comision_rea_prop", "dcto_directo"],
+            "compania": ["01", "01", "02"],
+            "ramo_sura": ["040", "040", "196"],
+            "poliza": [1, 2, 3],
+        }
+    )
+    excepciones = pl.DataFrame(
+        {
+            "tipo_contabilidad": ["ifrs4_local", "*", "*", "*"],
+            "tipo_insumo": ["*", "comision_rea_prop", "*", "*"],
+            "compania": ["01", "*", "02", "*"],
+            # la columna no existe en la base, la excepcion se ignora
+            "canal": ["*", "*", "*", "sucursal"],
+            "poliza": ["*", "*", "3", "*"],
+            "candidato_devengo_50_50": [0, 1, 0, 0],
+        }
+    )
+
+    resultado = cruces.cruzar_excepciones_50_50(base, excepciones)
+    # la segunda fila cumple dos excepciones y gana la que aparece de ultima
+    assert resultado.get_column("candidato_devengo_50_50").to_list() == [0, 1, 0]
+    assert resultado.columns == base.columns + ["candidato_devengo_50_50"]
+    assert resultado.schema["candidato_devengo_50_50"] == pl.Int32
+
+
+def test_cruzar_parm_financiacion_prioriza_menos_comodines():
+    base = pl.DataFrame(
+        {
+            "tipo_contabilidad": ["ifrs17_local"] * 3,
+            "moneda": ["COP", "COP", "USD"],
+            "tipo_insumo": ["produccion_directo"] * 3,
+            "compania": ["01", "02", "01"],
+            "ramo_sura": ["040"] * 3,
+            "producto": ["plan_basico"] * 3,
+            "tipo_op": ["emision"] * 3,
+        }
+    )
+    param = pl.DataFrame(
+        {
+            "tipo_contabilidad": ["ifrs17_local"] * 2,
+            "moneda": ["COP"] * 2,
+            "tipo_insumo": ["*", "*"],
+            "compania": ["*", "01"],
+            "ramo_sura": ["*", "040"],
+            "producto": ["*", "*"],
+            "tipo_op": ["*", "*"],
+            "aplica_comp_financ": [0, 1],
+            "aplica_ipc_mensual": [1, 0],
+            "pais_curva": ["colombia"] * 2,
+            "moneda_curva": ["COP"] * 2,
+            "meses_max_vigencia": [12, 24],
+        }
+    )
+
+    resultado = cruces.cruzar_parm_financiacion(base, param)
+    # conserva el orden de la base, la moneda USD no tiene parametro
+    assert resultado.get_column("compania").to_list() == ["01", "02", "01"]
+    assert resultado.get_column("aplica_comp_financ").to_list() == [1, 0, 0]
+    assert resultado.get_column("meses_max_vigencia").to_list() == [24, 12, None]
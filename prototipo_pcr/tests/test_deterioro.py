@@ -0,0 +1,65 @@
+from datetime import date
+from src import deterioro
+import polars as pl
+from polars.testing import assert_frame_equal
+import pytest
+
+
+@pytest.mark.parametrize("tipo_fecha", [pl.Date, pl.Datetime("us")])
+def test_deterioro_conserva_orden_y_busca_pd_vigente(tipo_fecha: pl.DataType):
+    """
+    El deterioro se calcula sobre todo el output sin reordenarlo: las filas a las que no
+    aplica quedan con nulos y la PD es la del tramo vigente del reasegurador en cada fecha.
+    Las fechas pueden venir como Datetime, como las lee el excel
+    """
+    riesgo_credito = pl.DataFrame(
+        {
+            "fecha_inicio_vigencia": [
+                date(2025, 2, 1),
+                date(2025, 1, 1),
+                date(2024, 1, 1),
+            ],
+            "fecha_fin_vigencia": [None, date(2025, 1, 31), date(2025, 2, 10)],
+            "nit_reasegurador": [1, 1, 3],
+            "probabilidad_incumplimiento": [0.05, 0.02, 0.1],
+        }
+    ).with_columns(pl.col("fecha_inicio_vigencia", "fecha_fin_vigencia").cast(tipo_fecha))
+    devengo = pl.DataFrame(
+        {
+            "recibo": ["1", "2", "3", "4", "5", "6"],
+            "tipo_negocio": [
+                "directo",
+                "mantenido",
+                "retrocedido",
+                None,
+                "mantenido",
+                "mantenido",
+            ],
+            "nit_reasegurador": [1, 1, 2, 1, 1, 3],
+            "fecha_valoracion": [date(2025, 2, 28)] * 4
+            + [date(2025, 1, 31), date(2025, 2, 28)],
+            "fecha_valoracion_anterior": [date(2025, 1, 31)] * 4
+            + [date(2024, 12, 31), date(2025, 1, 31)],
+            "fecha_constitucion": [date(2024, 6, 30)] * 6,
+            "saldo": [1000.0] * 6,
+            "saldo_anterior": [1200.0] * 6,
+        }
+    ).with_columns(
+        pl.col("fecha_valoracion", "fecha_valoracion_anterior").cast(tipo_fecha)
+    )
+
+    resultado = deterioro.calc_deterioro(devengo, riesgo_credito, date(2025, 2, 28))
+
+    esperado = devengo.with_columns(
+        prob_incumplimiento_actual=pl.Series([None, 0.05, None, None, None, None]),
+        prob_incumplimiento_anterior=pl.Series([None, 0.02, None, None, None, 0.1]),
+        cambio_prob_incumplimiento=pl.Series([None, 0.03, None, None, None, None]),
+        # sin PD actual no se constituye
+        constitucion_deterioro=pl.Series([None, 30.0, 0.0, None, None, 0.0]),
+        liberacion_deterioro=pl.Series([None, -4.0, None, None, None, -20.0]),
+    )
+    assert_frame_equal(resultado, esperado, check_dtypes=False)
+    assert_frame_equal(
+        deterioro.calc_deterioro(devengo.lazy(), riesgo_credito, date(2025, 2, 28)).collect(),
+        resultado,
+    )
@@ -0,0 +1,69 @@
+import polars as pl
+from src import diagnosticos
+
+
+def test_diagnosticar_financiacion_detecta_empates():
+    base = pl.DataFrame(
+        {
+            "tipo_contabilidad": ["ifrs17_local"] * 2,
+            "moneda": ["COP"] * 2,
+            "tipo_insumo": ["produccion_directo"] * 2,
+            "compania": ["01"] * 2,
+            "ramo_sura": ["040", "081"],
+            "producto": ["plan_basico"] * 2,
+            "tipo_op": ["emision"] * 2,
+        }
+    )
+    # para el ramo 040 dos parametros empatan con un comodin cada uno
+    param = pl.DataFrame(
+        {
+            "tipo_contabilidad": ["ifrs17_local"] * 3,
+            "moneda": ["COP"] * 3,
+            "tipo_insumo": ["*", "produccion_directo", "*"],
+            "compania": ["01", "01", "*"],
+            "ramo_sura": ["040", "*", "*"],
+            "producto": ["plan_basico"] * 3,
+            "tipo_op": ["emision"] * 3,
+        }
+    )
+
+    resultado = diagnosticos.diagnosticar_financiacion(base, param)
+    assert resultado.rows() == [(1, 1), (2, 1)]
+
+
+def test_diagnosticar_gastos_cuenta_empates_en_la_mejor_prioridad():
+    produccion = pl.DataFrame(
+        {
+            "numero_documento_sap": [1, 2],
+            "tipo_op": ["emision"] * 2,
+            "tipo_insumo": ["produccion_directo"] * 2,
+            "poliza": [1, 2],
+            "poliza_certificado": [1, 2],
+            "recibo": [1, 2],
+            "amparo": ["DANOS"] * 2,
+            "cdsubgarantia": ["1"] * 2,
+            "compania": ["01"] * 2,
+            "ramo_sura": ["040", "081"],
+            "canal": ["sucursal"] * 2,
+            "producto": ["plan_basico"] * 2,
+            "fecha_expedicion_poliza": ["2023-01-30"] * 2,
+        }
+    )
+    # el ramo 040 tiene un gasto especifico y uno general, el especifico resuelve el
+    # cruce. En el ramo 081 dos gastos empatan en canal y producto especificos
+    gastos = pl.DataFrame(
+        {
+            "fecha_inicio": ["2023-01-01"] * 4,
+            "fecha_fin": ["2023-12-31"] * 4,
+            "tipo_contabilidad": ["ifrs17_local"] * 4,
+            "compania": ["01"] * 4,
+            "ramo_sura": ["040", "040", "081", "081"],
+            "canal": ["sucursal", "*", "sucursal", "sucursal"],
+            "producto": ["plan_basico", "*", "plan_basico", "plan_basico"],
+            "tipo_gasto": ["expedicion_comisiones"] * 4,
+            "porc_gasto": [0.1, 0.3, 0.1, 0.2],
+        }
+    )
+
+    resultado = diagnosticos.diagnosticar_gastos(produccion, gastos)
+    assert resultado.select("rows_in_partition", "particiones").rows() == [(1, 1), (2, 1)]
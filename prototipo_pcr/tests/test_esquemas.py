@@ -0,0 +1,89 @@
+from datetime import date
+
+import polars as pl
+import pytest
+from src import esquemas
+
+
+def test_insumos_conformes_se_apilan_sin_conciliar():
+    prima = esquemas.conformar_input_devengo(
+        pl.DataFrame(
+            {
+                "poliza": [1],
+                "tipo_insumo": ["produccion_directo"],
+                "fecha_constitucion": [date(2025, 1, 31)],
+                "valor_base_devengo": [100],
+                "columna_no_declarada": ["x"],
+            }
+        )
+    )
+    recuperacion = esquemas.conformar_input_devengo(
+        pl.DataFrame(
+            {
+                "poliza": ["2"],
+                "tipo_insumo": ["recup_onerosidad_np"],
+                "valor_recuperacion": [50],
+                "saldo_anterior": [20.0],
+            }
+        )
+    )
+
+    assert prima.schema == pl.Schema(esquemas.ESQUEMA_INPUT_DEVENGO)
+    consolidado = esquemas.consolidar_input_devengo([prima, recuperacion])
+
+    assert consolidado.columns == list(esquemas.ESQUEMA_INPUT_DEVENGO) + [
+        "saldo_anterior"
+    ]
+    assert consolidado.select(
+        "poliza", "valor_base_devengo", "valor_recuperacion", "saldo_anterior"
+    ).rows() == [("1", 100.0, None, None), ("2", None, 50.0, 20.0)]
+
+
+def test_consolida_insumos_con_financiacion_anexada_en_solo_uno():
+    """
+    Las columnas de financiación se anexan despues de conformar el insumo, al apilar
+    quedan en el orden y con el tipo declarados y nulas en los demás insumos
+    """
+    prima = esquemas.conformar_input_devengo(
+        pl.DataFrame({"poliza": ["1"], "valor_base_devengo": [100.0]})
+    ).with_columns(
+        pl.lit(202501).alias("mes_fin_vigencia"),
+        pl.lit("colombia").alias("pais_curva"),
+    )
+    recuperacion = esquemas.conformar_input_devengo(
+        pl.DataFrame({"poliza": ["2"], "saldo_anterior": [20.0]})
+    )
+
+    consolidado = esquemas.consolidar_input_devengo([prima, recuperacion])
+
+    assert consolidado.columns == list(esquemas.ESQUEMA_INPUT_DEVENGO) + [
+        "saldo_anterior",
+        "pais_curva",
+        "mes_fin_vigencia",
+    ]
+    assert consolidado.schema["mes_fin_vigencia"] == pl.Int32
+    assert consolidado.select(
+        "pais_curva", "mes_fin_vigencia", "saldo_anterior"
+    ).rows() == [("colombia", 202501, None), (None, None, 20.0)]
+
+
+def test_output_conforme_sin_columnas_de_una_regla():
+    """
+    Un output sin las columnas de una regla de devengo las recibe nulas con su tipo y
+    una columna no declarada no se pierde en silencio
+    """
+    output = pl.DataFrame(
+        {"poliza": ["1"], "tipo_insumo": ["produccion_directo"], "saldo": [10]}
+    ).with_columns(pl.col("tipo_insumo").cast(pl.Categorical))
+
+    conforme = esquemas.conformar_output(output, esquemas.ESQUEMA_OUTPUT_DEVENGO)
+
+    assert conforme.columns == list(esquemas.ESQUEMA_OUTPUT_DEVENGO)
+    assert conforme.schema["tipo_insumo"] == pl.Categorical
+    assert conforme.schema["mes_constitucion"] == pl.Int32
+    assert conforme.select("saldo", "mes_constitucion").rows() == [(10.0, None)]
+    with pytest.raises(ValueError, match="columna_nueva"):
+        esquemas.conformar_output(
+            output.with_columns(columna_nueva=pl.lit(1)),
+            esquemas.ESQUEMA_OUTPUT_DEVENGO,
+        )
@@ -1,6 +1,6 @@
 from datetime import date
 from tests.devenga import conftest as cf
-from src import devenga, prep_insumo, fluctuacion, mapeo_contable, parametros
+from src import devenga, prep_insumo, fluctuacion, mapeo_contable, parametros, cruces
 import polars as pl
 import pytest
 
@@ -136,3 +136,185 @@ def test_conversion_moneda_local(
     )
 
     assert saldo_ml == saldo_ml_objetivo
+
+
+def test_tasas_cambio_asof():
+    """
+    Con asof las fechas sin tasa toman la ultima tasa disponible de la moneda,
+    sin asof se usa 1
+    """
+    tasas = pl.DataFrame(
+        {
+            "fecha": [date(2024, 1, 1), date(2024, 1, 5)],
+            "moneda_origen": ["USD", "USD"],
+            "moneda_destino": ["COP", "COP"],
+            "tasa_cambio": [4000.0, 4100.0],
+        }
+    )
+    base = pl.DataFrame(
+        {
+            "moneda": ["USD", "USD", "USD", "EUR"],
+            "fecha_valoracion": [
+                date(2024, 1, 3),
+                date(2024, 1, 9),
+                date(2023, 12, 1),
+                date(2024, 1, 1),
+            ],
+            "fecha_valoracion_anterior": [date(2024, 1, 1)] * 4,
+            "fecha_constitucion": [date(2024, 1, 5)] * 4,
+        }
+    )
+
+    sin_asof = cruces.cruzar_tasas_cambio(base, tasas, asof=False)
+    con_asof = cruces.cruzar_tasas_cambio(base, tasas, asof=True)
+
+    columna = "tasa_cambio_fecha_valoracion_corporativo"
+    assert sin_asof.get_column(columna).to_list() == [1.0, 1.0, 1.0, 1.0]
+    assert con_asof.get_column(columna).to_list() == [4000.0, 4100.0, 1.0, 1.0]
+    assert sin_asof.get_column("tasa_cambio_fecha_constitucion").to_list() == [
+        4100.0,
+        4100.0,
+        4100.0,
+        1.0,
+    ]
+
+
+def test_fluctuacion_conserva_orden_y_moneda_local():
+    """
+    La fluctuación se calcula sobre todo el output sin reordenarlo, la moneda local queda
+    con tasa 1 y fluctuación 0
+    """
+    tasas = pl.DataFrame(
+        {
+            "fecha": [date(2025, 1, 31), date(2025, 2, 28)],
+            "moneda_origen": ["USD", "USD"],
+            "moneda_destino": ["COP", "COP"],
+            "tasa_cambio": [4100.0, 4200.0],
+        }
+    )
+    devengo = pl.DataFrame(
+        {
+            "recibo": ["1", "2", "3"],
+            "moneda": ["COP", "USD", "COP"],
+            "tipo_contabilidad": ["ifrs17_corporativo"] * 3,
+            "fecha_valoracion": [date(2025, 2, 28)] * 3,
+            "fecha_valoracion_anterior": [date(2025, 1, 31)] * 3,
+            "fecha_constitucion": [date(2025, 1, 15)] * 3,
+            "saldo": [-1000.0, -1000.0, -1000.0],
+            "valor_liberacion": [100.0, 100.0, 100.0],
+            "acreditacion_intereses": [None, 50.0, None],
+        },
+        schema_overrides={"acreditacion_intereses": pl.Float64},
+    )
+
+    resultado = fluctuacion.calc_fluctuacion(devengo, tasas)
+
+    assert resultado.get_column("recibo").to_list() == ["1", "2", "3"]
+    assert resultado.get_column("tasa_cambio_fecha_valoracion_corporativo").to_list() == [
+        1.0,
+        4200.0,
+        1.0,
+    ]
+    assert resultado.get_column("fluctuacion_constitucion").to_list() == [
+        0.0,
+        (-1000.0 + 50.0) * 100,
+        0.0,
+    ]
+    assert resultado.get_column("fluctuacion_liberacion").to_list() == [0.0, -100.0 * 100, 0.0]
+
+
+def test_fluctuacion_constitucion_sin_financiacion():
+    """
+    Sin componente de financiación la acreditación es nula y la fluctuación de
+    constitución es la del saldo, no se anula
+    """
+    tasas = pl.DataFrame(
+        {
+            "fecha": [date(2025, 1, 31), date(2025, 2, 28)],
+            "moneda_origen": ["USD", "USD"],
+            "moneda_destino": ["COP", "COP"],
+            "tasa_cambio": [4100.0, 4200.0],
+        }
+    )
+    devengo = pl.DataFrame(
+        {
+            "moneda": ["USD", "USD", "USD"],
+            "tipo_contabilidad": ["ifrs17_corporativo"] * 3,
+            "fecha_valoracion": [date(2025, 2, 28)] * 3,
+            "fecha_valoracion_anterior": [date(2025, 1, 31)] * 3,
+            "fecha_constitucion": [date(2024, 12, 15)] * 3,
+            "saldo": [-1000.0, -1000.0, -1000.0],
+            "valor_liberacion": [100.0, 100.0, 100.0],
+            "acreditacion_intereses": [None, float("nan"), 50.0],
+        },
+        schema_overrides={"acreditacion_intereses": pl.Float64},
+    )
+
+    resultado = fluctuacion.calc_fluctuacion(devengo, tasas)
+
+    assert resultado.get_column("fluctuacion_constitucion").to_list() == [
+        -1000.0 * 100,
+        -1000.0 * 100,
+        (-1000.0 + 50.0) * 100,
+    ]
+
+
+@pytest.mark.parametrize("asof", [False, True])
+def test_tasas_cambio_fechas_datetime(asof: bool):
+    """
+    Las fechas de la tabla de tasas y de la base pueden venir como Datetime, como las lee
+    el excel, y se resuelven igual que las pl.Date
+    """
+    tasas = pl.DataFrame(
+        {
+            "fecha": [date(2025, 1, 31), date(2025, 2, 1), date(2025, 2, 28)],
+            "moneda_origen": ["USD", "USD", "USD"],
+            "moneda_destino": ["COP", "COP", "COP"],
+            "tasa_cambio": [4100.0, 4110.0, 4200.0],
+        }
+    )
+    base = pl.DataFrame(
+        {
+            "moneda": ["USD", "EUR"],
+            "fecha_valoracion": [date(2025, 2, 28)] * 2,
+            "fecha_valoracion_anterior": [date(2025, 1, 31)] * 2,
+            "fecha_constitucion": [date(2025, 2, 1)] * 2,
+        }
+    )
+    fechas = ["fecha_valoracion", "fecha_valoracion_anterior", "fecha_constitucion"]
+
+    esperado = cruces.cruzar_tasas_cambio(base, tasas, asof=asof)
+    resultado = cruces.cruzar_tasas_cambio(
+        base.with_columns(pl.col(fechas).cast(pl.Datetime("us"))),
+        tasas.with_columns(pl.col("fecha").cast(pl.Datetime("ms"))),
+        asof=asof,
+    )
+
+    columnas = [c for c in esperado.columns if c.startswith("tasa_cambio_")]
+    assert resultado.select(columnas).equals(esperado.select(columnas))
+    assert esperado.row(0, named=True)["tasa_cambio_fecha_valoracion_anterior_local"] == 4110.0
+
+
+def test_tasas_cambio_fecha_centinela():
+    """
+    Una fecha centinela en la tabla de tasas no construye un índice denso de siglos
+    """
+    tasas = pl.DataFrame(
+        {
+            "fecha": [date(2025, 1, 31), date(3000, 12, 31)],
+            "moneda_origen": ["USD", "USD"],
+            "moneda_destino": ["COP", "COP"],
+            "tasa_cambio": [4100.0, 4100.0],
+        }
+    )
+    base = pl.DataFrame(
+        {
+            "moneda": ["USD"],
+            "fecha_valoracion": [date(2025, 2, 28)],
+            "fecha_valoracion_anterior": [date(2025, 1, 31)],
+            "fecha_constitucion": [date(2025, 2, 1)],
+        }
+    )
+
+    with pytest.raises(ValueError, match="USD"):
+        cruces.cruzar_tasas_cambio(base, tasas)
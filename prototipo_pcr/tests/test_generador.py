@@ -0,0 +1,54 @@
+import polars as pl
+from polars.testing import assert_frame_equal
+from benchmarks import generador
+
+
+def plantilla() -> dict[str, pl.DataFrame]:
+    produccion = pl.DataFrame(
+        {
+            "poliza": ["100", None],
+            "recibo": ["7", "8"],
+            "ramo_sura": ["040", "083"],
+            "valor_prima_emitida": [1_000.0, 2_000.0],
+        }
+    )
+    descuentos = pl.DataFrame(
+        {"poliza": [100], "recibo": [7], "podto_comercial": [0.05]}
+    )
+    param = pl.DataFrame({"ramo_sura": ["040"], "porc_gasto": [0.1]})
+    return {
+        tabla: produccion.clear() for tabla in generador.TABLAS_CARTERA
+    } | {"produccion_dir": produccion, "descuentos": descuentos, "gasto": param}
+
+
+def test_generar_insumos_replica_cartera_con_llaves_consistentes():
+    """
+    La cartera se replica hasta las filas pedidas con el mismo esquema, las llaves de
+    cada réplica siguen cruzando entre insumos y los parámetros no se replican
+    """
+    insumos = generador.generar_insumos(plantilla(), filas=10, semilla=1)
+    produccion = insumos["produccion_dir"]
+
+    assert produccion.height == 8 and insumos["descuentos"].height == 4
+    assert produccion.schema == plantilla()["produccion_dir"].schema
+    assert_frame_equal(insumos["gasto"], plantilla()["gasto"])
+    assert produccion.get_column("poliza").drop_nulls().n_unique() == 4
+    cruce = produccion.join(
+        insumos["descuentos"].with_columns(pl.col("poliza", "recibo").cast(pl.String)),
+        on=["poliza", "recibo"],
+    )
+    assert cruce.height == 4
+    valores = produccion.get_column("valor_prima_emitida")
+    assert valores.is_between(500.0, 3_000.0).all() and valores.n_unique() == 8
+
+
+def test_generar_insumos_reproducible_por_semilla():
+    assert_frame_equal(
+        generador.generar_insumos(plantilla(), 10, semilla=3)["produccion_dir"],
+        generador.generar_insumos(plantilla(), 10, semilla=3, lazy=True)[
+            "produccion_dir"
+        ].collect(),
+    )
+    assert not generador.generar_insumos(plantilla(), 10, semilla=3)[
+        "produccion_dir"
+    ].equals(generador.generar_insumos(plantilla(), 10, semilla=4)["produccion_dir"])
@@ -0,0 +1,131 @@
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+import main
+import src.esquemas as esquemas
+import src.parametros as params
+
+
+def ordenar(df: pl.DataFrame) -> pl.DataFrame:
+    df = df.with_columns(pl.col(pl.Categorical).cast(pl.String))
+    return df.sort(pl.all(), nulls_last=True)
+
+
+@pytest.mark.parametrize("modo", ["bloques", "paralelo"])
+def test_salidas_por_partes_se_leen_como_run_pcr(tmp_path, monkeypatch, modo: str):
+    """
+    Los outputs escritos por bloque o por fragmento tienen todos el mismo esquema
+    aunque alguna regla de devengo no tenga registros en una parte, así se leen como
+    un solo dataset particionado e iguales al output de run_pcr
+    """
+    monkeypatch.setattr(params, "FORMATO_SALIDA", "parquet")
+    monkeypatch.setattr(params, "RUTA_SALIDA_DEVENGO", tmp_path / "completo" / "devengo")
+    monkeypatch.setattr(params, "RUTA_SALIDA_CONTABLE", tmp_path / "completo" / "contable")
+    outputs = main.run_pcr()
+
+    monkeypatch.setattr(params, "RUTA_SALIDA_DEVENGO", tmp_path / modo / "devengo")
+    monkeypatch.setattr(params, "RUTA_SALIDA_CONTABLE", tmp_path / modo / "contable")
+    if modo == "bloques":
+        rutas = main.run_pcr_por_bloques(filas_por_bloque=3)
+        columna_parte = "bloque"
+    else:
+        rutas = main.run_pcr_paralelo(procesos=2)
+        columna_parte = "fragmento"
+
+    for output, ruta in zip(outputs, rutas):
+        leido = pl.read_parquet(ruta, hive_partitioning=True)
+        assert leido.get_column(columna_parte).n_unique() > 1
+        assert_frame_equal(
+            ordenar(leido.select(output.columns)), ordenar(output), check_dtypes=False
+        )
+
+
+def test_run_pcr_entrega_texto_sin_cache_global(monkeypatch, tmp_path):
+    """
+    Con las categóricas activas el output tiene los mismos tipos que sin codificar
+    y el cache de textos de la ejecución no queda activo al terminar
+    """
+    monkeypatch.setattr(params, "FORMATO_SALIDA", "parquet")
+    monkeypatch.setattr(params, "RUTA_SALIDA_DEVENGO", tmp_path / "devengo")
+    monkeypatch.setattr(params, "RUTA_SALIDA_CONTABLE", tmp_path / "contable")
+    monkeypatch.setattr(params, "CODIFICAR_CATEGORICAS", True)
+    codificados = main.run_pcr()
+    assert not pl.using_string_cache()
+
+    monkeypatch.setattr(params, "CODIFICAR_CATEGORICAS", False)
+    for codificado, texto in zip(codificados, main.run_pcr()):
+        assert codificado.schema == texto.schema
+        assert_frame_equal(ordenar(codificado), ordenar(texto))
+
+
+@pytest.mark.parametrize("lazy", [False, True], ids=["eager", "lazy"])
+def test_calcular_pcr_con_insumo_financiado(monkeypatch, lazy: bool):
+    """
+    Un insumo con el componente de financiación anexado se apila con los que no lo
+    traen y sus columnas de la curva y del saldo quedan declaradas en los outputs
+    """
+    param_financiacion = pl.DataFrame(
+        {
+            "tipo_contabilidad": ["ifrs17_local"],
+            "moneda": ["COP"],
+            "tipo_insumo": ["*"],
+            "compania": ["*"],
+            "ramo_sura": ["*"],
+            "producto": ["*"],
+            "tipo_op": ["*"],
+            "aplica_comp_financ": [1],
+            "aplica_ipc_mensual": [1],
+            "pais_curva": ["colombia"],
+            "moneda_curva": ["COP"],
+            "meses_max_vigencia": [24],
+        }
+    )
+    # curva de 202212 con nodos hasta el fin de vigencia y los meses de valoración
+    meses = [202212] + [202300 + mes for mes in range(1, 13)]
+    meses += [202401, 202501, 202502]
+    indice_ipc = pl.DataFrame(
+        {
+            "mesid_ipc": meses,
+            "indice_ipc": [1 + i / 100 for i in range(len(meses))],
+            "tasa": [0.01] * len(meses),
+        }
+    )
+    factores_interes = pl.DataFrame(
+        {
+            "moneda_curva": "COP",
+            "pais_curva": "colombia",
+            "mesid_curva": 202212,
+            "nodo": range(1, len(meses) + 1),
+            "mesid_valoracion": meses,
+            "factor_acumulacion": [1 + i / 200 for i in range(len(meses))],
+            "sum_desc_real": [float(i + 1) for i in range(len(meses))],
+            "tasa_fwd_real": [0.005] * len(meses),
+            "factor_desc_real": [0.99] * len(meses),
+        }
+    )
+    prep_input_prima_directo = main.prep_data.prep_input_prima_directo
+
+    def prima_financiada(*args):
+        return prep_input_prima_directo(*args).pipe(
+            main.prep_data.anexar_info_financiacion,
+            param_financiacion,
+            indice_ipc,
+            factores_interes,
+            main.FECHA_VALORACION,
+        )
+
+    monkeypatch.setattr(main.prep_data, "prep_input_prima_directo", prima_financiada)
+    with main.sesion_duckdb.sesion():
+        output_devengo, output_contable = main.calcular_pcr(
+            main.leer_insumos(lazy), lazy=lazy
+        )
+
+    financiado = output_devengo.filter(
+        pl.col("regla_devengo") == "componente_financiacion"
+    )
+    assert financiado.height > 0
+    assert (financiado.get_column("pais_curva") == "colombia").all()
+    assert financiado.get_column("factor_cap_real").is_not_null().all()
+    assert list(output_devengo.columns) == list(esquemas.ESQUEMA_OUTPUT_DEVENGO)
+    assert list(output_contable.columns) == list(esquemas.ESQUEMA_OUTPUT_CONTABLE)
@@ -44,3 +44,163 @@ def test_agregar_marca_onerosidad(fe_valoracion: date, marcas_esperadas: list[pl
     )
 
     assert resultado.equals(resultado_esperado)
+
+
+def test_pivotear_output_descarta_movimientos_en_cero():
+    output_devengo = pl.DataFrame(
+        {
+            "poliza": ["001", "002"],
+            "tipo_contabilidad": ["ifrs17_local", "ifrs17_corporativo"],
+            "anio_liberacion": ["anio_actual", "anio_actual"],
+            "tasa_cambio_fecha_constitucion": [2.0, 2.0],
+            "tasa_cambio_fecha_valoracion_local": [3.0, 3.0],
+            "tasa_cambio_fecha_valoracion_corporativo": [4.0, 4.0],
+            "valor_constitucion": [100.0, 0.0],
+            "valor_liberacion": [None, 10.0],
+            "fluctuacion_liberacion": [5.0, 0.0],
+        }
+    )
+
+    resultado = mapcont.pivotear_output(
+        output_devengo,
+        ["valor_constitucion", "valor_liberacion", "fluctuacion_liberacion"],
+        ["poliza", "anio_liberacion"],
+    )
+
+    resultado_esperado = pl.DataFrame(
+        {
+            "poliza": ["001", "002", "001"],
+            "anio_liberacion": ["no_aplica", "anio_actual", "anio_actual"],
+            "tipo_movimiento": [
+                "valor_constitucion",
+                "valor_liberacion",
+                "fluctuacion_liberacion",
+            ],
+            "valor_md": [100.0, 10.0, 0.0],
+            "valor_ml": [200.0, 40.0, 5.0],
+        }
+    )
+    assert resultado.equals(resultado_esperado)
+
+
+def datos_mapeo_bt() -> tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame, pl.DataFrame]:
+    """
+    Movimientos, relación de BTs, tipo de seguro y nomenclatura con dos BTs para una
+    misma tupla y una tupla sin BT
+    """
+    atributos = {
+        "tipo_movimiento": "valor_constitucion",
+        "anio_liberacion": "no_aplica",
+        "componente": "prima",
+        "clasificacion_adicional": "reserva",
+        "tipo_negocio": "directo",
+        "tipo_contrato": "no_aplica",
+        "tipo_reasegurador": None,
+        "compania": "02",
+        "ramo_sura": "083",
+        "tipo_contabilidad": "ifrs17_local",
+        "transicion": "no_aplica",
+    }
+    campos = {
+        "tipo_movimiento": ["valor_constitucion", "valor_liberacion"],
+        "indicativo_periodo_movimiento": ["no_aplica", "anio_actual"],
+        "concepto": ["prima"],
+        "clasificacion_adicional": ["reserva"],
+        "tipo_negocio": ["directo"],
+        "tipo_reaseguro": ["no_aplica"],
+        "tipo_reasegurador": ["no_aplica"],
+        "compania": ["02"],
+        "tipo_contabilidad": ["ifrs17_local"],
+        "transicion": ["no_aplica"],
+    }
+    nomenclatura = pl.DataFrame(
+        [
+            {"campo": campo, "prototipo": prototipo, "codigo": f"C{i}"}
+            for campo, prototipos in campos.items()
+            for i, prototipo in enumerate(prototipos)
+        ]
+    )
+    tipo_seguro = pl.DataFrame(
+        {"ramo": ["083"], "tipo_seguro": ["Generales"], "tipo_seguro_codigo": ["G"]}
+    )
+    relacion_bt = pl.DataFrame(
+        {
+            "tipo_movimiento": ["C0", "C0"],
+            "indicativo_periodo_movimiento": ["C0", "C0"],
+            "concepto": ["C0", "C0"],
+            "clasificacion_adicional": ["C0", "C0"],
+            "tipo_negocio": ["C0", "C0"],
+            "tipo_reaseguro": ["C0", "C0"],
+            "tipo_reasegurador": ["C0", "C0"],
+            "tipo_seguro": ["G", "G"],
+            "compania": ["C0", "C0"],
+            "tipo_contabilidad": ["C0", "C0"],
+            "tipo_reserva": ["PCR_CP", "PCR_CP"],
+            "transicion": ["C0", "C0"],
+            # dos BTs para la misma tupla duplican el movimiento
+            "naturaleza": ["D", "C"],
+            "bt": ["BT1", "BT2"],
+            "descripcion_bt": ["debito", "credito"],
+        }
+    )
+    movimientos = pl.DataFrame(
+        [
+            {**atributos, "valor_ml": 100.0},
+            {**atributos, "valor_ml": 50.0},
+            {**atributos, "tipo_movimiento": "valor_liberacion", "valor_ml": 10.0},
+            {**atributos, "componente": "gasto", "valor_ml": 5.0},
+        ]
+    )
+    return movimientos, relacion_bt, tipo_seguro, nomenclatura
+
+
+def test_aplicar_mapeo_bt_igual_a_cruces_sucesivos():
+    movimientos, relacion_bt, tipo_seguro, nomenclatura = datos_mapeo_bt()
+
+    resultado = mapcont.aplicar_mapeo_bt(
+        movimientos, relacion_bt, tipo_seguro, nomenclatura
+    )
+    esperado = (
+        movimientos.pipe(mapcont.homologar_campos, nomenclatura)
+        .pipe(mapcont.asignar_tipo_seguro, tipo_seguro)
+        .pipe(mapcont.cruzar_bt, relacion_bt)
+    )
+
+    assert resultado.columns == esperado.columns
+    assert resultado.height == 6
+    assert resultado.sort(pl.all(), nulls_last=True).equals(
+        esperado.sort(pl.all(), nulls_last=True)
+    )
+
+
+def test_mapeo_bt_de_la_ejecucion_resuelve_solo_tuplas_nuevas(monkeypatch):
+    """
+    El mapeo compilado en un bloque se reusa en los siguientes y solo se resuelven las
+    tuplas nuevas, las tuplas se cruzan completas así que no se mezclan entre sí
+    """
+    movimientos, relacion_bt, tipo_seguro, nomenclatura = datos_mapeo_bt()
+    bloques = [movimientos.filter(pl.col("componente") == "prima"), movimientos, movimientos]
+    esperados = [
+        mapcont.aplicar_mapeo_bt(bloque, relacion_bt, tipo_seguro, nomenclatura)
+        for bloque in bloques
+    ]
+    resueltas = []
+    resolver = mapcont.resolver_tuplas
+
+    def contar(tuplas, *tablas):
+        resueltas.append(tuplas.height)
+        return resolver(tuplas, *tablas)
+
+    monkeypatch.setattr(mapcont, "resolver_tuplas", contar)
+    mapeo_bt = {}
+    for bloque, esperado in zip(bloques, esperados):
+        resultado = mapcont.aplicar_mapeo_bt(
+            bloque, relacion_bt, tipo_seguro, nomenclatura, mapeo_bt
+        )
+        assert resultado.sort(pl.all(), nulls_last=True).equals(
+            esperado.sort(pl.all(), nulls_last=True)
+        )
+
+    # la tupla de gasto se resuelve en el segundo bloque y el tercero no resuelve nada
+    assert resueltas == [2, 1]
+    assert mapeo_bt["mapeo"].select(mapcont.ATRIBUTOS_MAPEO).n_unique() == 3
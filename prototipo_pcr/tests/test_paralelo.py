@@ -0,0 +1,31 @@
+import polars as pl
+from polars.testing import assert_frame_equal
+from src import paralelo
+
+
+def test_fragmentos_por_ramo(tmp_path):
+    """
+    Los insumos compartidos se releen iguales y cada ramo, incluido el nulo, queda en un
+    solo fragmento con los insumos transversales completos
+    """
+    insumos = {
+        "produccion_dir": pl.DataFrame(
+            {"ramo_sura": ["040", "081", None, "040"], "valor": [1.0, 2.0, 3.0, 4.0]}
+        ),
+        "cartera": pl.DataFrame({"ramo_sura": ["083"], "valor": [5.0]}),
+        "param_contab": pl.DataFrame({"ramo_sura": ["*"]}),
+    }
+    rutas = paralelo.compartir_insumos(insumos, tmp_path)
+    compartidos = paralelo.leer_insumos_compartidos(rutas)
+    for nombre, df in insumos.items():
+        assert_frame_equal(compartidos[nombre].collect(), df)
+
+    ramos = paralelo.valores_fragmento(compartidos)
+    assert ramos == [None, "040", "081", "083"]
+
+    filas = 0
+    for ramo in ramos:
+        fragmento = paralelo.filtrar_fragmento(compartidos, ramo)
+        assert fragmento["param_contab"].collect().height == 1
+        filas += fragmento["produccion_dir"].collect().height
+    assert filas == insumos["produccion_dir"].height
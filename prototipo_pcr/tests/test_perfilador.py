@@ -0,0 +1,53 @@
+import json
+
+import polars as pl
+from src import mapeo_contable, parametros, perfilador, prep_insumo
+
+
+def test_perfilar_registra_etapas_y_restaura_funciones(monkeypatch, tmp_path):
+    """
+    Las funciones de los módulos de cálculo se registran con su entrada y salida
+    mientras dura la ejecución perfilada y se restauran al terminar
+    """
+    monkeypatch.setattr(parametros, "PERFILAR_ETAPAS", True)
+    monkeypatch.setattr(parametros, "RUTA_PERFIL", tmp_path)
+    original = mapeo_contable.asignar_tipo_seguro
+    base = pl.DataFrame({"ramo_sura": ["040", "040", "083"], "valor": [1.0, 2.0, 3.0]})
+    tipo_seg = pl.DataFrame({"ramo": ["040"], "tipo_seguro": ["generales"]})
+
+    with perfilador.perfilar("prueba", lazy=False):
+        with perfilador.etapa("calculo"):
+            # las funciones que solo construyen expresiones no se reportan
+            prep_insumo.valor_prima(False)
+            mapeo_contable.asignar_tipo_seguro(base, tipo_seg)
+            mapeo_contable.asignar_tipo_seguro(base.lazy(), tipo_seg.lazy())
+
+    assert mapeo_contable.asignar_tipo_seguro is original
+    (ruta,) = tmp_path.glob("perfil_*.json")
+    reporte = json.loads(ruta.read_text())
+    assert reporte["ejecucion"] == "prueba"
+    assert reporte["lazy"] is False
+    etapas = [
+        (e["etapa"], e["padre"], e["filas_entrada"], e["filas_salida"], e["columnas_salida"])
+        for e in reporte["etapas"]
+    ]
+    assert etapas == [
+        ("prueba", None, None, None, None),
+        ("calculo", "prueba", None, None, None),
+        ("mapeo_contable.asignar_tipo_seguro", "calculo", 3, 3, 3),
+        ("mapeo_contable.asignar_tipo_seguro", "calculo", None, None, 3),
+    ]
+    assert all(
+        e["wall_s"] >= 0 and e["rss_pico_mb"] >= e["rss_inicio_mb"]
+        for e in reporte["etapas"]
+    )
+
+
+def test_sin_perfilar_no_escribe_reporte(tmp_path, monkeypatch):
+    monkeypatch.setattr(parametros, "RUTA_PERFIL", tmp_path)
+    original = mapeo_contable.asignar_tipo_seguro
+
+    with perfilador.perfilar("prueba"):
+        assert mapeo_contable.asignar_tipo_seguro is original
+
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,116 @@
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+from src import cruces, prep_insumo
+from src import parametros as p
+
+
+@pytest.mark.parametrize("reaseguro", [False, True])
+def test_base_comun_igual_a_insumos_separados(
+    param_contabilidad: pl.DataFrame, excepciones_df: pl.DataFrame, reaseguro: bool
+):
+    """
+    La base comun debe producir los mismos registros que las funciones
+    de prima, descuento y gasto por separado
+    """
+    hoja = p.HOJA_CESION if reaseguro else p.HOJA_PDN
+    fuente = pl.read_excel(p.RUTA_INSUMOS, sheet_name=hoja)
+    descuentos = pl.read_excel(p.RUTA_INSUMOS, sheet_name=p.HOJA_DESCUENTO)
+    gastos = pl.read_excel(p.RUTA_GASTOS)
+
+    if reaseguro:
+        prep_prima, prep_dcto, prep_gasto = (
+            prep_insumo.prep_input_prima_rea,
+            prep_insumo.prep_input_dcto_rea,
+            prep_insumo.prep_input_gasto_rea,
+        )
+    else:
+        prep_prima, prep_dcto, prep_gasto = (
+            prep_insumo.prep_input_prima_directo,
+            prep_insumo.prep_input_dcto_directo,
+            prep_insumo.prep_input_gasto_directo,
+        )
+    args = (param_contabilidad, excepciones_df)
+    separados = pl.concat(
+        [
+            prep_prima(fuente, *args, p.FECHA_VALORACION),
+            prep_dcto(fuente, *args, descuentos, p.FECHA_VALORACION),
+            prep_gasto(fuente, *args, gastos, p.FECHA_VALORACION),
+        ],
+        how="diagonal_relaxed",
+    )
+    base_comun = prep_insumo.prep_inputs_base_comun(
+        fuente, *args, descuentos, gastos, p.FECHA_VALORACION, reaseguro=reaseguro
+    )
+
+    assert base_comun.height > 0
+    assert_frame_equal(
+        separados.sort(pl.all(), nulls_last=True),
+        base_comun.select(separados.columns).sort(pl.all(), nulls_last=True),
+    )
+
+
+def test_parametrizar_por_llaves_igual_al_cruce_por_registro(
+    param_contabilidad: pl.DataFrame, excepciones_df: pl.DataFrame
+):
+    """
+    Cruzar parametros y excepciones sobre las llaves distintas da lo mismo que cruzar
+    registro a registro: las filas sin tipo_contabilidad se abren, las que lo traen se
+    restringen al suyo y se descartan si no existe, las que no cruzan quedan sin parametros
+    """
+    base = pl.DataFrame(
+        {
+            "tipo_insumo": [
+                "gasto_comi_directo",
+                "gasto_comi_directo",
+                "gasto_comi_directo",
+                "gasto_comi_directo",
+                "comision_rea_prop",
+                "no_parametrizado",
+                "gasto_comi_directo",
+            ],
+            "tipo_negocio": [
+                "directo",
+                "directo",
+                "directo",
+                "directo",
+                "mantenido",
+                "directo",
+                None,
+            ],
+            "tipo_contabilidad": [
+                None,
+                None,
+                "ifrs4_local",
+                "no_existe",
+                None,
+                None,
+                None,
+            ],
+            "compania": ["01", "01", "02", "01", "01", "01", "01"],
+            "ramo_sura": ["040", "040", "196", "040", "081", "040", "040"],
+            "tipo_op": ["modificacion_valorable", "emision", "emision", "emision"]
+            + ["emision"] * 3,
+            "recibo": ["1", "2", "3", "4", "5", "6", "7"],
+        }
+    )
+    por_registro = base.pipe(
+        cruces.cruzar_param_contabilidad, param_contabilidad, restriccion_parcial=True
+    ).pipe(cruces.cruzar_excepciones_50_50, excepciones_df)
+
+    por_llaves = prep_insumo.parametrizar_por_llaves(
+        base, param_contabilidad, excepciones_df
+    )
+
+    assert "no_existe" not in por_llaves["tipo_contabilidad"].to_list()
+    assert por_llaves.filter(pl.col("recibo") == "1").height == 4
+    assert_frame_equal(
+        por_registro.sort(pl.all(), nulls_last=True),
+        por_llaves.select(por_registro.columns).sort(pl.all(), nulls_last=True),
+    )
+    assert_frame_equal(
+        prep_insumo.parametrizar_por_llaves(
+            base.lazy(), param_contabilidad, excepciones_df
+        ).collect(),
+        por_llaves,
+    )
@@ -0,0 +1,57 @@
+from datetime import date
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+from src import salidas
+import src.parametros as params
+
+
+@pytest.fixture
+def output() -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "fecha_valoracion": [date(2025, 2, 28)] * 3,
+            "tipo_contabilidad": ["ifrs17", "ifrs4_local", "ifrs17"],
+            "ramo_sura": ["AAV", "AAV", "081"],
+            "valor": [1.0, 2.0, 3.0],
+        }
+    )
+
+
+@pytest.mark.parametrize("formato", ["parquet", "ipc", "csv"])
+def test_escribir_salida(tmp_path, monkeypatch, output: pl.DataFrame, formato: str):
+    """
+    Cada backend debe poder releer exactamente lo que se escribió
+    """
+    monkeypatch.setattr(params, "EXPORTAR_MUESTRA_EXCEL", False)
+    destino = salidas.escribir_salida(output.lazy(), tmp_path / "output", formato)
+
+    if formato == "parquet":
+        # una carpeta por cada combinación de las columnas de partición
+        assert len(list(destino.rglob("*.parquet"))) == 3
+        leido = pl.read_parquet(destino, hive_partitioning=True, schema=output.schema)
+    elif formato == "ipc":
+        leido = pl.read_ipc(destino)
+    else:
+        leido = pl.read_csv(destino, schema=output.schema)
+
+    assert_frame_equal(
+        output.sort(pl.all()), leido.select(output.columns).sort(pl.all())
+    )
+
+
+def test_muestra_excel(tmp_path, monkeypatch, output: pl.DataFrame):
+    """
+    La muestra de excel solo debe tener las primeras filas configuradas
+    """
+    monkeypatch.setattr(params, "EXPORTAR_MUESTRA_EXCEL", True)
+    monkeypatch.setattr(params, "FILAS_MUESTRA_EXCEL", 2)
+    salidas.escribir_salida(output, tmp_path / "output", "ipc")
+
+    muestra = pl.read_excel(tmp_path / "output_muestra.xlsx")
+    assert muestra.height == 2
+
+
+def test_formato_no_soportado(tmp_path, output: pl.DataFrame):
+    with pytest.raises(ValueError):
+        salidas.escribir_salida(output, tmp_path / "output", "xlsx")
@@ -0,0 +1,58 @@
+import polars as pl
+from src import sesion_duckdb
+import src.parametros as params
+
+
+def test_sesion_registra_parametros_una_vez(monkeypatch):
+    """
+    Los parámetros se registran una vez por sesión con la configuración definida
+    y las bases de cada consulta se liberan al terminar
+    """
+    monkeypatch.setattr(params, "DUCKDB_HILOS", 2)
+    parametros = pl.LazyFrame({"llave": [1, 2], "valor": ["a", "b"]})
+    materializados = []
+    materializar = sesion_duckdb.aux_tools.materializar
+
+    def contar(df):
+        materializados.append(df)
+        return materializar(df)
+
+    monkeypatch.setattr(sesion_duckdb.aux_tools, "materializar", contar)
+
+    with sesion_duckdb.sesion() as con:
+        assert con.execute("SELECT current_setting('threads')").fetchone()[0] == 2
+        for llave, valor in [(1, "a"), (2, "b")]:
+            resultado = sesion_duckdb.consultar(
+                "SELECT b.llave, p.valor FROM base b JOIN param p USING (llave)",
+                {"base": pl.DataFrame({"llave": [llave]})},
+                {"param": parametros},
+            )
+            assert resultado.rows() == [(llave, valor)]
+        vistas = con.execute(
+            "SELECT view_name FROM duckdb_views() WHERE NOT internal"
+        ).fetchall()
+        assert sorted(vista for (vista,) in vistas) == ["param"]
+
+    assert materializados == [parametros]
+    assert sesion_duckdb._parametros == {}
+
+
+def test_sesion_anidada_reusa_la_conexion():
+    """
+    Una sesión anidada (por ejemplo run_pcr dentro de los bloques) reusa la conexión
+    y sus parámetros, solo al salir de la sesión externa se cierra
+    """
+    parametros = pl.DataFrame({"llave": [1], "valor": ["a"]})
+    sql = "SELECT b.llave, p.valor FROM base b JOIN param p USING (llave)"
+    base = {"base": pl.DataFrame({"llave": [1]})}
+
+    with sesion_duckdb.sesion() as externa:
+        sesion_duckdb.consultar(sql, base, {"param": parametros})
+        with sesion_duckdb.sesion() as interna:
+            assert interna is externa
+            assert sesion_duckdb.consultar(sql, base).rows() == [(1, "a")]
+        assert sesion_duckdb.conexion() is externa
+        assert sesion_duckdb.consultar(sql, base).rows() == [(1, "a")]
+
+    assert sesion_duckdb._conexion is None
+    assert sesion_duckdb._parametros == {}
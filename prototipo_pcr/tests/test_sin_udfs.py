@@ -0,0 +1,24 @@
+import ast
+from pathlib import Path
+import pytest
+
+# UDFs de python que sacan a polars del motor vectorizado y paralelo
+UDFS_PROHIBIDAS = {"map_elements", "map_rows", "apply"}
+RAIZ = Path(__file__).resolve().parents[1]
+ARCHIVOS_PROCESO = sorted((RAIZ / "src").glob("*.py")) + [RAIZ / "main.py"]
+
+
+@pytest.mark.parametrize("archivo", ARCHIVOS_PROCESO, ids=lambda ruta: ruta.name)
+def test_sin_udfs_en_el_proceso(archivo: Path):
+    """
+    Los modulos del proceso no deben usar UDFs de python fila a fila
+    """
+    arbol = ast.parse(archivo.read_text(encoding="utf-8"))
+    usos = [
+        f"{archivo.name}:{nodo.lineno} .{nodo.func.attr}()"
+        for nodo in ast.walk(arbol)
+        if isinstance(nodo, ast.Call)
+        and isinstance(nodo.func, ast.Attribute)
+        and nodo.func.attr in UDFS_PROHIBIDAS
+    ]
+    assert not usos, f"UDFs de python en el proceso: {usos}"